@@ -1,8 +1,9 @@
 # mybot/plugins/rpg/__init__.py
 # -*- coding: utf-8 -*-
 """
-RPG 插件（包入口）：仅导入各功能模块以注册 matcher
+RPG 插件（包入口）：导入各功能模块以注册 matcher，并挂上落盘等生命周期钩子
 """
+from . import lifecycle  # noqa: F401
 from .handlers import help  # noqa: F401
 from .handlers import profile  # noqa: F401
 from .handlers import rename  # noqa: F401
@@ -1,7 +1,11 @@
 # mybot/plugins/rpg/battle/adapters.py
-from typing import Dict
+from typing import TYPE_CHECKING
+
 from .entity import Entity
 
+if TYPE_CHECKING:
+    from ..util.config_defs import MonsterDef
+
 BASE_STATS = {
     "ATK": 1,
     "DEF": 1,
@@ -58,16 +62,16 @@ def player_to_entity(player) -> Entity:
     return Entity(name=player.name, base_stats=base, tag="player")
 
 
-def monster_to_entity(mdef: Dict, hp: int = None) -> Entity:
+def monster_to_entity(mdef: "MonsterDef", hp: int = None) -> Entity:
     base = {
-        "ATK": int(mdef["ATK"]),
-        "DEF": int(mdef["DEF"]),
-        "AGI": int(mdef.get("AGI", 0)),
-        "INT": int(mdef.get("INT", 0)),
-        "MAX_HP": int(mdef["MAX_HP"]),
-        "CRIT": float(mdef.get("CRIT", 0.0)),
+        "ATK": int(mdef.ATK),
+        "DEF": int(mdef.DEF),
+        "AGI": int(mdef.AGI),
+        "INT": int(mdef.INT),
+        "MAX_HP": int(mdef.MAX_HP),
+        "CRIT": float(mdef.CRIT),
     }
-    ent = Entity(name=mdef["name"], base_stats=base, tag=mdef.get("tag", "monster"))
+    ent = Entity(name=mdef.name, base_stats=base, tag=mdef.tag)
     if hp is not None:
         ent.HP = hp
     return ent
@@ -0,0 +1,76 @@
+# mybot/plugins/rpg/battle/catalog.py
+# -*- coding: utf-8 -*-
+"""
+怪物表（monsters.yaml）的内存索引：进程内只解析一次。
+- by_id：id -> 定义
+- 按 (tag, level) 分桶，按等级区间取候选时把桶拼起来并缓存，抽样不用再扫全表
+怪物定义编译成只读的 MonsterDef，表里有不合法的条目时加载直接报错。
+"""
+import pathlib
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ..util.config_bundle import load_yaml
+from ..util.config_defs import MonsterDef
+
+MONSTERS_YAML = pathlib.Path(__file__).resolve().parent / "monsters.yaml"
+
+
+class MonsterCatalog:
+    def __init__(self, monsters: List[MonsterDef]):
+        self.monsters = monsters
+        self.by_id: Dict[str, MonsterDef] = {m.id: m for m in monsters}
+        self._buckets: Dict[Tuple[str, int], List[MonsterDef]] = defaultdict(list)
+        self._by_tag: Dict[str, List[MonsterDef]] = defaultdict(list)
+        for m in monsters:
+            self._buckets[(m.tag, m.level)].append(m)
+            self._by_tag[m.tag].append(m)
+        self._levels: Dict[str, List[int]] = defaultdict(list)
+        for tag, level in sorted(self._buckets):
+            self._levels[tag].append(level)
+        self._ranges: Dict[Tuple[str, int, int], List[MonsterDef]] = {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path = MONSTERS_YAML) -> "MonsterCatalog":
+        return cls([MonsterDef.from_dict(m) for m in load_yaml(path) or []])
+
+    def get(self, monster_id: str) -> MonsterDef:
+        try:
+            return self.by_id[str(monster_id)]
+        except KeyError:
+            raise KeyError(f"monster id not found: {monster_id}") from None
+
+    def by_tag(self, tag: str) -> List[MonsterDef]:
+        return self._by_tag.get(tag, [])
+
+    def in_range(self, tag: str, min_level: int, max_level: int) -> List[MonsterDef]:
+        """tag 下等级在 [min_level, max_level] 的怪物，按等级升序；同一区间只拼一次"""
+        key = (tag, min_level, max_level)
+        out = self._ranges.get(key)
+        if out is None:
+            out = [m for level in self._levels.get(tag, []) if min_level <= level <= max_level
+                   for m in self._buckets[(tag, level)]]
+            self._ranges[key] = out
+        return out
+
+    def sample(self, tag: str, level_range: Tuple[int, int], k: int, rng: Optional[random.Random] = None) -> List[MonsterDef]:
+        """从区间内不重复地抽 k 个；候选不足 k 个时抛 ValueError（同 random.sample）"""
+        return (rng or random).sample(self.in_range(tag, *level_range), k)
+
+    def choice(self, tag: str, rng: Optional[random.Random] = None) -> MonsterDef:
+        return (rng or random).choice(self.by_tag(tag))
+
+
+_catalog: Optional[MonsterCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> MonsterCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = MonsterCatalog.load()
+    return _catalog
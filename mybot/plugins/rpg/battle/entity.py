@@ -1,8 +1,11 @@
 import random
 import uuid
-from dataclasses import dataclass, fields, field
+from operator import attrgetter
 from enum import Enum
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Sequence
+
+if TYPE_CHECKING:
+    from ..util.config_defs import BuffDef, EffectDef
 
 
 class BuffStackType(Enum):
@@ -13,84 +16,102 @@ class BuffStackType(Enum):
     BOTH = 3  # 同时叠加层数和持续时间
 
 
-@dataclass
-class Buff:
-    # buff唯一标识
-    id: str
-    # 名称
-    name: str
-    # 描述
-    description: str
+def _from_proto(name: str) -> property:
+    get = attrgetter(name)
+    return property(lambda self: get(self.proto), doc=f"原型上的 {name}，只读")
+
 
+class Buff:
+    """
+    一次施加产生的 buff 实例：只带各自变化的状态（剩余时间、层数、来源），
+    其余字段都从共享的只读原型 BuffDef 上读，施加时不再解析或复制配置
+    """
+    __slots__ = ("proto", "duration", "current_stack", "source")
+
+    def __init__(self, proto: "BuffDef", duration: Optional[int] = None, current_stack: int = 1, source: Any = None):
+        self.proto = proto
+        # 剩余时间
+        self.duration = proto.duration if duration is None else duration
+        self.current_stack = current_stack
+        # 来源
+        self.source = source
+
+    id: str = _from_proto("id")
+    name: str = _from_proto("name")
+    description: str = _from_proto("description")
     # 属性变化
-    property_change: dict
+    property_change: Mapping[str, float] = _from_proto("property_change")
     # buff/debuff 区分
-    is_positive: bool
-    # 剩余时间
-    duration: int
-    # 叠加机制
-    max_stack: int = 1
-    current_stack: int = 1
+    is_positive: bool = _from_proto("is_positive")
+    max_stack: int = _from_proto("max_stack")
     # 叠加类型
-    stack_type: BuffStackType = BuffStackType.NONE
-
+    stack_type: BuffStackType = _from_proto("stack_type")
     # 条件表达式
-    available_expr: List[str] = field(default_factory=list)
-
+    available_expr: Sequence[str] = _from_proto("available_expr")
     # buff变化方式
-    changes_on_turn_end: Dict[str, int] = field(default_factory=dict)
+    changes_on_turn_end: Mapping[str, int] = _from_proto("changes_on_turn_end")
+    # 免疫和抵抗相关
+    can_resist: bool = _from_proto("can_resist")  # 是否可被抵抗
+    can_dispel: bool = _from_proto("can_dispel")  # 是否可被驱散
+    effects: Sequence["EffectDef"] = _from_proto("effects")
 
-    # 来源
-    source: str = None
+    def __repr__(self):
+        return f"Buff({self.id!r}, duration={self.duration}, current_stack={self.current_stack})"
 
-    # 免疫和抵抗相关
-    can_resist: bool = False  # 是否可被抵抗
-    can_dispel: bool = True  # 是否可被驱散
 
-    effects: List[Dict[str, str]] = field(default_factory=list)
+def create_buff(bdef: "BuffDef") -> Buff:
+    """按原型新建一个 buff 实例"""
+    return Buff(bdef)
 
 
-def create_buff_from_dict(data: Dict[str, Any]) -> Buff:
-    # 获取Buff类的所有字段名
-    field_names = {f.name for f in fields(Buff)}
+# buff 的 property_change 能改的属性
+BUFF_STATS = ("ATK", "DEF", "AGI", "CRIT", "MAX_HP", "HP")
 
-    # 处理 effects 列表，转换为 property_change 字典
-    if 'effects' in data:
-        property_change = {}
-        remaining_effects = []
-        for effect in data['effects']:
-            if effect['op'] == 'property_change':
-                stat = effect['stat']
-                value = effect['value']
-                property_change[stat] = value
-            else:
-                remaining_effects.append(effect)
 
-        # 将 property_change 添加到数据中
-        data['property_change'] = property_change
-        # 更新 effects，只保留非 property_change 的效果
-        if remaining_effects:
-            data['effects'] = remaining_effects
-        else:
-            # 如果没有剩余效果，移除 effects 字段
-            del data['effects']
+class BuffContainer:
+    """
+    一个实体身上的 buff：按 id 建索引，同 id 只有一个；遍历按加入顺序。
+    过期的 buff 在 sweep() 里一趟清掉，不在遍历时逐个删除
+    """
+    __slots__ = ("_items", "_by_id")
+
+    def __init__(self):
+        self._items: List[Buff] = []
+        self._by_id: Dict[str, Buff] = {}
+
+    def __iter__(self) -> Iterator[Buff]:
+        return iter(self._items)
 
-    # 处理 stack_type 字符串转换为枚举
-    if 'stack_type' in data and isinstance(data['stack_type'], str):
-        data['stack_type'] = BuffStackType[data['stack_type']]
+    def __len__(self) -> int:
+        return len(self._items)
 
-    # 处理 changes_on_turn_end - 将列表转换为字典
-    if 'turn_end' in data:
-        changes_list = data['turn_end']
-        changes_dict = {}
-        for change_dict in changes_list:
-            changes_dict.update(change_dict)
-        data['changes_on_turn_end'] = changes_dict
+    def __contains__(self, buff_id: str) -> bool:
+        return buff_id in self._by_id
 
-    # 只保留字典中与Buff字段匹配的键值对
-    filtered_data = {k: v for k, v in data.items() if k in field_names}
+    def get(self, buff_id: str) -> Optional[Buff]:
+        return self._by_id.get(buff_id)
 
-    return Buff(**filtered_data)
+    def add(self, buff: Buff):
+        """加入新 buff，调用方保证同 id 的不在里面"""
+        self._by_id[buff.id] = buff
+        self._items.append(buff)
+
+    def pop(self, buff_id: str) -> Optional[Buff]:
+        buff = self._by_id.pop(buff_id, None)
+        if buff is not None:
+            self._items.remove(buff)
+        return buff
+
+    def sweep(self) -> List[Buff]:
+        """移除所有到期（持续时间或层数归零）的 buff 并返回它们"""
+        kept, expired = [], []
+        for buff in self._items:
+            (expired if buff.duration <= 0 or buff.current_stack <= 0 else kept).append(buff)
+        if expired:
+            self._items = kept
+            for buff in expired:
+                del self._by_id[buff.id]
+        return expired
 
 
 class Entity:
@@ -108,86 +129,73 @@ class Entity:
         self._MAX_HP = base_stats["MAX_HP"]
         self._HP = base_stats["MAX_HP"]
 
+        # 属性（基础值或 buff）每变一次加一，公式求值按它判断结果能否复用
+        self.stat_version = 0
+        # 所有 buff 对各属性的加成之和（每层数值 × 层数），层数变化时增量更新，读属性不用遍历 buff
+        self._buff_delta: Dict[str, float] = dict.fromkeys(BUFF_STATS, 0)
+
         # 战斗期可变状态
         self.is_alive = True
         self.skills: List[Any] = []
-        self.buffs: List[Buff] = []
+        self.buffs = BuffContainer()
         # 技能引擎
         self.engine = None
 
     # 属性访问器
     @property
     def ATK(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "ATK" in buff.property_change and buff.property_change["ATK"]:
-                value += buff.current_stack * buff.property_change["ATK"]
-        return max(0, self._ATK + value)
+        return max(0, self._ATK + self._buff_delta["ATK"])
 
     @ATK.setter
     def ATK(self, value):
         self._ATK = value
+        self.stat_version += 1
 
     @property
     def DEF(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "DEF" in buff.property_change and buff.property_change["DEF"]:
-                value += buff.current_stack * buff.property_change["DEF"]
         # 防御可以被减成负数
-        return self._DEF + value
+        return self._DEF + self._buff_delta["DEF"]
 
     @DEF.setter
     def DEF(self, value):
         self._DEF = value
+        self.stat_version += 1
 
     @property
     def AGI(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "AGI" in buff.property_change and buff.property_change["AGI"]:
-                value += buff.current_stack * buff.property_change["AGI"]
-        return max(0, self._AGI + value)
+        return max(0, self._AGI + self._buff_delta["AGI"])
 
     @AGI.setter
     def AGI(self, value):
         self._AGI = value
+        self.stat_version += 1
 
     @property
     def CRIT(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "CRIT" in buff.property_change and buff.property_change["CRIT"]:
-                value += buff.current_stack * buff.property_change["CRIT"]
-        return max(0, self._CRIT + value)
+        return max(0, self._CRIT + self._buff_delta["CRIT"])
 
     @CRIT.setter
     def CRIT(self, value):
         self._CRIT = value
+        self.stat_version += 1
 
     @property
     def MAX_HP(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "MAX_HP" in buff.property_change and buff.property_change["MAX_HP"]:
-                value += buff.current_stack * buff.property_change["MAX_HP"]
-        return max(0, self._MAX_HP + value)
+        return max(0, self._MAX_HP + self._buff_delta["MAX_HP"])
 
     @MAX_HP.setter
     def MAX_HP(self, value):
         self._MAX_HP = value
+        self.stat_version += 1
 
     @property
     def HP(self) -> float:
-        value = 0
-        for buff in self.buffs:
-            if "HP" in buff.property_change and buff.property_change["HP"]:
-                value += buff.current_stack * buff.property_change["HP"]
-        return max(0, self._HP + value)
+        return max(0, self._HP + self._buff_delta["HP"])
 
     @HP.setter
     def HP(self, value):
         self._HP = value
+        self.stat_version += 1
 
     # ===============适配新系统=============
     def take_damage(self, dmg_info: Dict[str, int]) -> float:
@@ -198,10 +206,11 @@ class Entity:
         # 计算实际伤害（考虑防御等）
         # 伤害减免率 = DEF / (DEF + 35) * 100%
         actual_damage = 0
-        if self.DEF >= 0:
-            damage_reduction = self.DEF / (self.DEF + 35)
+        defense = self.DEF
+        if defense >= 0:
+            damage_reduction = defense / (defense + 35)
         else:
-            damage_reduction = self.DEF / 20
+            damage_reduction = defense / 20
         for dmg_type, value in dmg_info.items():
             if dmg_type == "physical":
                 actual_damage += max(0, int(value * (1 - damage_reduction)))
@@ -211,10 +220,11 @@ class Entity:
         if actual_damage <= 0:
             actual_damage = 0
 
-        if actual_damage > self.HP:
-            actual_damage = self.HP
+        hp = self.HP
+        if actual_damage > hp:
+            actual_damage = hp
 
-        self.HP = max(0, self.HP - actual_damage)
+        self.HP = max(0, hp - actual_damage)
 
         # 检查死亡
         if self.HP <= 0:
@@ -227,7 +237,8 @@ class Entity:
         min_dodge = 0.01  # 1% minimum chance
         max_dodge = 0.99  # 99% maximum chance
 
-        prop = self.AGI / (self.AGI + 30)
+        agi = self.AGI
+        prop = agi / (agi + 30)
         prop = max(min_dodge, min(max_dodge, prop))  # Clamp between min and max
 
         return random.random() < prop
@@ -244,15 +255,26 @@ class Entity:
 
         return actual_heal
 
+    def _stack_changed(self, buff: Buff, delta: int):
+        """buff 层数变化 delta（移除时为负的当前层数），同步属性加成"""
+        if not delta or not buff.property_change:
+            return
+        for stat, value in buff.property_change.items():
+            self._buff_delta[stat] += value * delta
+        self.stat_version += 1
+
     def update_buffs(self):
-        """更新Buff持续时间"""
+        """更新Buff持续时间：所有 buff 先按 turn_end 结算一遍，再一次性清掉到期的"""
         for buff in self.buffs:
-            d = buff.changes_on_turn_end.get("duration", -1)
-            buff.duration += d
+            buff.duration += buff.changes_on_turn_end.get("duration", -1)
             s = buff.changes_on_turn_end.get("stack", -1)
             buff.current_stack += s
-            if buff.duration <= 0 or buff.current_stack <= 0:
-                self.buffs.remove(buff)
+            self._stack_changed(buff, s)
+        for buff in self.buffs.sweep():
+            self._stack_changed(buff, -buff.current_stack)
+        if not self.buffs:
+            # 没有 buff 时清零，避免小数加减留下的误差
+            self._buff_delta = dict.fromkeys(BUFF_STATS, 0)
 
     def update_skill_cooldowns(self):
         """更新技能冷却"""
@@ -265,37 +287,35 @@ class Entity:
         buff.source = source
         buff.current_stack = min(buff.max_stack, stacks)
 
-        for existing_buff in self.buffs:
-            if existing_buff.id != buff.id:
-                continue
-
-            # 找到相同ID的buff，根据堆叠类型处理
-            # 时间堆叠，加时间，重置层数
-            if existing_buff.stack_type == BuffStackType.DURATION:
-                existing_buff.duration += buff.duration
-                existing_buff.current_stack = buff.current_stack
-            # 层数堆叠，加层数，重置时间
-            elif existing_buff.stack_type == BuffStackType.INTENSITY:
-                existing_buff.current_stack = min(
-                    existing_buff.max_stack,
-                    existing_buff.current_stack + buff.current_stack
-                )
-                existing_buff.duration = buff.duration
-            # 时间&层数堆叠，加层数，加时间
-            elif existing_buff.stack_type == BuffStackType.BOTH:
-                existing_buff.duration += buff.duration
-                existing_buff.current_stack = min(
-                    existing_buff.max_stack,
-                    existing_buff.current_stack + buff.current_stack
-                )
-            return existing_buff.current_stack  # 无论哪种类型，处理完都返回
-
-        # 如果没有找到相同ID的buff，则添加新buff
-        self.buffs.append(buff)
-        return buff.current_stack
+        existing_buff = self.buffs.get(buff.id)
+        if existing_buff is None:
+            # 如果没有找到相同ID的buff，则添加新buff
+            self.buffs.add(buff)
+            self._stack_changed(buff, buff.current_stack)
+            return buff.current_stack
+
+        # 找到相同ID的buff，根据堆叠类型就地修改
+        old_stack = existing_buff.current_stack
+        stack_type = existing_buff.stack_type
+        # 时间堆叠，加时间，重置层数
+        if stack_type == BuffStackType.DURATION:
+            existing_buff.duration += buff.duration
+            existing_buff.current_stack = buff.current_stack
+        # 层数堆叠，加层数，重置时间
+        elif stack_type == BuffStackType.INTENSITY:
+            existing_buff.current_stack = min(existing_buff.max_stack, old_stack + buff.current_stack)
+            existing_buff.duration = buff.duration
+        # 时间&层数堆叠，加层数，加时间
+        elif stack_type == BuffStackType.BOTH:
+            existing_buff.duration += buff.duration
+            existing_buff.current_stack = min(existing_buff.max_stack, old_stack + buff.current_stack)
+        self._stack_changed(existing_buff, existing_buff.current_stack - old_stack)
+        return existing_buff.current_stack  # 无论哪种类型，处理完都返回
 
     def remove_buff(self, buff_id: str, reason: str = ""):
-        pass
+        buff = self.buffs.pop(buff_id)
+        if buff is not None:
+            self._stack_changed(buff, -buff.current_stack)
 
     def dispel(self, count: int = 1, positive: bool = True):
         pass
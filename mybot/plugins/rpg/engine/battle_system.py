@@ -1,12 +1,13 @@
 import queue
 import random
 from collections import defaultdict, deque
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from .event_bus import EventBus, BattleEvent
 from ..battle.entity import Entity
 from ..battle.event_info import EventInfo
 from ..util.buff_engine import apply_buff_effect
+from ..util.config_loader import ConfigLoader
 from ..util.event_chain_tracker import EventChainTracker
 
 
@@ -42,8 +43,8 @@ def _get_initiative(ent_a: Entity, ent_b: Entity):
 
 
 class BattleSystem:
-    def __init__(self):
-        self.event_bus = EventBus()
+    def __init__(self, config_loader: Optional[ConfigLoader] = None):
+        self.event_bus = EventBus(config_loader)
         self.units: List[Entity] = []
         self.current_round = 0
         self.is_battle_active = False
@@ -2,12 +2,12 @@ from collections import defaultdict
 from typing import Dict, List, Any, Callable, Optional
 
 from mybot.plugins.rpg.battle.event_info import EventInfo
-from mybot.plugins.rpg.util.config_loader import ConfigLoader
+from mybot.plugins.rpg.util.config_loader import ConfigLoader, get_config
 
 
 class EventBus:
-    config_loader = ConfigLoader()
-    def __init__(self):
+    def __init__(self, config_loader: Optional[ConfigLoader] = None):
+        self.config_loader = config_loader or get_config()
         self._listeners: Dict[str, List[tuple]] = {}
         self._event_type_count: Dict[str, Dict[Any, int]] = defaultdict(lambda: defaultdict(int))
 
@@ -6,9 +6,9 @@ from typing import Any, Dict, List, Optional
 import random
 import math
 import pathlib
-import yaml
 
 from ..battle.entity import Entity
+from ..util.config_bundle import load_yaml
 
 
 # ===== 基础：上下文与表达式求值 =====
@@ -62,17 +62,17 @@ class SkillEngine:
     # ---------- 表加载 ----------
     def _load_tables(self):
         if self._skills_path.exists():
-            skills = yaml.safe_load(self._skills_path.read_text(encoding="utf-8")) or []
+            skills = load_yaml(self._skills_path) or []
             self.skill_defs = {
                 s["id"]: s for s in skills if isinstance(s, dict) and "id" in s
             }
         if self._buffs_path.exists():
-            buffs = yaml.safe_load(self._buffs_path.read_text(encoding="utf-8")) or []
+            buffs = load_yaml(self._buffs_path) or []
             self.buff_defs = {
                 b["id"]: b for b in buffs if isinstance(b, dict) and "id" in b
             }
         if self._equip_path.exists():
-            equip = yaml.safe_load(self._equip_path.read_text(encoding="utf-8")) or {}
+            equip = load_yaml(self._equip_path) or {}
             self.equip_rules = list(equip.get("rules", []))
 
     # ---------- 装备→技能规则 ----------
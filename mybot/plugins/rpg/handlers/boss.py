@@ -6,7 +6,7 @@ from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch
 
 from ..logic_battle import simulate_duel_with_skills
-from ..models import get_boss, put_boss, get_player, put_player, get_players_by_gid, put_players
+from ..models import aget_boss, aput_boss, aget_player, aput_player, agrant_group, boss_lock, boss_board_text
 from ..utils import ids_of
 
 boss_info_m = on_fullmatch(("boss", "BOSS", "世界boss", "世界BOSS"))
@@ -16,20 +16,11 @@ boss_hit_m = on_fullmatch(("出刀", "打boss", "攻打boss"))
 @boss_info_m.handle()
 async def _(event: MessageEvent):
     gid = str(getattr(event, "group_id", 0))
-    b = get_boss(gid)
+    b = await aget_boss(gid)
     pct = int(100 * b.hp / b.hp_max) if b.hp_max else 0
 
-    # ...排行榜处理...
-    if b.board:
-        rank_list = sorted(b.board.items(), key=lambda x: x[1], reverse=True)
-        rank_str = ""
-        for i, (uid, dmg) in enumerate(rank_list[:10]):
-            player = get_player(uid, gid, None)
-            pname = getattr(player, "name", uid)
-            rank_str += f"{i + 1}. {pname}：{dmg}伤害\n"
-        rank_str = f"\n【伤害排行榜】\n{rank_str.strip()}"
-    else:
-        rank_str = "\n【伤害排行榜】\n暂无出刀记录"
+    # 前 10 名和名字都在 BOSS 记录里，文本缓存到下一次出刀
+    rank_str = f"\n【伤害排行榜】\n{boss_board_text(b)}"
 
     await boss_info_m.finish(
         f"【BOSS】{b.name}  HP {b.hp}/{b.hp_max}（{pct}%）  已击杀：{'是' if b.killed else '否'}"
@@ -41,42 +32,42 @@ async def _(event: MessageEvent):
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
 
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     if p.counters.boss_hits >= 3:
         await boss_hit_m.finish("今天出刀次数已用完（3/3）")
 
-    b = get_boss(gid)
-    if b.killed or b.hp <= 0:
-        await boss_hit_m.finish("今日BOSS已击杀")
-    before = b.hp
-    print(b)
-
-    # 直接用 boss 名称作为怪物ID，要求 monsters.yaml 里有同名boss定义
-    result, logs, boss_left_hp = simulate_duel_with_skills(p, b.name, b.hp)
-    log_str = "\n".join(logs)
-
-    damage_dealt = max(0, before - boss_left_hp)
-    # 奖励结算
-    dia = int(200 + damage_dealt * 8 * random.random())
-    dus = int(100 + damage_dealt * 4 * random.random())
-    p.diamond += dia
-    p.dust += dus
-    p.counters.boss_hits += 1
-    put_player(p)
-
-    # 更新Boss与排行榜
-    b.hp = max(0, boss_left_hp)
-    if b.hp == 0:
-        b.killed = True
-        players = get_players_by_gid(gid)
-        for player in players:
-            player.tear += 1
-        put_players(players)
+    # 读 BOSS 到写回之间有 await，同群出刀要排队，否则血量和排行榜会互相覆盖
+    async with boss_lock(gid):
+        b = await aget_boss(gid)
+        if b.killed or b.hp <= 0:
+            await boss_hit_m.finish("今日BOSS已击杀")
+        before = b.hp
+        print(b)
+
+        # 直接用 boss 名称作为怪物ID，要求 monsters.yaml 里有同名boss定义
+        result, logs, boss_left_hp = simulate_duel_with_skills(p, b.name, b.hp)
+        log_str = "\n".join(logs)
+
+        damage_dealt = max(0, before - boss_left_hp)
+        # 奖励结算
+        dia = int(200 + damage_dealt * 8 * random.random())
+        dus = int(100 + damage_dealt * 4 * random.random())
+        p.diamond += dia
+        p.dust += dus
+        p.counters.boss_hits += 1
+        await aput_player(p)
+
+        # 更新Boss与排行榜
+        b.hp = max(0, boss_left_hp)
+        if b.hp == 0:
+            b.killed = True
+            await agrant_group(gid, "tear", 1)
+        b.record_hit(uid, p.name, damage_dealt)
+        await aput_boss(b)
+
+    if b.killed:
         await boss_hit_m.send(f"BOSS[{b.name}]已击杀，本群所有人玩法发放：女神之泪💧x1")
 
-    b.board[uid] = b.board.get(uid, 0) + damage_dealt
-    put_boss(b)
-
     await boss_hit_m.finish(
         f"{p.name} 对BOSS造成 {damage_dealt} 伤害\n"
         f"BOSS 剩余：{b.hp}/{b.hp_max}\n"
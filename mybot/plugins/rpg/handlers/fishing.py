@@ -5,8 +5,7 @@ from nonebot.plugin.on import on_fullmatch
 
 from mybot.plugins.rpg.logic_battle import simulate_pvp_with_skills
 from mybot.plugins.rpg.logic_economy import get_fish, get_counter
-from mybot.plugins.rpg.models import get_player, put_player, Player
-from mybot.plugins.rpg.storage import load_players
+from mybot.plugins.rpg.models import aget_player, aput_player, aput_players, asample_group_player
 from mybot.plugins.rpg.utils import ids_of
 
 cmd_fishing = on_fullmatch("钓鱼")
@@ -15,7 +14,7 @@ cmd_fishing = on_fullmatch("钓鱼")
 @cmd_fishing.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     if p.diamond < 10:
         await cmd_fishing.finish(f"就这么点钻石还想钓鱼？ 剩余钻石:{p.diamond}💎")
     fish_result = ""
@@ -25,6 +24,8 @@ async def _(event: MessageEvent):
     fish_result += "∠( ᐛ 」∠)＿ ～～～🐟\n"
     fish_result += "(￣￣￣￣￣￣￣￣￣)ｼﾞｰｯ🎣\n"
     p.diamond -= 10
+    # 要写回的玩家；打赢 / 打输对手时把对手也加进来，一起提交
+    changed = [p]
     r = random.random()
     if r < 0.7:
         fish_get, pool_msg = get_fish(gid)
@@ -54,20 +55,16 @@ async def _(event: MessageEvent):
         fish_result += f"💎 获得战利品：100钻石\n"
         p.diamond += 100
     else:
-        data = load_players()
-        player_in_same_group = []
-        for player_key, player_data in data.items():
-            if player_data['gid'] == gid and player_data['uid'] != uid:
-                player_in_same_group.append(player_data)
+        # 按群索引随机抽一个对手，只加载这一个玩家
+        player_to_battle = await asample_group_player(gid, exclude=uid)
         # 如果为空跳过
-        if not player_in_same_group:
+        if player_to_battle is None:
             fish_result += "风平浪静，无事发生。你既没有钓到鱼，也没有遇到任何奇遇。"
-            put_player(p)
+            await aput_player(p)
             fish_result += f"结算数据：剩余钻石:{p.diamond}💎"
             await cmd_fishing.finish(fish_result)
             return
 
-        player_to_battle = Player.from_dict(random.choice(player_in_same_group))
         result, logs = simulate_pvp_with_skills(p, player_to_battle)
         fish_result += f"遭遇：{player_to_battle.name}！\n眼神对视，战斗无法避免！\n"
         for log in logs:
@@ -78,17 +75,17 @@ async def _(event: MessageEvent):
                 diamond_change = player_to_battle.diamond
             p.diamond += diamond_change
             player_to_battle.diamond -= diamond_change
-            put_player(player_to_battle)
+            changed.append(player_to_battle)
             fish_result += f"战斗胜利！成功从{player_to_battle.name}手中夺得了{diamond_change}颗钻石！✨"
         elif result == player_to_battle.name:
             if diamond_change > p.diamond:
                 diamond_change = p.diamond
             p.diamond -= diamond_change
             player_to_battle.diamond += diamond_change
-            put_player(player_to_battle)
+            changed.append(player_to_battle)
             fish_result += f"战斗失利……{player_to_battle.name}从你这里夺走了{diamond_change}颗钻石💎"
         elif result is None:
             pass
-    put_player(p)
+    await aput_players(changed)
     fish_result += f"结算数据：剩余钻石:{p.diamond}💎"
     await cmd_fishing.finish(fish_result)
@@ -5,7 +5,7 @@ from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch, on_startswith
 
 from ..logic_economy import gacha10_to_dust, gacha_num_to_dust
-from ..models import get_player, put_player
+from ..models import amodify_player
 from ..utils import ids_of
 
 gacha_m = on_fullmatch(("十连", "抽卡"), priority=10,block=True)
@@ -13,15 +13,21 @@ gacha_m = on_fullmatch(("十连", "抽卡"), priority=10,block=True)
 @gacha_m.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    if p.diamond < 1500:
-        await gacha_m.finish(f"钻石不足，当前{p.diamond}")
-    p.diamond -= 1500
-    dust, stat = gacha10_to_dust()
-    p.dust += dust
-    put_player(p)
+
+    def draw(p):
+        if p.diamond < 1500:
+            return False, p.diamond, None
+        p.diamond -= 1500
+        dust, stat = gacha10_to_dust()
+        p.dust += dust
+        return True, p.diamond, (dust, stat)
+
+    ok, diamond, res = await amodify_player(uid, gid, name, draw)
+    if not ok:
+        await gacha_m.finish(f"钻石不足，当前{diamond}")
+    dust, stat = res
     await gacha_m.finish(
-        f"十连完成：{stat}\n总计获得粉尘：{dust}✨,剩余钻石：{p.diamond}"
+        f"十连完成：{stat}\n总计获得粉尘：{dust}✨,剩余钻石：{diamond}"
     )
 
 
@@ -47,13 +53,19 @@ async def num_gacha(event: MessageEvent):
         await gacha_m_100.finish("指令格式错误，请使用「抽卡+数字」，例如：抽卡100")
 
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    if p.diamond < 150 * num:
-        await gacha_m_100.finish(f"钻石不足，当前{p.diamond}💎，需要{150 * num}💎")
-    p.diamond -= 150 * num
-    dust, stat = gacha_num_to_dust(num)
-    p.dust += dust
-    put_player(p)
+
+    def draw(p):
+        if p.diamond < 150 * num:
+            return False, p.diamond, None
+        p.diamond -= 150 * num
+        dust, stat = gacha_num_to_dust(num)
+        p.dust += dust
+        return True, p.diamond, (dust, stat)
+
+    ok, diamond, res = await amodify_player(uid, gid, name, draw)
+    if not ok:
+        await gacha_m_100.finish(f"钻石不足，当前{diamond}💎，需要{150 * num}💎")
+    dust, stat = res
     await gacha_m_100.finish(
-        f"抽卡完成：{stat}\n总计获得粉尘：{dust}✨，剩余钻石：{p.diamond}💎"
+        f"抽卡完成：{stat}\n总计获得粉尘：{dust}✨，剩余钻石：{diamond}💎"
     )
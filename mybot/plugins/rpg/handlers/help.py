@@ -2,7 +2,7 @@
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch
 
-from mybot.plugins.rpg.models import get_player, put_player
+from mybot.plugins.rpg.models import amodify_player
 from mybot.plugins.rpg.utils import ids_of
 
 help_m = on_fullmatch(("帮助", "菜单", "指令", "help"))
@@ -30,25 +30,34 @@ battle_report_cmd_0 = on_fullmatch("完整战报")
 @battle_report_cmd_0.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    p.config.battle_report_model = 0
-    put_player(p)
-    await battle_report_cmd_0.finish(f"{p.name}已调整为完整战报模式：显示所有对战日志")
+
+    def set_model(p):
+        p.config.battle_report_model = 0
+        return p.name
+
+    player_name = await amodify_player(uid, gid, name, set_model)
+    await battle_report_cmd_0.finish(f"{player_name}已调整为完整战报模式：显示所有对战日志")
 
 battle_report_cmd_1 = on_fullmatch("精简战报")
 @battle_report_cmd_1.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    p.config.battle_report_model = 1
-    put_player(p)
-    await battle_report_cmd_1.finish(f"{p.name}已调整为精简战报模式：只显示每回合主要动作")
+
+    def set_model(p):
+        p.config.battle_report_model = 1
+        return p.name
+
+    player_name = await amodify_player(uid, gid, name, set_model)
+    await battle_report_cmd_1.finish(f"{player_name}已调整为精简战报模式：只显示每回合主要动作")
 
 battle_report_cmd_2 = on_fullmatch("无战报")
 @battle_report_cmd_2.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    p.config.battle_report_model = 2
-    put_player(p)
-    await battle_report_cmd_2.finish(f"{p.name}已调整为无战报模式：只显示结果")
\ No newline at end of file
+
+    def set_model(p):
+        p.config.battle_report_model = 2
+        return p.name
+
+    player_name = await amodify_player(uid, gid, name, set_model)
+    await battle_report_cmd_2.finish(f"{player_name}已调整为无战报模式：只显示结果")
\ No newline at end of file
@@ -3,7 +3,7 @@ from nonebot import on_keyword
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch
 
-from ..storage import load_players
+from ..models import aget_group_views
 
 list_m = on_fullmatch(("列表", "成员", "玩家"))
 
@@ -11,6 +11,6 @@ list_m = on_fullmatch(("列表", "成员", "玩家"))
 @list_m.handle()
 async def _(event: MessageEvent):
     gid = str(getattr(event, "group_id", 0))
-    db = load_players()  # 还是字典，但字段结构与 OOP to_dict 对齐
-    names = [raw.get("name") for raw in db.values() if raw.get("gid") == gid]
+    # 缓存里的直接用（未落盘的改名也能看到），其余只读 name 字段
+    names = [p.name for p in await aget_group_views(gid, ["name"])]
     await list_m.finish("本群玩家：" + ("、".join(names) if names else "暂无"))
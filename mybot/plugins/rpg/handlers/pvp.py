@@ -2,7 +2,7 @@
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import MessageEvent, Bot
 
-from ..models import get_player
+from ..models import aget_player
 from ..logic_battle import simulate_pvp_with_skills
 from ..utils import ids_of, first_at
 
@@ -25,9 +25,9 @@ async def _(event: MessageEvent, bot: Bot):
         await pvp_m.finish("用法：对战 @某人")
 
     # 加载双方玩家（OOP）
-    a = get_player(uid, gid, name)
+    a = await aget_player(uid, gid, name)
     info = await bot.get_group_member_info(group_id=int(gid), user_id=int(target))
-    b = get_player(target, gid, info.get("card") or info.get("nickname") or target)
+    b = await aget_player(target, gid, info.get("card") or info.get("nickname") or target)
 
     # 使用新版PVP接口
     result, logs = simulate_pvp_with_skills(a, b)
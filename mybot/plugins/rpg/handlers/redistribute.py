@@ -2,7 +2,7 @@ import re
 
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import MessageEvent
-from ..models import get_player, put_player, Points
+from ..models import aget_player, aput_player, Points
 from ..utils import ids_of
 
 # 匹配“加点99080”或“加点 99080”等格式
@@ -12,7 +12,7 @@ redistribute_m = on_regex(r"^加点\s*([0-9]{5})")
 @redistribute_m.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     re_match = event.get_plaintext().strip()
     import re
 
@@ -32,7 +32,7 @@ async def _(event: MessageEvent):
     p.points = Points(
         str=points[0], def_=points[1], hp=points[2], agi=points[3], crit=points[4]
     )
-    put_player(p)
+    await aput_player(p)
     await redistribute_m.finish(
         f"{p.name} 的点数已分配为：力量{points[0]}、防御{points[1]}、体力{points[2]}、敏捷{points[3]}、暴击{points[4]}（共{sum(points)}点）"
     )
@@ -62,10 +62,11 @@ async def _(event: MessageEvent):
         await cmd_distribute.finish(f"无效的属性！可用选项：{'、'.join(allowed_options)}")
 
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     if p.tear < 1:
         await cmd_distribute.finish(f"女神之泪不足,无法提升属性")
     # 处理有效的属性升级
     p.extra_distribute(attribute)
+    await aput_player(p)
 
     await cmd_distribute.finish(f"升级完成！当前属性:\n" + p.get_point_detail())
@@ -5,7 +5,7 @@ import re
 from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch, on_startswith, on_keyword
 
-from ..models import get_player, put_player
+from ..models import aget_player, aput_player
 from ..utils import ids_of
 
 weapon_upgrade = on_fullmatch("升级武器")
@@ -14,11 +14,11 @@ weapon_upgrade = on_fullmatch("升级武器")
 @weapon_upgrade.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     res, msg, offset = p.weapon.upgrade()
     if res:
         p.dust += offset
-        put_player(p)
+        await aput_player(p)
     await weapon_upgrade.finish(msg)
 
 
@@ -45,7 +45,7 @@ async def _(event: MessageEvent):
         await refine_num.finish("指令格式错误，请使用「精炼+数字」，例如：精炼100")
 
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
     msg = ""
     count = 0
@@ -89,5 +89,5 @@ async def _(event: MessageEvent):
         if count < num:
             msg += f"\n你的粉尘✨好像花完了，快去看看吧"
 
-    put_player(p)
+    await aput_player(p)
     await refine_num.finish(msg)
@@ -2,12 +2,12 @@ import pathlib
 import random
 from typing import Dict, Any, Optional
 
-import yaml
 from nonebot.adapters.onebot.v11 import MessageEvent, Bot
 from nonebot.plugin.on import on_keyword
 
-from mybot.plugins.rpg.models import get_player, put_player
+from mybot.plugins.rpg.models import aget_player, aput_players, lock_players
 from mybot.plugins.rpg.penalty_manager import PenaltyManager
+from mybot.plugins.rpg.util.config_bundle import load_yaml
 from mybot.plugins.rpg.utils import ids_of, first_at
 
 
@@ -15,8 +15,7 @@ from mybot.plugins.rpg.utils import ids_of, first_at
 def load_rob_config():
     root = pathlib.Path(__file__).resolve().parent.parent  # .../rpg
     config_path = root / "data" / "rob_events.yaml"
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return load_yaml(config_path)
 
 
 rob_config = load_rob_config()
@@ -86,52 +85,53 @@ async def handle_rob(event: MessageEvent, bot: Bot):
     if not can_rob:
         await rob.finish(reason)
 
-    # 加载双方玩家（OOP）
-    a = get_player(uid, gid, name)
     info = await bot.get_group_member_info(group_id=int(gid), user_id=int(target))
-    b = get_player(target, gid, info.get("card") or info.get("nickname") or target)
-
-    # 模拟抢夺结果
-    success = random.random() < rob_config["base_config"]["success_rate"]
-
-    amount = random.randint(1, 200)
-    if success:
-        # 抢夺成功
-        amount, _ = penalty_manager.apply_diamond_penalty(b, a, amount)
-        result_message = (
-            f"🎯 抢夺成功！\n"
-            f"{name} 从 {b.name} 那里抢到了 {amount} 个💎！\n"
-            f"当前钻石：{a.diamond}💎"
-        )
-    else:
-        # 抢夺失败
-        failure_event = failure_manager.get_random_failure_event()
-        penalty_data = failure_manager.get_random_penalty()
-
-        result_message = f"❌ 抢夺失败！\n" f"{name} {failure_event}"
-        # 应用惩罚效果
-        penalty_type = penalty_data["type"]
-        effect = penalty_data["effect"]
-        if penalty_type == "cooldown":
-            # 时间惩罚
-            duration = effect["duration"]
-            penalty_text = penalty_manager.apply_time_penalty(uid, duration)
-            result_message += f"\n{penalty_text}"
-        elif penalty_type == "blacklist":
-            # 黑名单惩罚
-            duration = effect["duration"]
-            penalty_text = penalty_manager.apply_blacklist_penalty(
-                uid, target, duration
+    # 读双方到写回之间有 await，锁住两人，并发的抢夺 / 其他命令不会覆盖钻石变动
+    async with lock_players(gid, uid, target):
+        a = await aget_player(uid, gid, name)
+        b = await aget_player(target, gid, info.get("card") or info.get("nickname") or target)
+
+        # 模拟抢夺结果
+        success = random.random() < rob_config["base_config"]["success_rate"]
+
+        amount = random.randint(1, 200)
+        if success:
+            # 抢夺成功
+            amount, _ = penalty_manager.apply_diamond_penalty(b, a, amount)
+            result_message = (
+                f"🎯 抢夺成功！\n"
+                f"{name} 从 {b.name} 那里抢到了 {amount} 个💎！\n"
+                f"当前钻石：{a.diamond}💎"
             )
-            result_message += f"\n{penalty_text}"
-        elif penalty_type == "diamond":
-            _, penalty_text = penalty_manager.apply_diamond_penalty(a, b, amount)
-            result_message += f"\n{penalty_text}"
         else:
-            # 其他惩罚
-            result_message += f"\n{penalty_data['penalty']}"
-
-        result_message += "\n⚠️ 下次小心点哦～"
-    put_player(a)
-    put_player(b)
+            # 抢夺失败
+            failure_event = failure_manager.get_random_failure_event()
+            penalty_data = failure_manager.get_random_penalty()
+
+            result_message = f"❌ 抢夺失败！\n" f"{name} {failure_event}"
+            # 应用惩罚效果
+            penalty_type = penalty_data["type"]
+            effect = penalty_data["effect"]
+            if penalty_type == "cooldown":
+                # 时间惩罚
+                duration = effect["duration"]
+                penalty_text = penalty_manager.apply_time_penalty(uid, duration)
+                result_message += f"\n{penalty_text}"
+            elif penalty_type == "blacklist":
+                # 黑名单惩罚
+                duration = effect["duration"]
+                penalty_text = penalty_manager.apply_blacklist_penalty(
+                    uid, target, duration
+                )
+                result_message += f"\n{penalty_text}"
+            elif penalty_type == "diamond":
+                _, penalty_text = penalty_manager.apply_diamond_penalty(a, b, amount)
+                result_message += f"\n{penalty_text}"
+            else:
+                # 其他惩罚
+                result_message += f"\n{penalty_data['penalty']}"
+
+            result_message += "\n⚠️ 下次小心点哦～"
+        # 双方一起提交：任一方版本冲突就都不写，钻石不会凭空多出或消失
+        await aput_players([a, b])
     await rob.finish(result_message)
@@ -6,16 +6,16 @@ from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.plugin.on import on_fullmatch, on_regex
 
 from mybot.plugins.rpg.handlers.wild import format_chinese
-from mybot.plugins.rpg.models import get_player, put_player, equip_skill, get_skill, level_up_skill, forget_skill, \
+from mybot.plugins.rpg.models import aget_player, aput_player, equip_skill, get_skill, level_up_skill, forget_skill, \
     unequip_skill
-from mybot.plugins.rpg.util.config_loader import ConfigLoader
+from mybot.plugins.rpg.util.config_loader import get_config
 from mybot.plugins.rpg.utils import ids_of
 
 _skill_info = on_fullmatch("技能")
 
 @_skill_info.handle()
 async def _():
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skill_dict = config_loader.get_all_skills()
     res = "目前已实装的技能如下：\n"
     for _, skill_data in skill_dict.items():
@@ -28,13 +28,13 @@ _get_skill = on_fullmatch(("抽技能","抽取技能"))
 
 @_get_skill.handle()
 async def _(event: MessageEvent):
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     if p.dust < 2000:
         await _get_skill.finish(f"粉尘不足，当前{p.dust}")
-    p.dust -= 2000
+    # p 是缓存里的同一个实例：提前 finish 的分支不能先改它，扣粉尘放到写回之前
 
     # 增加随机事件
     event_chance = random.randint(1, 100)
@@ -66,6 +66,7 @@ async def _(event: MessageEvent):
         ]
         # 随机补偿50-150钻石
         diamond_compensation = random.randint(100, 2000)
+        p.dust -= 2000
         p.diamond += diamond_compensation  # 假设玩家对象有diamond属性
 
         # 随机选择一个事件
@@ -77,7 +78,7 @@ async def _(event: MessageEvent):
         full_message = event_message + '\n' + compensation_message
         print(full_message)
 
-        put_player(p)
+        await aput_player(p)
         await _get_skill.finish(full_message)
         return
 
@@ -90,8 +91,9 @@ async def _(event: MessageEvent):
     # 从技能映射中随机选择一个技能ID
     random_skill_id = random.choice(available_skills)
 
+    p.dust -= 2000
     res, ans = get_skill(p, random_skill_id, skills_map)
-    put_player(p)
+    await aput_player(p)
     await _get_skill.finish(ans)
 
 
@@ -101,11 +103,11 @@ _show_skills = on_fullmatch("查看技能")
 
 @_show_skills.handle()
 async def _(event: MessageEvent):
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
 
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
     # 创建数字到技能的映射
 
     skill_map = {i: skill_name for i, skill_name in enumerate(p.skills.keys(), start=1)}
@@ -143,13 +145,12 @@ _level_up_skill = on_regex(r"^升级技能([1-9])$")
 @_level_up_skill.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
     if p.dust < 2000:
         await _get_skill.finish(f"粉尘不足，当前{p.dust}")
-    p.dust -= 2000
 
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
 
     # 获取消息文本
@@ -171,17 +172,17 @@ async def _(event: MessageEvent):
         return
 
     res, msg = level_up_skill(p, skill_id, skills_map)
-    if not res:
-        p.dust += 2000
-    put_player(p)
+    if res:
+        p.dust -= 2000
+        await aput_player(p)
     await _level_up_skill.finish(msg)
 
 _forget_skill = on_regex(r"^遗忘技能([1-9])$")
 @_forget_skill.handle()
 async def _(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
-    config_loader = ConfigLoader()
+    p = await aget_player(uid, gid, name)
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
 
     # 获取消息文本
@@ -202,15 +203,17 @@ async def _(event: MessageEvent):
         return
 
     res, msg = forget_skill(p, skill_id, skills_map)
+    if res:
+        await aput_player(p)
     await _forget_skill.finish(msg)
 
 _equip_skill = on_regex(r"^技能([1-9])$")
 @_equip_skill.handle()
 async def choose_expedition(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
 
     # 获取消息文本
@@ -232,15 +235,17 @@ async def choose_expedition(event: MessageEvent):
         return
 
     res, msg = equip_skill(p, skill_id, skills_map)
+    if res:
+        await aput_player(p)
     await _equip_skill.finish(msg)
 
 _unequip_skill = on_regex(r"^卸载技能([1-9])$")
 @_unequip_skill.handle()
 async def choose_expedition(event: MessageEvent):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
 
     # 获取消息文本
@@ -263,4 +268,6 @@ async def choose_expedition(event: MessageEvent):
     skill_id = p.equipped_skills[choice]
 
     res, msg = unequip_skill(p, skill_id, skills_map)
+    if res:
+        await aput_player(p)
     await _unequip_skill.finish(msg)
\ No newline at end of file
@@ -1,16 +1,15 @@
 # -*- coding: utf-8 -*-
-import pathlib
 import random
 import re
-from typing import Dict
 
-import yaml
 from nonebot import on_fullmatch
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import MessageEvent
 
+from mybot.plugins.rpg.battle.catalog import get_catalog
 from mybot.plugins.rpg.logic_battle import simulate_duel_with_skills
-from mybot.plugins.rpg.models import get_player, put_player
+from mybot.plugins.rpg.models import aget_player, aput_player
+from mybot.plugins.rpg.util.config_defs import MonsterDef
 from mybot.plugins.rpg.utils import ids_of
 
 wildStart_m = on_fullmatch(("发起远征", "远征"))
@@ -21,13 +20,6 @@ wildend_m = on_fullmatch("结束远征")
 expedition_state = {}
 
 
-# === 工具：加载怪物定义 ===
-def _load_monsters() -> Dict:
-    path = pathlib.Path(__file__).resolve().parent.parent / "battle" / "monsters.yaml"
-    data = yaml.safe_load(path.read_text(encoding="utf-8")) or []
-    return data
-
-
 def get_expedition_key(event: MessageEvent):
     return f"{event.user_id}_{getattr(event, 'group_id', 0)}"
 
@@ -61,27 +53,27 @@ def build_monster_msg(selected_monsters, width=15):
     reply_msg += '\n'
     reply_msg += "名称："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(monster['name'], width)}"
+        reply_msg += f"{format_chinese(monster.name, width)}"
     reply_msg += '\n'
     reply_msg += "血量："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(monster['MAX_HP'], width)}"
+        reply_msg += f"{format_chinese(monster.MAX_HP, width)}"
     reply_msg += '\n'
     reply_msg += "攻击："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(monster['ATK'], width)}"
+        reply_msg += f"{format_chinese(monster.ATK, width)}"
     reply_msg += '\n'
     reply_msg += "防御："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(monster['DEF'], width)}"
+        reply_msg += f"{format_chinese(monster.DEF, width)}"
     reply_msg += '\n'
     reply_msg += "敏捷："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(monster['AGI'], width)}"
+        reply_msg += f"{format_chinese(monster.AGI, width)}"
     reply_msg += '\n'
     reply_msg += "暴击："
     for i, monster in enumerate(selected_monsters, 1):
-        reply_msg += f"{format_chinese(int(monster['CRIT'] * 100), width)}"
+        reply_msg += f"{format_chinese(int(monster.CRIT * 100), width)}"
     reply_msg += '\n'
     return reply_msg
 
@@ -90,7 +82,7 @@ def build_monster_msg(selected_monsters, width=15):
 async def start_expedition(event: MessageEvent):
     # 加载玩家数据
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
     reply_msg = ""
     if p.counters.free_explore_used < 2:
@@ -103,14 +95,9 @@ async def start_expedition(event: MessageEvent):
         await wildStart_m.finish(reply_msg)
         return
 
-    put_player(p)
-    # 加载怪物数据
-    monsters_data = _load_monsters()
-
-    # 首先筛选出所有等级为1的怪物
-    selected_monsters = [monster for monster in monsters_data if monster['level'] == 1 and monster['tag'] == 'monster']
-    # 随机选择3个怪物
-    selected_monsters = random.sample(selected_monsters, 3)
+    await aput_player(p)
+    # 从等级为1的怪物里随机选择3个
+    selected_monsters = get_catalog().sample("monster", (1, 1), 3)
 
     # 存储选择状态
     key = get_expedition_key(event)
@@ -131,7 +118,7 @@ async def start_expedition(event: MessageEvent):
 @wildChoose_m.handle()
 async def choose_expedition(event: MessageEvent, match=wildChoose_m):
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
     key = get_expedition_key(event)
 
@@ -159,30 +146,21 @@ async def choose_expedition(event: MessageEvent, match=wildChoose_m):
     round = state["round"]
 
     # 直接用 boss 名称作为怪物ID，要求 monsters.yaml 里有同名boss定义
-    winner, logs, _ = simulate_duel_with_skills(p, selected_monster['name'], max_turns=10)
+    winner, logs, _ = simulate_duel_with_skills(p, selected_monster.name, max_turns=10)
     result_msg = "\n".join(logs)
 
     if winner == p.name:
         round += 1
         # 计算奖励
         reward = calculate_reward(selected_monster)
-        result_msg += f" 你击败了{selected_monster['name']}！\n"
-
-        monsters_data = _load_monsters()
-        # 首先筛选出所有等级为1的怪物
+        result_msg += f" 你击败了{selected_monster.name}！\n"
 
         round_threshold = int(round / 3)
         min_level = min(5, round_threshold - 1)
         max_level = 1 + round_threshold
 
-        selected_monsters = [
-            monster for monster in monsters_data
-            if min_level <= monster['level'] <= max_level
-               and monster['tag'] == 'monster'
-        ]
-
-        # 随机选择3个怪物
-        selected_monsters = random.sample(selected_monsters, 3)
+        # 随机选择3个等级在区间内的怪物
+        selected_monsters = get_catalog().sample("monster", (min_level, max_level), 3)
         # 存储选择状态
         key = get_expedition_key(event)
 
@@ -199,7 +177,7 @@ async def choose_expedition(event: MessageEvent, match=wildChoose_m):
         result_msg += "\n回复「远征1」、「远征2」或「远征3」来选择目标"
 
     else:
-        result_msg += f"远征失败！{selected_monster['name']}太强大了，你被迫撤退。"
+        result_msg += f"远征失败！{selected_monster.name}太强大了，你被迫撤退。"
         del expedition_state[key]
 
     # 清除状态
@@ -214,18 +192,18 @@ async def end_wild(event: MessageEvent):
     reward = state["diamond"]
 
     uid, gid, name = ids_of(event)
-    p = get_player(uid, gid, name)
+    p = await aget_player(uid, gid, name)
 
     p.diamond += reward
-    put_player(p)
+    await aput_player(p)
 
     del expedition_state[key]
     await wildend_m.finish(f"结束远征，获得{reward}钻石💎")
 
 
-def calculate_reward(monster: Dict) -> int:
+def calculate_reward(monster: MonsterDef) -> int:
     """根据怪物等级计算奖励"""
-    level = monster["level"]
+    level = monster.level
     base_exp = 100 * (1.8 ** (level - 1))
     # 添加 ±10% 的随机浮动
     random_factor = random.uniform(0.9, 1.1)  # 90% 到 110% 之间的随机数
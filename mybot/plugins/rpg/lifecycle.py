@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+插件生命周期：选择存储后端，玩家缓存 / 抢夺惩罚定时落盘，定时增量备份，bot 关闭时再落盘一次；
+处理函数写玩家时遇到版本冲突（StaleWriteError）统一提示用户重发指令
+可在 .env 中配置：
+- RPG_PLAYER_BACKEND：玩家存储后端 sqlite / journal（按群分片），默认 sqlite
+- RPG_STORAGE_FORMAT：记录写入格式 binary / json，默认 binary（读取时两种都认）
+- RPG_FLUSH_INTERVAL：玩家 / 抢夺惩罚定时落盘间隔（秒），默认 30
+- RPG_PLAYER_CACHE_SIZE：内存中最多缓存的玩家数，默认 2048
+- RPG_BACKUP_INTERVAL：增量备份间隔（秒），默认 3600，0 为关闭
+- RPG_BACKUP_KEEP_DAYS：备份保留天数，更早的恢复点合并成一个全量段，默认 7
+"""
+from typing import Optional
+
+from nonebot import get_driver, require
+from nonebot.adapters import Bot, Event
+from nonebot.message import run_postprocessor
+
+require("nonebot_plugin_apscheduler")
+from nonebot_plugin_apscheduler import scheduler  # noqa: E402
+
+from .models import aflush_players, flush_players, set_player_cache_size  # noqa: E402
+from .penalty_manager import flush_penalties  # noqa: E402
+from .storage import backup_now, prune_backups, set_player_backend, set_storage_format  # noqa: E402
+from .storage.aio import run_io, shutdown_executor  # noqa: E402
+from .storage.cache import DEFAULT_MAX_SIZE, StaleWriteError  # noqa: E402
+
+driver = get_driver()
+set_player_backend(str(getattr(driver.config, "rpg_player_backend", "sqlite")))
+set_storage_format(str(getattr(driver.config, "rpg_storage_format", "binary")))
+flush_interval = int(getattr(driver.config, "rpg_flush_interval", 30))
+backup_interval = int(getattr(driver.config, "rpg_backup_interval", 3600))
+backup_keep_days = float(getattr(driver.config, "rpg_backup_keep_days", 7))
+set_player_cache_size(int(getattr(driver.config, "rpg_player_cache_size", DEFAULT_MAX_SIZE)))
+
+# 同步任务由 apscheduler 丢到线程池执行，不占事件循环
+scheduler.add_job(flush_players, "interval", seconds=flush_interval, id="rpg_flush_players", replace_existing=True)
+scheduler.add_job(flush_penalties, "interval", seconds=flush_interval, id="rpg_flush_penalties", replace_existing=True)
+
+
+def backup():
+    # 先落盘，备份里才有缓存中的改动
+    flush_players()
+    n = backup_now()
+    removed = prune_backups(backup_keep_days * 86400)
+    if n or removed:
+        print(f"增量备份 {n} 条记录，合并旧备份段 {removed} 个")
+
+
+if backup_interval > 0:
+    scheduler.add_job(backup, "interval", seconds=backup_interval, id="rpg_backup", replace_existing=True)
+
+
+@driver.on_shutdown
+async def _():
+    n = await aflush_players()
+    print(f"关闭前写回 {n} 名玩家")
+    await run_io(flush_penalties)
+    shutdown_executor()
+
+
+@run_postprocessor
+async def _(bot: Bot, event: Event, exception: Optional[Exception]):
+    # 玩家在这条指令执行期间被别处改过（群发奖励、缓存淘汰后重读），这次的改动没有写入
+    if isinstance(exception, StaleWriteError):
+        await bot.send(event, "玩家数据刚被其他操作更新，本次改动没有保存，请重新发送指令")
@@ -7,16 +7,14 @@
 """
 from __future__ import annotations
 
-import pathlib
 from typing import Dict, Tuple, List
 
-import yaml
-
 from mybot.plugins.rpg.battle.adapters import player_to_entity, monster_to_entity
+from mybot.plugins.rpg.battle.catalog import get_catalog
 from mybot.plugins.rpg.engine.battle_system import BattleSystem
 from mybot.plugins.rpg.engine.skill_engine import SkillEngine
 from mybot.plugins.rpg.logic_skill import equip_skills_for_player
-from mybot.plugins.rpg.util.config_loader import ConfigLoader
+from mybot.plugins.rpg.util.config_loader import get_config
 from mybot.plugins.rpg.util.skill_factory import SkillFactory
 
 
@@ -32,16 +30,6 @@ def derive_internal_stats(player) -> Dict[str, int]:
     return {"ATK": atk, "DEF": dfn, "AGI": agi, "INT": itl, "MAX_HP": hp, "CRIT": crt}
 
 
-# === 工具：加载怪物定义 ===
-def _load_monster_def(monster_id: str) -> Dict:
-    path = pathlib.Path(__file__).resolve().parent / "battle" / "monsters.yaml"
-    data = yaml.safe_load(path.read_text(encoding="utf-8")) or []
-    for m in data:
-        if str(m.get("id")) == str(monster_id):
-            return m
-    raise KeyError(f"monster id not found: {monster_id}")
-
-
 # === 核心：跑一场 1v1（或 组队可拓展） ===
 def simulate_duel_with_skills(
         player,
@@ -56,14 +44,15 @@ def simulate_duel_with_skills(
     - 主动技释放前的 cd 由此函数管理；资源(cost)留给上层按项目规则处理
     返回值：(result, logs)
     """
-    config_loader = ConfigLoader()
-    battle_system = BattleSystem()
+    # 整场战斗固定用开始时的配置版本，中途热更新不影响
+    config_loader = get_config()
+    battle_system = BattleSystem(config_loader)
     skill_factory = SkillFactory(config_loader, battle_system.event_bus)
 
     # 1) 构建实体
     eng = SkillEngine(seed=seed)
     p_ent = player_to_entity(player)
-    m_def = _load_monster_def(monster_id)
+    m_def = get_catalog().get(monster_id)
     m_ent = monster_to_entity(m_def, hp=boss_hp)
 
     # 互相注入 engine（让技能/ops 能访问 rng / buff_defs 等）
@@ -92,8 +81,9 @@ def simulate_duel_with_skills(
 def simulate_pvp_with_skills(
         player_a, player_b, max_turns: int = 10, seed: int | None = None
 ) -> tuple[str, str]:
-    config_loader = ConfigLoader()
-    battle_system = BattleSystem()
+    # 整场战斗固定用开始时的配置版本，中途热更新不影响
+    config_loader = get_config()
+    battle_system = BattleSystem(config_loader)
     skill_factory = SkillFactory(config_loader, battle_system.event_bus)
 
     ent_a = player_to_entity(player_a)
@@ -5,7 +5,7 @@ import time
 from collections import defaultdict
 from typing import LiteralString
 
-import yaml
+from mybot.plugins.rpg.util.config_bundle import load_yaml
 
 # 抽卡 ------------------------------------------------------------------
 def gacha10_to_dust() -> tuple[int, LiteralString]:
@@ -21,7 +21,7 @@ def gacha10_to_dust() -> tuple[int, LiteralString]:
             stars.append(4)
         else:
             stars.append(3)
-    data = yaml.safe_load(character_path.read_text(encoding="utf-8")) or []
+    data = load_yaml(character_path) or []
     # 构建星级到角色列表的映射
     star_to_characters = {}
     for item in data['characterList']:
@@ -53,7 +53,7 @@ def gacha_num_to_dust(num:int) -> tuple[int, LiteralString]:
             stars.append(4)
         else:
             stars.append(3)
-    data = yaml.safe_load(character_path.read_text(encoding="utf-8")) or []
+    data = load_yaml(character_path) or []
     # 构建星级到角色列表的映射
     star_to_characters = {}
     for item in data['characterList']:
@@ -105,7 +105,7 @@ def get_pool_prob(count, size):
 def get_fish(gid):
     root = pathlib.Path(__file__).resolve().parent  # .../rpg
     fish_path = root / "data" / "fish.yaml"
-    data = yaml.safe_load(fish_path.read_text(encoding="utf-8")) or {}
+    data = load_yaml(fish_path) or {}
 
     count = get_counter(gid)
     pool_size = data.get('pool_size', 10)
@@ -1,16 +1,22 @@
 # mybot/plugins/rpg/models.py
 from __future__ import annotations
 
-import pathlib
 import random
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import MISSING, dataclass, field, fields as dataclass_fields
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
 import numpy as np
-import yaml
 
-from .storage import today_tag, load_players, save_players, load_boss_map, save_boss_map
-from .util.config_loader import ConfigLoader
+from .battle.catalog import get_catalog
+from .storage import today_tag, load_player, save_player, save_player_batch, load_players_by_gid, player_key, \
+    count_group_players, sample_group_uid, increment_group_field, load_boss, save_boss
+from .storage.aio import KeyedLock, run_io
+from .storage.cache import StaleWriteError, WriteBackCache
+from .storage.schema import BOSS_BOARD_SIZE, BOSS_SCHEMA, PLAYER_SCHEMA, upgrade_boss, upgrade_player
+from .util.config_loader import get_config
+
+T = TypeVar("T")
 
 RANK_VAL = {"C": 1, "B": 2, "A": 3, "S": 4}
 VAL_RANK = {v: k for k, v in RANK_VAL.items()}
@@ -29,13 +35,6 @@ def refine_cost(next_val: int) -> int:
     return {2: 100, 3: 300, 4: 900}.get(next_val, 999999)
 
 
-# === 工具：加载怪物定义 ===
-def _load_monsters() -> Dict:
-    path = pathlib.Path(__file__).resolve().parent / "battle" / "monsters.yaml"
-    data = yaml.safe_load(path.read_text(encoding="utf-8")) or []
-    return data
-
-
 @dataclass
 class Points:
     str: int = 7
@@ -51,13 +50,7 @@ class Points:
 
     @staticmethod
     def from_dict(d: Dict) -> "Points":
-        return Points(
-            d.get("str", 0),
-            d.get("def", d.get("def_", 0)),
-            d.get("hp", 0),
-            d.get("agi", 0),
-            d.get("crit", 0),
-        )
+        return Points(d["str"], d["def"], d["hp"], d["agi"], d["crit"])
 
     def to_dict(self) -> Dict:
         return {
@@ -125,7 +118,7 @@ class Weapon:
 
     @staticmethod
     def from_dict(d: Dict) -> "Weapon":
-        return Weapon(d.get("name", "无名之刃"), d.get("level", 1), list(d.get("slots", [1, 1, 1])))
+        return Weapon(d["name"], d["level"], list(d["slots"]))
 
     def to_dict(self) -> Dict:
         return {"name": self.name, "level": self.level, "slots": self.slots}
@@ -147,13 +140,7 @@ class Counters:
 
     @staticmethod
     def from_dict(d: Dict) -> "Counters":
-        tag = d.get("daily_date", today_tag())
-        c = Counters(
-            tag,
-            d.get("free_explore_used", 0),
-            d.get("boss_hits", 0),
-            d.get("signed", False),
-        )
+        c = Counters(d["daily_date"], d["free_explore_used"], d["boss_hits"], d["signed"])
         # 跨天刷新
         if c.daily_date != today_tag():
             c = Counters.today()
@@ -175,9 +162,7 @@ class Pconfig:
 
     @staticmethod
     def from_dict(d: Dict) -> "Pconfig":
-        return Pconfig(
-            d.get("battle_report_model", 0),
-        )
+        return Pconfig(d["battle_report_model"])
 
     def to_dict(self) -> Dict:
         return {
@@ -202,6 +187,8 @@ class Player:
     config: Pconfig = field(default_factory=Pconfig)
     skills: Dict[str, int] = field(default_factory=dict)
     equipped_skills: List[str] = field(default_factory=list)
+    # 每次 put 加一，用于比较交换（见 put_player）
+    version: int = 0
 
     # ---- 兼容层（短期让 p["diamond"] 还能用）----
     def __getitem__(self, k: str):
@@ -227,22 +214,26 @@ class Player:
 
     @staticmethod
     def from_dict(d: Dict) -> "Player":
+        if d.get("schema") != PLAYER_SCHEMA:
+            # 还没迁移的旧记录，先补成当前形状（见 storage.schema）
+            d = upgrade_player(d)
         return Player(
             uid=d["uid"],
             gid=d["gid"],
-            name=d.get("name", d["uid"]),
-            level=d.get("level", 1),
-            unspent=d.get("unspent", 0),
-            points=Points.from_dict(d.get("points", {})),
-            extra_points=Points.from_dict(d.get("extra_points", {})),
-            weapon=Weapon.from_dict(d.get("weapon", {})),
-            dust=d.get("dust", 0),
-            diamond=d.get("diamond", 0),
-            tear=d.get("tear", 0),
-            counters=Counters.from_dict(d.get("counters", {})),
-            config=Pconfig.from_dict(d.get("config", {})),
-            skills=d.get("skills", {}),
-            equipped_skills=d.get("equipped_skills", []),
+            name=d["name"],
+            level=d["level"],
+            unspent=d["unspent"],
+            points=Points.from_dict(d["points"]),
+            extra_points=Points.from_dict(d["extra_points"]),
+            weapon=Weapon.from_dict(d["weapon"]),
+            dust=d["dust"],
+            diamond=d["diamond"],
+            tear=d["tear"],
+            counters=Counters.from_dict(d["counters"]),
+            config=Pconfig.from_dict(d["config"]),
+            skills=d["skills"],
+            equipped_skills=d["equipped_skills"],
+            version=d["version"],
         )
 
     def to_dict(self) -> Dict:
@@ -261,10 +252,13 @@ class Player:
             "counters": self.counters.to_dict(),
             "config": self.config.to_dict(),
             "skills": self.skills,
-            "equipped_skills": self.equipped_skills
+            "equipped_skills": self.equipped_skills,
+            "version": self.version,
+            "schema": PLAYER_SCHEMA
         }
 
     def extra_distribute(self, attribute: str):
+        # 只改自身，写回由调用方 await aput_player
         if attribute == "力量":
             self.extra_points.str += 1
         elif attribute == "防御":
@@ -278,7 +272,6 @@ class Player:
         else:
             pass
         self.tear = max(self.tear - 1, 0)
-        put_player(self)
 
     def get_profile(self) -> str:
         detail = []
@@ -332,27 +325,32 @@ class Boss:
     hp_max: int
     board: Dict[str, int] = field(default_factory=dict)
     killed: bool = False
+    # 伤害前 BOSS_BOARD_SIZE 名的 uid（降序）和他们的显示名，出刀时增量维护，展示时不用排序、不用读玩家
+    top: List[str] = field(default_factory=list)
+    names: Dict[str, str] = field(default_factory=dict)
+    hits: int = 0
 
     @staticmethod
     def today(gid: str) -> "Boss":
-        # 加载怪物数据
-        monsters_data = _load_monsters()
-        # 首先筛选出所有等级为1的怪物
-        selected_monsters = [monster for monster in monsters_data if monster['tag'] == 'boss']
-        boss = random.choice(selected_monsters)
+        boss = get_catalog().choice("boss")
         print(boss)
-        return Boss(gid=gid, boss_date=today_tag(), name=boss['name'], hp=boss['MAX_HP'], hp_max=boss['MAX_HP'])
+        return Boss(gid=gid, boss_date=today_tag(), name=boss.name, hp=boss.MAX_HP, hp_max=boss.MAX_HP)
 
     @staticmethod
     def from_dict(d: Dict) -> "Boss":
+        if d.get("schema") != BOSS_SCHEMA:
+            d = upgrade_boss(d)
         b = Boss(
             gid=d["gid"],
-            boss_date=d.get("boss_date", today_tag()),
-            name=d.get("name"),
-            hp=d.get("hp", 10000),
-            hp_max=d.get("hp_max", 10000),
-            board=d.get("board", {}),
-            killed=d.get("killed", False)
+            boss_date=d["boss_date"],
+            name=d["name"],
+            hp=d["hp"],
+            hp_max=d["hp_max"],
+            board=d["board"],
+            killed=d["killed"],
+            top=d["top"],
+            names=d["names"],
+            hits=d["hits"],
         )
         if b.boss_date != today_tag():
             b = Boss.today(b.gid)
@@ -366,40 +364,201 @@ class Boss:
             "hp": self.hp,
             "hp_max": self.hp_max,
             "board": self.board,
-            "killed": self.killed
+            "killed": self.killed,
+            "top": self.top,
+            "names": self.names,
+            "hits": self.hits,
+            "schema": BOSS_SCHEMA
         }
 
+    def record_hit(self, uid: str, name: str, damage: int):
+        """
+        累加伤害并更新前 K 名。伤害只增不减，名次只会往前走，
+        所以只需要把这个 uid 插到第一个伤害比它低的位置，不在榜上时和榜尾比一下
+        """
+        total = self.board[uid] = self.board.get(uid, 0) + damage
+        self.hits += 1
+        top = self.top
+        if uid in top:
+            top.remove(uid)
+        elif len(top) >= BOSS_BOARD_SIZE and total <= self.board[top[-1]]:
+            return
+        i = 0
+        while i < len(top) and self.board[top[i]] >= total:
+            i += 1
+        top.insert(i, uid)
+        self.names[uid] = name
+        for out in top[BOSS_BOARD_SIZE:]:
+            self.names.pop(out, None)
+        del top[BOSS_BOARD_SIZE:]
+
+    def render_board(self) -> str:
+        if not self.top:
+            return "暂无出刀记录"
+        return "\n".join(f"{i + 1}. {self.names.get(uid, uid)}：{self.board[uid]}伤害" for i, uid in enumerate(self.top))
+
+
+class PlayerView:
+    """
+    只读的玩家视图：标量字段直接取原始字典，points / weapon 等子对象第一次访问时才构造。
+    按字段投影读出时，访问没读的字段会抛 AttributeError。要修改请用 get_player()。
+    """
+    _SUB_OBJECTS = {
+        "points": Points.from_dict,
+        "extra_points": Points.from_dict,
+        "weapon": Weapon.from_dict,
+        "counters": Counters.from_dict,
+        "config": Pconfig.from_dict,
+    }
+    __slots__ = ("_raw", "_fields", "_decoded")
+
+    def __init__(self, raw: Dict, fields: Optional[Iterable[str]] = None):
+        if raw.get("schema") != PLAYER_SCHEMA:
+            raw = upgrade_player(raw)
+        self._raw = raw
+        self._fields = None if fields is None else frozenset(fields)
+        self._decoded: Dict[str, object] = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in _PLAYER_FIELDS:
+            raise AttributeError(name)
+        if self._fields is not None and name not in self._fields:
+            raise AttributeError(f"PlayerView 没有读取字段 {name}")
+        decode = self._SUB_OBJECTS.get(name)
+        if decode is not None:
+            obj = self._decoded.get(name)
+            if obj is None:
+                obj = self._decoded[name] = decode(self._raw.get(name, {}))
+            return obj
+        if name in self._raw:
+            return self._raw[name]
+        if name == "name":
+            return self._raw["uid"]
+        f = _PLAYER_FIELDS[name]
+        return f.default if f.default is not MISSING else f.default_factory()
+
+    def __repr__(self):
+        return f"PlayerView({self._raw.get('gid')}:{self._raw.get('uid')})"
+
+
+_PLAYER_FIELDS = {f.name: f for f in dataclass_fields(Player)}
+
 
 # ---- 读写 API 保持函数名不变，但返回对象 ----
+# 玩家对象常驻内存：get 命中缓存不读盘，put 只打脏标记，由 flush_players() 定时批量写出
+_player_cache = WriteBackCache(save_player_batch)
+
+
+def _decode_player(raw: Dict) -> Player:
+    # 跨天 counters 刷新已经在 Counters.from_dict() 做了
+    return Player.from_dict(raw)
+
+
 def get_player(uid: str, gid: str, name: str) -> Player:
-    db = load_players()  # Dict[str, Dict]
-    key = f"{gid}:{uid}"
-    raw = db.get(key)
-    if not raw:
-        p = Player(uid=uid, gid=gid, name=name)
-        db[key] = p.to_dict()
-        save_players(db)
+    key = player_key(gid, uid)
+    p = _player_cache.get(key)
+    if p is not None:
+        # 缓存里的对象可能是昨天读进来的
+        if p.counters.daily_date != today_tag():
+            p.counters = Counters.today()
         return p
-    p = Player.from_dict(raw)
-    # 跨天 counters 刷新已经在 Counters.from_dict() 做了
-    # 补全属性
-    if not hasattr(p, "points") or p.points is None:
-        p.points = Points()
-    if not hasattr(p, "weapon") or p.weapon is None:
-        p.weapon = Weapon()
+    p = _player_cache.load(key, lambda: _load_decoded(gid, uid))
+    if p is None:
+        # 新玩家直接写入，保证存储里的群成员索引是全的
+        p = Player(uid=uid, gid=gid, name=name)
+        save_player(p.to_dict())
+        return _player_cache.add(key, p)
     return p
 
 
+def _load_decoded(gid: str, uid: str) -> Optional[Player]:
+    raw = load_player(gid, uid)
+    return _decode_player(raw) if raw else None
+
+
+def iter_group_players(gid: str) -> Iterator[Player]:
+    """逐个产出本群玩家（已在缓存中的直接复用同一个对象）"""
+    stamp = _player_cache.stamp()
+    for raw in load_players_by_gid(gid):
+        key = player_key(gid, raw["uid"])
+        p = _player_cache.get(key)
+        if p is None:
+            p = _player_cache.add(key, _decode_player(raw), loaded_at=stamp)
+            if p is None:
+                # 整群读出之后这个玩家在存储里被改过，单独重读
+                p = _player_cache.load(key, lambda: _load_decoded(gid, raw["uid"]))
+                if p is None:
+                    continue
+        elif p.counters.daily_date != today_tag():
+            p.counters = Counters.today()
+        yield p
+
+
 def get_players_by_gid(gid: str) -> List[Player]:
-    list_players = []
-    db = load_players()
-    for item in db.values():
-        p = Player.from_dict(item)
-        if p.gid == gid:
-            list_players.append(p)
-    return list_players
+    return list(iter_group_players(gid))
+
+
+def _with_ids(fields: Optional[List[str]]) -> Optional[List[str]]:
+    # schema 用来判断是否要先升级旧记录
+    return None if fields is None else list({"uid", "gid", "schema", *fields})
+
+
+def iter_group_views(gid: str, fields: Optional[List[str]] = None) -> Iterator[Union[Player, PlayerView]]:
+    """
+    只读遍历本群玩家：已在缓存中的直接给 Player（含未落盘的改动），
+    其余只从存储读 fields 这几个字段包成 PlayerView，不进缓存
+    """
+    for raw in load_players_by_gid(gid, _with_ids(fields)):
+        p = _player_cache.get(player_key(gid, raw["uid"]))
+        yield p if p is not None else PlayerView(raw, _with_ids(fields))
+
+
+def get_player_views(gid: str, uids: Iterable[str], fields: Optional[List[str]] = None) -> Dict[str, Union[Player, PlayerView]]:
+    """按 uid 取只读视图，规则同 iter_group_views；存储里没有的 uid 不出现在结果里"""
+    out = {}
+    for uid in uids:
+        p = _player_cache.get(player_key(gid, uid))
+        if p is None:
+            raw = load_player(gid, uid, _with_ids(fields))
+            if raw is None:
+                continue
+            p = PlayerView(raw, _with_ids(fields))
+        out[uid] = p
+    return out
+
 
+def sample_group_player(gid: str, exclude: str = None) -> Optional[Player]:
+    """随机取一个本群玩家（不含 exclude），只加载被抽中的那一个"""
+    uid = sample_group_uid(gid, exclude)
+    if uid is None:
+        return None
+    return get_player(uid, gid, uid)
 
+
+def grant_group(gid: str, field: str, delta: int, where: Optional[Callable[[Dict], bool]] = None) -> int:
+    """
+    给本群玩家的数值字段批量加 delta（BOSS 击杀奖励、管理员发放等），返回人数。
+    直接在存储层一次事务改完，不整群加载。改的时候缓存不能写出，改完把受影响的玩家从缓存丢掉，
+    下次 get_player 读到的是新值；还拿着旧实例的调用方 put_player 会得到 StaleWriteError，需要重读后再改（见 amodify_player）
+    """
+    with _player_cache.exclusive():
+        # 先把缓存里的改动落盘，存储层看到的才是最新值
+        _player_cache.flush()
+        uids = increment_group_field(gid, field, delta, where)
+        _player_cache.invalidate(player_key(gid, uid) for uid in uids)
+    return len(uids)
+
+
+def flush_players() -> int:
+    """把缓存中有改动的玩家写回存储，返回写出条数"""
+    return _player_cache.flush()
+
+
+def set_player_cache_size(max_size: int):
+    _player_cache.max_size = max_size
+
+
+# 以下技能操作只改 player，不写回；成功后由处理函数 await aput_player(player)
 def get_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> Tuple[bool, str]:
     # 如果玩家已经拥有这个技能
     if skill_id in player.skills.keys():
@@ -408,7 +567,6 @@ def get_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> Tupl
     # 如果技能槽未满
     if len(player.skills) < 3 + player.weapon.level:
         player.skills.__setitem__(skill_id, 1)
-        put_player(player)
         return True, f"技能[{skill_map.get(skill_id).get("name")}]获取成功"
 
     # 如果技能槽已满（超过5个）
@@ -430,8 +588,6 @@ def get_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> Tupl
         player.skills.pop(skill_to_remove)
         player.skills.__setitem__(skill_id, 1)
 
-        put_player(player)
-
         return True, f"已遗忘技能[{skill_map.get(skill_to_remove).get("name")}]，并成功学习[{skill_map.get(skill_id).get("name")}]"
 
 
@@ -453,14 +609,11 @@ def equip_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> Tu
     if len(player.equipped_skills) >= max_equipped:
         old_skill_id = player.equipped_skills.pop(0)
         player.equipped_skills.append(skill_id)
-        put_player(player)
         return True, f"装备槽已满（最多{max_equipped}个），已自动卸下技能[{skill_map.get(old_skill_id).get("name")}]，技能[{skill_map.get(skill_id).get("name")}]装配成功"
 
     # 装备技能
     player.equipped_skills.append(skill_id)
 
-    put_player(player)
-
     return True, f"技能[{skill_map.get(skill_id).get("name")}]成功装配"
 
 def unequip_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> Tuple[bool, str]:
@@ -474,7 +627,6 @@ def unequip_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) ->
 
     # 卸下技能
     player.equipped_skills.remove(skill_id)
-    put_player(player)
 
     return True, f"技能[{skill_map.get(skill_id).get("name")}]成功卸下"
 
@@ -488,7 +640,6 @@ def level_up_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) ->
     if player.skills[skill_id] >= 5:
         return False, f"技能[{skill_map.get(skill_id).get("name")}]已经满级，当前等级:{player.skills[skill_id]}"
     player.skills[skill_id] += 1
-    put_player(player)
 
     return True, f"技能[{skill_map.get(skill_id).get("name")}]升级成功，当前等级:{player.skills[skill_id]}"
 
@@ -498,12 +649,11 @@ def forget_skill(player: Player, skill_id: str, skill_map: Dict[str, Dict]) -> T
         return False, f"你愣了一下，好像你本来就不会这个技能"
 
     player.skills.pop(skill_id)
-    put_player(player)
     return True, f"技能[{skill_map.get(skill_id).get("name")}]已被成功遗忘，相关的记忆也随之消散..."
 
 
 def get_equipped_skill_names(player: Player) -> str:
-    config_loader = ConfigLoader()
+    config_loader = get_config()
     skills_map = config_loader.get_skills_map(True)
     equipped_skill_names = []
     for skill_id, skill_level in player.skills.items():
@@ -515,36 +665,157 @@ def get_equipped_skill_names(player: Player) -> str:
     return " , ".join(equipped_skill_names)
 
 
+def _stored_version(gid: str, uid: str) -> Optional[int]:
+    raw = load_player(gid, uid)
+    return raw.get("version", 0) if raw else None
+
+
 def put_players(players: List[Player]):
-    db = load_players()
-    for p in players:
-        db[f"{p.gid}:{p.uid}"] = p.to_dict()
-    save_players(db)
+    """一起提交（见 WriteBackCache.commit_many）：任一玩家版本冲突就抛 StaleWriteError，谁都不写"""
+    by_key = {player_key(p.gid, p.uid): p for p in players}
+    _player_cache.commit_many(list(by_key.items()), lambda key: _stored_version(by_key[key].gid, by_key[key].uid))
 
 
 def put_player(p: Player):
-    db = load_players()
-    db[f"{p.gid}:{p.uid}"] = p.to_dict()
-    save_players(db)
+    """
+    比较交换：p 读出之后同一玩家已经被别的实例提交过，抛 StaleWriteError 而不是静默覆盖。
+    正常拿到的都是缓存里的同一个实例，只有被 LRU 淘汰或被 grant_group 丢弃后才可能冲突；
+    处理函数里用 amodify_player 自动重读重做，或让异常交给 lifecycle 里的兜底提示用户重试。
+    """
+    _player_cache.commit(player_key(p.gid, p.uid), p, lambda: _stored_version(p.gid, p.uid))
 
 
 def get_boss(gid: str) -> Boss:
-    bm = load_boss_map()
-    raw = bm.get(gid)
+    raw = load_boss(gid)
     if not raw:
         b = Boss.today(gid)
-        bm[gid] = b.to_dict()
-        save_boss_map(bm)
+        save_boss(b.to_dict())
         return b
     b = Boss.from_dict(raw)
     if b.boss_date != today_tag():
         b = Boss.today(gid)
-        bm[gid] = b.to_dict()
-        save_boss_map(bm)
+        save_boss(b.to_dict())
     return b
 
 
 def put_boss(b: Boss):
-    bm = load_boss_map()
-    bm[b.gid] = b.to_dict()
-    save_boss_map(bm)
+    save_boss(b.to_dict())
+
+
+# gid -> ((boss_date, hits), 排行榜文本)；出刀会让 hits 变化，缓存自然失效
+_board_text: Dict[str, Tuple[Tuple[str, int], str]] = {}
+
+
+def boss_board_text(b: Boss) -> str:
+    stamp = (b.boss_date, b.hits)
+    cached = _board_text.get(b.gid)
+    if cached is None or cached[0] != stamp:
+        cached = _board_text[b.gid] = (stamp, b.render_board())
+    return cached[1]
+
+
+# ---- async 接口：处理函数里用这些，碰磁盘的部分都在存储线程池里执行 ----
+# 同一个 key 的 I/O 按调用顺序排队
+_io_locks = KeyedLock()
+# 跨 await 的“读-改-写”用，见 lock_players() / boss_lock()
+_player_locks = KeyedLock()
+_boss_locks = KeyedLock()
+# amodify_player 遇到版本冲突时最多尝试几次
+PUT_RETRIES = 3
+
+
+async def aget_player(uid: str, gid: str, name: str) -> Player:
+    key = player_key(gid, uid)
+    if key in _player_cache:
+        # 命中缓存不碰磁盘，直接在事件循环里取
+        return get_player(uid, gid, name)
+    async with _io_locks.hold(key):
+        return await run_io(get_player, uid, gid, name)
+
+
+async def aput_player(p: Player):
+    # 打脏标记可能触发 LRU 淘汰写盘，所以也放到线程池
+    async with _io_locks.hold(player_key(p.gid, p.uid)):
+        await run_io(put_player, p)
+
+
+async def amodify_player(uid: str, gid: str, name: str, apply: Callable[[Player], T]) -> T:
+    """
+    读-改-写一个玩家：apply(p) 就地修改并返回结果（不要在里面 await）。
+    提交时玩家已被别处更新（StaleWriteError）就重新读出再调一次 apply，最多 PUT_RETRIES 次；
+    apply 里的检查（钻石够不够等）每次都按最新数据重做
+    """
+    for attempt in range(PUT_RETRIES):
+        p = await aget_player(uid, gid, name)
+        result = apply(p)
+        try:
+            await aput_player(p)
+            return result
+        except StaleWriteError:
+            if attempt == PUT_RETRIES - 1:
+                raise
+
+
+async def aput_players(players: List[Player]):
+    async with AsyncExitStack() as stack:
+        for key in sorted({player_key(p.gid, p.uid) for p in players}):
+            await stack.enter_async_context(_io_locks.hold(key))
+        await run_io(put_players, players)
+
+
+async def aget_players_by_gid(gid: str) -> List[Player]:
+    return await run_io(get_players_by_gid, gid)
+
+
+async def aget_group_views(gid: str, fields: Optional[List[str]] = None) -> List[Union[Player, PlayerView]]:
+    return await run_io(lambda: list(iter_group_views(gid, fields)))
+
+
+async def aget_player_views(gid: str, uids: Iterable[str], fields: Optional[List[str]] = None) \
+        -> Dict[str, Union[Player, PlayerView]]:
+    return await run_io(get_player_views, gid, list(uids), fields)
+
+
+async def asample_group_player(gid: str, exclude: str = None) -> Optional[Player]:
+    uid = sample_group_uid(gid, exclude)
+    if uid is None:
+        return None
+    return await aget_player(uid, gid, uid)
+
+
+async def agrant_group(gid: str, field: str, delta: int, where: Optional[Callable[[Dict], bool]] = None) -> int:
+    return await run_io(grant_group, gid, field, delta, where)
+
+
+async def aflush_players() -> int:
+    return await run_io(flush_players)
+
+
+async def aget_boss(gid: str) -> Boss:
+    async with _io_locks.hold(f"boss:{gid}"):
+        return await run_io(get_boss, gid)
+
+
+async def aput_boss(b: Boss):
+    async with _io_locks.hold(f"boss:{b.gid}"):
+        await run_io(put_boss, b)
+
+
+@asynccontextmanager
+async def lock_players(gid: str, *uids: str):
+    """
+    async with lock_players(gid, uid, target): 包住跨 await 的读-改-写，
+    同一玩家的命令排队执行，不同玩家互不影响；多个玩家按 key 顺序加锁，不会互相等死
+    """
+    async with AsyncExitStack() as stack:
+        for key in sorted({player_key(gid, uid) for uid in uids}):
+            await stack.enter_async_context(_player_locks.hold(key))
+        yield
+
+
+def boss_lock(gid: str):
+    """
+    async with boss_lock(gid): 包住 aget_boss ... aput_boss，
+    中间有 await 时同群的两次出刀不会互相覆盖血量和排行榜
+    """
+    return _boss_locks.hold(str(gid))
@@ -1,109 +1,187 @@
-import json
+import heapq
+import threading
 import time
-from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 from mybot.plugins.rpg.models import Player
+from mybot.plugins.rpg.storage import get_penalty_store
+from mybot.plugins.rpg.storage.journal import JournalStore
 
+# 所有实例，定时任务 / 关闭钩子里统一落盘（见 lifecycle）
+_managers: List["PenaltyManager"] = []
+
+
+def flush_penalties() -> int:
+    """把各 PenaltyManager 里有改动的用户写回存储，返回写出条数"""
+    return sum(m.flush() for m in _managers)
 
-class PenaltyManager:
-    """惩罚管理系统"""
 
-    def __init__(self, config: Dict[str, Any]):
+class PenaltyManager:
+    """
+    惩罚管理系统
+    - 修改只改内存并记下用户，flush() 按用户批量写出，每次抢夺不再重写整个文件
+    - 冷却 / 黑名单的到期时间放在最小堆里，每次访问时弹出已到期的，不做全表扫描
+    - 存储第一次用到时才打开并加载，模块导入时建实例不碰磁盘（之后还能 set_storage_format）
+    """
+
+    def __init__(self, config: Dict[str, Any], store: Optional[JournalStore] = None):
         self.config = config
         self.user_cooldowns: Dict[str, Dict[str, float]] = {}  # 用户冷却时间
         self.user_blacklists: Dict[str, Dict[str, float]] = {}  # 用户黑名单
         self.user_stats: Dict[str, Dict[str, Any]] = {}  # 用户统计
-        self.data_file = Path("data/rob_penalties.json")
-        self.load_data()
+        self._store = store
+        self._loaded = False
+        # (到期时间, 用户, 黑名单目标)，冷却的目标为 ""；被覆盖的旧条目弹出时发现对不上直接丢弃
+        self._expiry: List[Tuple[float, str, str]] = []
+        self._dirty: Set[str] = set()
+        # 定时落盘在线程池里跑：_lock 保护内存状态，_flush_lock 保证两次落盘不会乱序
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        _managers.append(self)
+
+    @property
+    def store(self) -> JournalStore:
+        if self._store is None:
+            self._store = get_penalty_store()
+        return self._store
+
+    def _ensure_loaded(self):
+        """调用方持有 _lock"""
+        if not self._loaded:
+            self._loaded = True
+            self.load_data()
 
     def load_data(self):
         """加载持久化数据"""
         try:
-            if self.data_file.exists():
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.user_cooldowns = data.get('cooldowns', {})
-                    self.user_blacklists = data.get('blacklists', {})
-                    self.user_stats = data.get('stats', {})
+            records = self.store.values()
         except Exception as e:
             print(f"加载惩罚数据失败: {e}")
-
-    def save_data(self):
-        """保存数据到文件"""
-        try:
-            self.data_file.parent.mkdir(exist_ok=True)
-            data = {
-                'cooldowns': self.user_cooldowns,
-                'blacklists': self.user_blacklists,
-                'stats': self.user_stats
-            }
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存惩罚数据失败: {e}")
+            return
+        with self._lock:
+            for r in records:
+                user_id = r["uid"]
+                if r.get("cooldown"):
+                    self.user_cooldowns[user_id] = dict(r["cooldown"])
+                    heapq.heappush(self._expiry, (r["cooldown"]["end_time"], user_id, ""))
+                if r.get("blacklist"):
+                    self.user_blacklists[user_id] = dict(r["blacklist"])
+                    for target_id, end_time in r["blacklist"].items():
+                        heapq.heappush(self._expiry, (end_time, user_id, target_id))
+                if r.get("stats"):
+                    self.user_stats[user_id] = dict(r["stats"])
+            self._expire()
+
+    def _record(self, user_id: str) -> Dict[str, Any]:
+        cooldown = self.user_cooldowns.get(user_id)
+        stats = self.user_stats.get(user_id)
+        return {
+            "uid": user_id,
+            "cooldown": dict(cooldown) if cooldown else None,
+            "blacklist": dict(self.user_blacklists.get(user_id, {})),
+            "stats": dict(stats) if stats else None,
+        }
+
+    def flush(self) -> int:
+        """把有改动的用户写回存储，返回写出条数；失败时改动留到下一次"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                users, self._dirty = self._dirty, set()
+                records = [self._record(u) for u in users]
+            try:
+                self.store.put_many(records)
+            except Exception as e:
+                print(f"保存惩罚数据失败: {e}")
+                with self._lock:
+                    self._dirty |= users
+                return 0
+            return len(records)
+
+    def _expire(self):
+        """弹出所有已到期的冷却 / 黑名单，调用方持有 _lock"""
+        self._ensure_loaded()
+        now = time.time()
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            end_time, user_id, target_id = heapq.heappop(heap)
+            if target_id:
+                targets = self.user_blacklists.get(user_id)
+                if targets is None or targets.get(target_id) != end_time:
+                    continue
+                del targets[target_id]
+                if not targets:
+                    del self.user_blacklists[user_id]
+            else:
+                cooldown = self.user_cooldowns.get(user_id)
+                if cooldown is None or cooldown["end_time"] != end_time:
+                    continue
+                del self.user_cooldowns[user_id]
+            self._dirty.add(user_id)
 
     def apply_time_penalty(self, user_id: str, duration: int) -> str:
         """应用时间惩罚"""
-        current_time = time.time()
-        current_cooldown = self.get_remaining_cooldown(user_id)
-
-        # 计算新的冷却时间
-        new_cooldown = max(current_cooldown, duration)
-
-        end_time = current_time + new_cooldown
-        self.user_cooldowns[user_id] = {'end_time': end_time, 'penalty_type': 'time'}
-
-        self.save_data()
+        with self._lock:
+            self._ensure_loaded()
+            current_time = time.time()
+            current_cooldown = self.get_remaining_cooldown(user_id)
+
+            # 计算新的冷却时间
+            new_cooldown = max(current_cooldown, duration)
+
+            end_time = current_time + new_cooldown
+            self.user_cooldowns[user_id] = {'end_time': end_time, 'penalty_type': 'time'}
+            heapq.heappush(self._expiry, (end_time, user_id, ""))
+            self._dirty.add(user_id)
         return f"冷却时间增加至 {self.format_duration(new_cooldown)}"
 
     def apply_blacklist_penalty(self, user_id: str, target_id: str, duration: int) -> str:
         """应用黑名单惩罚"""
-        current_time = time.time()
-        end_time = current_time + duration
-
-        if user_id not in self.user_blacklists:
-            self.user_blacklists[user_id] = {}
-
-        self.user_blacklists[user_id][target_id] = end_time
-        self.save_data()
+        with self._lock:
+            self._ensure_loaded()
+            end_time = time.time() + duration
+            self.user_blacklists.setdefault(user_id, {})[target_id] = end_time
+            heapq.heappush(self._expiry, (end_time, user_id, target_id))
+            self._dirty.add(user_id)
         return f"24小时内无法抢夺该玩家"
 
     def apply_diamond_penalty(self, p1: Player, p2: Player, amount: int):
+        # 钻石在玩家记录里，由调用方 put_player 落盘，这里没有要保存的
         if p1.diamond < amount:
             amount = p1.diamond
         p1.diamond -= amount
         p2.diamond += amount
-        self.save_data()
         return amount, f"损失{amount}个钻石💎"
 
     def get_remaining_cooldown(self, user_id: str) -> int:
         """获取剩余冷却时间"""
-        if user_id in self.user_cooldowns:
-            end_time = self.user_cooldowns[user_id]['end_time']
-            remaining = max(0, end_time - time.time())
-            return int(remaining)
+        with self._lock:
+            self._expire()
+            if user_id in self.user_cooldowns:
+                end_time = self.user_cooldowns[user_id]['end_time']
+                return int(max(0, end_time - time.time()))
         return 0
 
     def is_user_blacklisted(self, user_id: str, target_id: str) -> bool:
         """检查用户是否被目标用户黑名单"""
-        if user_id in self.user_blacklists and target_id in self.user_blacklists[user_id]:
-            end_time = self.user_blacklists[user_id][target_id]
-            return time.time() < end_time
-        return False
+        with self._lock:
+            self._expire()
+            return target_id in self.user_blacklists.get(user_id, {})
 
     def can_rob(self, user_id: str, target_id: str) -> tuple[bool, str]:
         """检查是否可以抢夺"""
-        # 检查冷却时间
-        cooldown = self.get_remaining_cooldown(user_id)
-        if cooldown > 0:
-            return False, f"⏰ 冷却中！请等待 {self.format_duration(cooldown)}"
-
-        # 检查黑名单
-        if self.is_user_blacklisted(user_id, target_id):
-            blacklist_end = self.user_blacklists[user_id][target_id]
-            remaining = max(0, blacklist_end - time.time())
-            return False, f"🚫 被目标玩家拉黑！请等待 {self.format_duration(remaining)}"
+        with self._lock:
+            # 检查冷却时间
+            cooldown = self.get_remaining_cooldown(user_id)
+            if cooldown > 0:
+                return False, f"⏰ 冷却中！请等待 {self.format_duration(cooldown)}"
+
+            # 检查黑名单
+            if self.is_user_blacklisted(user_id, target_id):
+                blacklist_end = self.user_blacklists[user_id][target_id]
+                remaining = int(max(0, blacklist_end - time.time()))
+                return False, f"🚫 被目标玩家拉黑！请等待 {self.format_duration(remaining)}"
 
         return True, ""
 
@@ -117,54 +195,33 @@ class PenaltyManager:
             return f"{seconds // 3600}小时{(seconds % 3600) // 60}分钟"
 
     def cleanup_expired_penalties(self):
-        """清理过期的惩罚"""
-        current_time = time.time()
-
-        # 清理过期冷却时间
-        expired_users = []
-        for user_id, data in self.user_cooldowns.items():
-            if data['end_time'] <= current_time:
-                expired_users.append(user_id)
-
-        for user_id in expired_users:
-            del self.user_cooldowns[user_id]
-
-        # 清理过期黑名单
-        for user_id in list(self.user_blacklists.keys()):
-            expired_targets = []
-            for target_id, end_time in self.user_blacklists[user_id].items():
-                if end_time <= current_time:
-                    expired_targets.append(target_id)
-
-            for target_id in expired_targets:
-                del self.user_blacklists[user_id][target_id]
-
-            if not self.user_blacklists[user_id]:
-                del self.user_blacklists[user_id]
-
-        self.save_data()
+        """清理过期的惩罚（平时每次访问都会顺带清理，这里只是立即做一次）"""
+        with self._lock:
+            self._expire()
 
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """获取用户统计信息"""
-        if user_id not in self.user_stats:
-            self.user_stats[user_id] = {
-                'total_attempts': 0,
-                'success_count': 0,
-                'failure_count': 0,
-                'total_cooldown': 0,
-                'blacklist_count': 0
-            }
-        return self.user_stats[user_id]
+        with self._lock:
+            self._ensure_loaded()
+            if user_id not in self.user_stats:
+                self.user_stats[user_id] = {
+                    'total_attempts': 0,
+                    'success_count': 0,
+                    'failure_count': 0,
+                    'total_cooldown': 0,
+                    'blacklist_count': 0
+                }
+            return self.user_stats[user_id]
 
     def update_user_stats(self, user_id: str, success: bool, cooldown: int = 0):
         """更新用户统计"""
-        stats = self.get_user_stats(user_id)
-        stats['total_attempts'] += 1
-
-        if success:
-            stats['success_count'] += 1
-        else:
-            stats['failure_count'] += 1
-            stats['total_cooldown'] += cooldown
-
-        self.save_data()
+        with self._lock:
+            stats = self.get_user_stats(user_id)
+            stats['total_attempts'] += 1
+
+            if success:
+                stats['success_count'] += 1
+            else:
+                stats['failure_count'] += 1
+                stats['total_cooldown'] += cooldown
+            self._dirty.add(user_id)
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+持久化入口：
+- 玩家：默认 SQLite（data/players.db），一行一个 gid:uid，按群查询走 gid 索引；
+  也可切换为 journal 后端：按群分片，data/groups/<gid>/players.json 快照 + 追加日志
+- BOSS：按群分片的 journal，data/groups/<gid>/boss.json，每次出刀只追加一条记录
+旧版 data/players.json 会在 SQLite 为空时自动导入一次；
+旧版单文件 players.json / boss.json 会在第一次打开分片存储时按群拆分一次。
+记录默认用紧凑二进制格式写入（见 serializers），JSON 可选，读取时两种都认；
+分片文件名沿用 players.json / boss.json，内容格式以文件首字节为准。
+抢夺惩罚：data/penalties.json 快照 + 追加日志，一个用户一条记录；旧版 data/rob_penalties.json 在为空时导入一次。
+备份：data/backups/ 增量段（见 backup），写入时只记下改动的 key，backup_now() 只备份这些记录。
+"""
+import os, json, time, threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from .backup import BackupSet
+
+from .journal import JournalStore
+from .keys import player_key
+from .migrate import KINDS, UPGRADES, JsonlWriter, copy_records, iter_jsonl
+from .schema import upgrade_boss, upgrade_player
+from .serializers import SERIALIZERS, get_serializer
+from .sharding import ShardedStore, ShardedPlayerStore, split_into_shards
+from .sqlite_store import SqlitePlayerStore
+
+DATA_DIR = os.path.join(os.getcwd(), "data")
+os.makedirs(DATA_DIR, exist_ok=True)
+PLAYERS_JSON = os.path.join(DATA_DIR, "players.json")
+PLAYERS_DB = os.path.join(DATA_DIR, "players.db")
+BOSS_JSON = os.path.join(DATA_DIR, "boss.json")
+GROUPS_DIR = os.path.join(DATA_DIR, "groups")
+BACKUP_DIR = os.path.join(DATA_DIR, "backups")
+PENALTIES_JSON = os.path.join(DATA_DIR, "penalties.json")
+LEGACY_PENALTIES_JSON = os.path.join(DATA_DIR, "rob_penalties.json")
+
+PLAYER_BACKENDS = ("sqlite", "journal")
+STORAGE_FORMATS = tuple(SERIALIZERS)
+_player_backend = "sqlite"
+_storage_format = "binary"
+_player_store: Optional[Union[SqlitePlayerStore, ShardedPlayerStore]] = None
+_boss_store: Optional[ShardedStore] = None
+_penalty_store: Optional[JournalStore] = None
+_store_lock = threading.Lock()
+
+# 上次备份之后写过的 key；进程刚启动时不知道之前改过什么，第一次备份全量比对哈希
+_backup: Optional[BackupSet] = None
+_changed: Dict[str, Set[str]] = {"players": set(), "boss": set()}
+_changed_full = True
+_changed_lock = threading.Lock()
+
+
+def today_tag() -> str:
+    return time.strftime("%Y-%m-%d", time.localtime())
+
+
+# ---- 玩家 ----
+def import_players_json(store: SqlitePlayerStore, path: str = PLAYERS_JSON) -> int:
+    """把旧版 players.json 一次性导入 SQLite，返回导入条数（原文件保留不动）"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            db = json.load(f)
+        except json.JSONDecodeError:
+            return 0
+    store.put_many(upgrade_player(r) for r in db.values())
+    return len(db)
+
+
+def export_players_json(path: str) -> int:
+    """把全部玩家导出成带缩进的 JSON（与旧版 players.json 同结构），调试 / 备份查看用"""
+    db = load_players()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(db, f, ensure_ascii=False, indent=2)
+    return len(db)
+
+
+def set_player_backend(name: str):
+    """选择玩家存储后端，需在第一次读写玩家之前调用"""
+    global _player_backend
+    if name not in PLAYER_BACKENDS:
+        raise ValueError(f"未知的玩家存储后端: {name}，可选 {PLAYER_BACKENDS}")
+    if _player_store is not None and name != _player_backend:
+        raise RuntimeError("玩家存储已经打开，无法再切换后端")
+    _player_backend = name
+
+
+def set_storage_format(name: str):
+    """选择写入格式（binary / json），需在第一次读写之前调用；已有数据无论哪种格式都能读"""
+    global _storage_format
+    get_serializer(name)
+    if any(s is not None for s in (_player_store, _boss_store, _penalty_store)) and name != _storage_format:
+        raise RuntimeError("存储已经打开，无法再切换格式")
+    _storage_format = name
+
+
+def get_player_store() -> Union[SqlitePlayerStore, ShardedPlayerStore]:
+    global _player_store
+    if _player_store is None:
+        with _store_lock:
+            if _player_store is None:
+                if _player_backend == "journal":
+                    store = ShardedPlayerStore(GROUPS_DIR, serializer=get_serializer(_storage_format))
+                    n = split_into_shards(PLAYERS_JSON, store, upgrade_player)
+                    if n:
+                        print(f"已把 {PLAYERS_JSON} 中 {n} 名玩家按群拆分")
+                    _player_store = store
+                else:
+                    store = SqlitePlayerStore(PLAYERS_DB, get_serializer(_storage_format))
+                    if store.count() == 0:
+                        n = import_players_json(store)
+                        if n:
+                            print(f"已从 {PLAYERS_JSON} 导入 {n} 名玩家")
+                    _player_store = store
+    return _player_store
+
+
+# 读取函数的 fields：只取这些顶层字段（如 ["uid", "name"]），只读路径用，省去解码整条记录
+def load_player(gid: str, uid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+    return get_player_store().get(gid, uid, fields)
+
+
+def _mark_changed(kind: str, keys: Iterable[str]):
+    with _changed_lock:
+        _changed[kind].update(keys)
+
+
+def save_player(record: Dict):
+    get_player_store().put(record)
+    _mark_changed("players", (player_key(record["gid"], record["uid"]),))
+
+
+def save_player_batch(records: Iterable[Dict]):
+    """多条记录在同一个事务里写入"""
+    records = list(records)
+    get_player_store().put_many(records)
+    _mark_changed("players", (player_key(r["gid"], r["uid"]) for r in records))
+
+
+def load_players_by_gid(gid: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    return get_player_store().by_gid(gid, fields)
+
+
+def increment_group_field(gid: str, field: str, delta: int | float,
+                          where: Optional[Callable[[Dict], bool]] = None) -> List[str]:
+    """
+    群内批量加减数值字段（如全群发放女神之泪），一次事务 / 一次写入，不构造 Player。
+    where 接收原始记录字典，只处理返回 True 的玩家；返回受影响的 uid。
+    """
+    if not field.isidentifier():
+        raise ValueError(f"字段名不合法: {field}")
+    uids = get_player_store().increment_field(gid, field, delta, where)
+    _mark_changed("players", (player_key(gid, uid) for uid in uids))
+    return uids
+
+
+def group_uids(gid: str) -> List[str]:
+    return get_player_store().group_uids(gid)
+
+
+def count_group_players(gid: str) -> int:
+    return get_player_store().count_group(gid)
+
+
+def sample_group_uid(gid: str, exclude: Optional[str] = None) -> Optional[str]:
+    """随机取一个群成员的 uid（不含 exclude），群里没人时返回 None"""
+    return get_player_store().sample_group(gid, exclude)
+
+
+def load_players(fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """全量读取（key 为 gid:uid），只给需要遍历全部玩家的地方用"""
+    return get_player_store().all(fields)
+
+
+def save_players(players: Dict[str, Dict]):
+    save_player_batch(players.values())
+
+
+# ---- BOSS ----
+def _boss_key(record: Dict) -> str:
+    return str(record["gid"])
+
+
+def get_boss_store() -> ShardedStore:
+    global _boss_store
+    if _boss_store is None:
+        with _store_lock:
+            if _boss_store is None:
+                serializer = get_serializer(_storage_format)
+                store = ShardedStore(GROUPS_DIR, "boss.json",
+                                     lambda path: JournalStore(path, _boss_key, serializer=serializer))
+                split_into_shards(BOSS_JSON, store, upgrade_boss)
+                _boss_store = store
+    return _boss_store
+
+
+def load_boss(gid: str) -> Optional[Dict]:
+    store = get_boss_store().shard(gid, create=False)
+    return store.lookup(str(gid)) if store is not None else None
+
+
+def save_boss(record: Dict):
+    get_boss_store().shard(record["gid"]).put(record)
+    _mark_changed("boss", (str(record["gid"]),))
+
+
+def save_boss_batch(records: Iterable[Dict]):
+    records = list(records)
+    get_boss_store().put_many(records)
+    _mark_changed("boss", (str(r["gid"]) for r in records))
+
+
+def load_boss_map() -> Dict[str, Dict]:
+    store = get_boss_store()
+    out = {}
+    for gid in store.gids():
+        out.update(store.shard(gid).all())
+    return out
+
+
+def save_boss_map(boss_map: Dict[str, Dict]):
+    for record in boss_map.values():
+        save_boss(record)
+
+
+# ---- 抢夺惩罚 ----
+def _penalty_key(record: Dict) -> str:
+    return str(record["uid"])
+
+
+def import_penalties_json(store: JournalStore, path: str = LEGACY_PENALTIES_JSON) -> int:
+    """把旧版 rob_penalties.json（cooldowns / blacklists / stats 三张表）按用户拆成记录导入，返回用户数"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            return 0
+    cooldowns, blacklists, stats = data.get("cooldowns", {}), data.get("blacklists", {}), data.get("stats", {})
+    users = set(cooldowns) | set(blacklists) | set(stats)
+    store.put_many({"uid": u, "cooldown": cooldowns.get(u), "blacklist": blacklists.get(u, {}),
+                    "stats": stats.get(u)} for u in users)
+    return len(users)
+
+
+def get_penalty_store() -> JournalStore:
+    global _penalty_store
+    if _penalty_store is None:
+        with _store_lock:
+            if _penalty_store is None:
+                store = JournalStore(PENALTIES_JSON, _penalty_key, serializer=get_serializer(_storage_format))
+                if store.count() == 0:
+                    import_penalties_json(store)
+                _penalty_store = store
+    return _penalty_store
+
+
+# ---- 导入导出（JSONL，一行一条） ----
+def _check_kind(kind: str):
+    if kind not in KINDS:
+        raise ValueError(f"未知的数据类型: {kind}，可选 {KINDS}")
+
+
+def iter_records(kind: str) -> Iterator[Dict]:
+    """逐条产出当前存储里的全部记录，不一次性读进内存"""
+    _check_kind(kind)
+    return (get_player_store() if kind == "players" else get_boss_store()).iter_records()
+
+
+def export_jsonl(kind: str, path: str) -> int:
+    _check_kind(kind)
+    writer = JsonlWriter(path)
+    try:
+        return copy_records(iter_records(kind), writer.put_many)
+    finally:
+        writer.close()
+
+
+def import_jsonl(kind: str, path: str) -> int:
+    """按批写入当前存储（同 key 覆盖），记录先升级到当前 schema；写过的 key 会进下一次增量备份"""
+    _check_kind(kind)
+    write = save_player_batch if kind == "players" else save_boss_batch
+    return copy_records(iter_jsonl(path), write, UPGRADES[kind])
+
+
+# ---- 备份 ----
+def get_backup_set() -> BackupSet:
+    global _backup
+    if _backup is None:
+        with _store_lock:
+            if _backup is None:
+                _backup = BackupSet(BACKUP_DIR, get_serializer(_storage_format))
+    return _backup
+
+
+def backup_now() -> int:
+    """
+    增量备份，返回写入备份的记录数。只读上次备份之后写过的记录，
+    在定时任务的线程里跑，不占写入路径的锁（存储读写各自的短锁除外）。
+    """
+    global _changed_full
+    with _changed_lock:
+        full = _changed_full
+        players, boss = _changed["players"], _changed["boss"]
+        _changed["players"], _changed["boss"] = set(), set()
+        _changed_full = False
+    try:
+        if full:
+            player_records = load_players()
+            boss_records = load_boss_map()
+        else:
+            player_records = {k: load_player(*k.split(":", 1)) for k in players}
+            boss_records = {gid: load_boss(gid) for gid in boss}
+        records = {f"players/{k}": r for k, r in player_records.items() if r is not None}
+        records.update((f"boss/{k}", r) for k, r in boss_records.items() if r is not None)
+        return get_backup_set().snapshot(records)
+    except Exception:
+        # 这一轮没备份成功，改动留到下一轮
+        with _changed_lock:
+            _changed["players"] |= players
+            _changed["boss"] |= boss
+            _changed_full = _changed_full or full
+        raise
+
+
+def restore_backup(ts: Optional[float], out_dir: str) -> Dict[str, int]:
+    """
+    把 ts 时刻（None 为最新）的数据写成旧版单文件 players.json / boss.json 放到 out_dir，
+    停机后替换 data/ 下对应文件（并删掉 players.db / groups/）即可按首次启动的导入流程恢复。
+    """
+    state = get_backup_set().restore(ts)
+    out: Dict[str, Dict[str, Dict]] = {"players": {}, "boss": {}}
+    for key, record in state.items():
+        kind, _, k = key.partition("/")
+        out[kind][k] = record
+    os.makedirs(out_dir, exist_ok=True)
+    for kind, filename in (("players", "players.json"), ("boss", "boss.json")):
+        with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(out[kind], f, ensure_ascii=False, indent=2)
+    return {kind: len(v) for kind, v in out.items()}
+
+
+def prune_backups(keep_seconds: float) -> int:
+    """合并 keep_seconds 之前的备份段，返回删除的段数"""
+    return get_backup_set().prune(time.time() - keep_seconds)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+给 async 处理函数用的存储工具：
+- run_io：把会碰磁盘的同步调用丢到专用线程池，事件循环不被文件 I/O / 线程锁卡住
+- KeyedLock：按 key 的 asyncio.Lock，同一个 key 的写入按调用顺序排队，不同 key 互不影响
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+IO_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="rpg-storage")
+
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executor():
+    """等已提交的 I/O 做完再关线程池，关闭钩子里最后调用"""
+    _executor.shutdown(wait=True)
+
+
+class KeyedLock:
+    """没有协程持有或等待时自动回收，不会随 key 数量无限增长"""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            n = self._users[key] - 1
+            if n:
+                self._users[key] = n
+            else:
+                del self._users[key]
+                del self._locks[key]
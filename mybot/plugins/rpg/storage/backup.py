@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+增量备份：data/backups/
+- 每次备份写一个段文件 <时间>.seg（与快照同格式，见 serializers），只包含内容哈希和上次备份不同的记录
+- index.json 记录所有段（时间、文件、条数、是否全量）和每条记录最近一次备份的哈希
+- 恢复到某个时间点 = 按时间顺序重放不晚于该时间的所有段
+- 清理：把早于保留期的段合并成一个全量段，之后的恢复点不受影响
+要检查哪些记录由调用方决定（通常是上次备份后被写过的 key），所以一次备份的代价和这段时间的改动量成正比。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+from .serializers import BinarySerializer, JsonSerializer, read_snapshot
+
+INDEX_FILE = "index.json"
+
+
+def _digest(record: Dict) -> str:
+    raw = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class BackupSet:
+    def __init__(self, root: str, serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+        self.root = root
+        self.serializer = serializer or BinarySerializer()
+        # 同一时间只跑一个备份 / 清理；不和存储的写入路径共用任何锁
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    # ---------- 索引 ----------
+    def _load_index(self) -> Dict:
+        path = os.path.join(self.root, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"segments": [], "hashes": {}}
+
+    def _save_index(self):
+        data = json.dumps(self._index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        _write_atomic(os.path.join(self.root, INDEX_FILE), data)
+
+    def points(self) -> List[float]:
+        """可恢复的时间点（段的时间戳，升序）"""
+        return [s["ts"] for s in self._index["segments"]]
+
+    # ---------- 备份 ----------
+    def _new_segment_name(self, ts: float, suffix: str = ".seg") -> str:
+        base = time.strftime("%Y%m%d-%H%M%S", time.localtime(ts)) + f"-{int(ts * 1000) % 1000:03d}"
+        name, n = base + suffix, 1
+        while os.path.exists(os.path.join(self.root, name)):
+            name, n = f"{base}.{n}{suffix}", n + 1
+        return name
+
+    def snapshot(self, records: Dict[str, Dict]) -> int:
+        """
+        records：本轮要检查的记录（key -> record）。只把哈希变了的写进新段，返回写入条数；
+        都没变时不产生新段。
+        """
+        with self._lock:
+            hashes = self._index["hashes"]
+            changed, new_hashes = {}, {}
+            for key, record in records.items():
+                h = _digest(record)
+                if hashes.get(key) != h:
+                    changed[key] = record
+                    new_hashes[key] = h
+            if not changed:
+                return 0
+            ts = time.time()
+            name = self._new_segment_name(ts)
+            _write_atomic(os.path.join(self.root, name), self.serializer.snapshot(changed))
+            # 段文件落盘后才更新索引；中途崩溃只会留下索引里没有的孤儿段
+            self._index["segments"].append({"ts": ts, "file": name, "count": len(changed), "full": False})
+            hashes.update(new_hashes)
+            self._save_index()
+            return len(changed)
+
+    # ---------- 恢复 ----------
+    def _replay(self, segments: Iterable[Dict]) -> Dict[str, Dict]:
+        state: Dict[str, Dict] = {}
+        for seg in segments:
+            with open(os.path.join(self.root, seg["file"]), "rb") as f:
+                state.update(read_snapshot(f.read()))
+        return state
+
+    def restore(self, ts: Optional[float] = None) -> Dict[str, Dict]:
+        """ts 时刻（含）的全部记录；ts 为 None 时取最新"""
+        with self._lock:
+            segments = [s for s in self._index["segments"] if ts is None or s["ts"] <= ts]
+            return self._replay(segments)
+
+    # ---------- 清理 ----------
+    def prune(self, before_ts: float) -> int:
+        """把早于 before_ts 的段合并成一个全量段，返回删除的段文件数"""
+        with self._lock:
+            segments = self._index["segments"]
+            old = [s for s in segments if s["ts"] < before_ts]
+            if len(old) <= 1:
+                return 0
+            # 合并后的全量段沿用最后一个旧段的时间，之后的恢复点结果不变
+            last = old[-1]
+            state = self._replay(old)
+            name = self._new_segment_name(last["ts"], ".full.seg")
+            _write_atomic(os.path.join(self.root, name), self.serializer.snapshot(state))
+            merged = {"ts": last["ts"], "file": name, "count": len(state), "full": True}
+            self._index["segments"] = [merged] + segments[len(old):]
+            self._save_index()
+            for s in old:
+                try:
+                    os.remove(os.path.join(self.root, s["file"]))
+                except OSError as e:
+                    print(f"删除旧备份段失败 {s['file']}: {e}")
+            return len(old)
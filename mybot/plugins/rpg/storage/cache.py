@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+写回缓存（identity map）：
+- 同一个 key 在进程内只对应一个对象，读命中不碰磁盘
+- put 只打脏标记，由定时任务 / 关闭钩子调用 flush() 批量落盘
+- 超过 max_size 时按最近访问时间（LRU）淘汰，脏对象淘汰前先写出
+- commit() 按对象的 version 做比较交换，旧实例不能覆盖别人已经提交的新版本；commit_many() 多个 key 一起检查、一起提交
+- 写存储（flush / 淘汰）互斥，exclusive() 里绕过缓存直接改存储时不会被并发的写出覆盖
+缓存的对象只需要提供 to_dict()；用 commit() 时还要有整数属性 version。
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_MAX_SIZE = 2048
+
+
+class StaleWriteError(RuntimeError):
+    """要写回的对象读出之后，同一个 key 已经被别的实例提交过"""
+
+
+class WriteBackCache:
+    def __init__(self, writer: Callable[[List[Dict]], None], max_size: int = DEFAULT_MAX_SIZE):
+        # writer 接收一批 to_dict() 结果，需保证整批写入
+        self.writer = writer
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # 写出（flush / 淘汰 / exclusive）次数，commit / add 用来判断读盘期间存储有没有被改过
+        self._writes = 0
+        self._lock = threading.RLock()
+        # 所有写存储的路径都先拿这把锁再拿 _lock；flush 调 writer 时只持有它，不挡读
+        self._write_lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key: str):
+        return key in self._items
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            obj = self._items.get(key)
+            if obj is not None:
+                self._items.move_to_end(key)
+            return obj
+
+    def stamp(self) -> int:
+        """读盘前取一次，传给 add(loaded_at=...)"""
+        return self._writes
+
+    def add(self, key: str, obj: Any, dirty: bool = False, loaded_at: Optional[int] = None) -> Optional[Any]:
+        """
+        放入刚从存储读出的对象；key 已在缓存中时返回已有对象，保证同 key 只有一个实例。
+        传了 loaded_at（读盘前的 stamp()）且读盘之后存储被写过时不放入，返回 None，调用方重读
+        """
+        with self._write_lock, self._lock:
+            existing = self._items.get(key)
+            if existing is not None:
+                self._items.move_to_end(key)
+                return existing
+            if loaded_at is not None and loaded_at != self._writes:
+                return None
+            self._items[key] = obj
+            if dirty:
+                self._dirty.add(key)
+            self._evict()
+            return obj
+
+    def load(self, key: str, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """取缓存，未命中时用 loader() 读存储并放入；loader 返回 None（存储里没有）时返回 None"""
+        while True:
+            obj = self.get(key)
+            if obj is not None:
+                return obj
+            stamp = self.stamp()
+            obj = loader()
+            if obj is None:
+                return None
+            obj = self.add(key, obj, loaded_at=stamp)
+            if obj is not None:
+                return obj
+
+    def mark_dirty(self, key: str, obj: Any):
+        """对象有改动，等待下一次 flush；传入的对象与缓存中的不同时以传入的为准"""
+        with self._write_lock, self._lock:
+            self._items[key] = obj
+            self._items.move_to_end(key)
+            self._dirty.add(key)
+            self._evict()
+
+    def commit(self, key: str, obj: Any, stored_version: Callable[[], Optional[int]]):
+        """
+        比较交换版的 mark_dirty：obj.version 必须等于当前已提交的版本，成功后 version 加一。
+        缓存里就是 obj 本身时直接通过（同一个实例上的改动不会丢）；
+        key 不在缓存里时用 stored_version() 读存储里的版本比较。
+        """
+        self.commit_many([(key, obj)], lambda _: stored_version())
+
+    def commit_many(self, items: List[Tuple[str, Any]], stored_version: Callable[[str], Optional[int]]):
+        """
+        一次提交多个对象：先在锁内检查全部版本，任一冲突就抛 StaleWriteError、一个都不写；
+        全部通过才一起打脏标记。双方钻石互转这类改动要么都生效，要么都不生效
+        """
+        while True:
+            writes = self._writes
+            # 读盘不占缓存锁；期间有过写出（可能正好写了这些 key）就重读
+            stored = {key: stored_version(key) for key, _ in items if key not in self._items}
+            with self._write_lock, self._lock:
+                if writes != self._writes and any(key not in self._items for key, _ in items):
+                    continue
+                for key, obj in items:
+                    current = self._items.get(key)
+                    if current is None:
+                        latest = stored.get(key)
+                    elif current is obj:
+                        latest = obj.version
+                    else:
+                        latest = current.version
+                    if latest is not None and latest != obj.version:
+                        raise StaleWriteError(f"{key} 已被更新（当前版本 {latest}，写入基于 {obj.version}）")
+                for key, obj in items:
+                    obj.version += 1
+                    self._items[key] = obj
+                    self._items.move_to_end(key)
+                    self._dirty.add(key)
+                self._evict()
+                return
+
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def flush(self) -> int:
+        """把所有脏对象写出，返回写出条数；写入失败时脏标记保留，下次重试"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                keys = list(self._dirty)
+                records = [self._items[k].to_dict() for k in keys]
+                self._dirty.clear()
+            try:
+                self.writer(records)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(k for k in keys if k in self._items)
+                raise
+            # 写出期间被淘汰的 key 可能已经有人从存储读了旧值，让它重读
+            self._writes += 1
+        return len(records)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        with cache.exclusive(): 期间别的线程不能写出，也不能读写缓存；
+        用于绕过缓存直接改存储，改完后对受影响的 key 调 invalidate()。
+        退出时计一次写出，读盘早于这次修改的 add / commit 会重读
+        """
+        with self._write_lock, self._lock:
+            try:
+                yield
+            finally:
+                self._writes += 1
+
+    def invalidate(self, keys: Iterable[str]):
+        """丢弃缓存（不写出），用于存储层被直接修改之后"""
+        with self._lock:
+            for k in keys:
+                self._items.pop(k, None)
+                self._dirty.discard(k)
+
+    def _evict(self):
+        # 调用方已持有锁
+        if len(self._items) <= self.max_size:
+            return
+        evicted = []
+        while len(self._items) > self.max_size:
+            key, obj = self._items.popitem(last=False)
+            if key in self._dirty:
+                evicted.append((key, obj))
+        if not evicted:
+            return
+        try:
+            self.writer([obj.to_dict() for _, obj in evicted])
+        except Exception as e:
+            # 写失败的放回最久未访问的一端，保留脏标记，下次淘汰或 flush 再写；缓存暂时超出上限
+            print(f"淘汰写出失败，{len(evicted)} 条改动留在缓存: {e}")
+            for key, obj in reversed(evicted):
+                self._items[key] = obj
+                self._items.move_to_end(key, last=False)
+            return
+        self._dirty.difference_update(key for key, _ in evicted)
+        # 写完再计数：commit 前后计数没变，说明它读盘期间没有淘汰写出
+        self._writes += 1
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+gid -> uid 集合的二级索引：put 时增量维护，打开存储时从主键重建。
+按群计数是 O(1)，随机抽一个群成员（可排除自己）也是 O(1)。
+"""
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _UidSet:
+    """列表 + 位置表，既能 O(1) 判重又能 O(1) 随机取"""
+
+    __slots__ = ("items", "pos")
+
+    def __init__(self):
+        self.items: List[str] = []
+        self.pos: Dict[str, int] = {}
+
+    def add(self, uid: str):
+        if uid not in self.pos:
+            self.pos[uid] = len(self.items)
+            self.items.append(uid)
+
+    def discard(self, uid: str):
+        i = self.pos.pop(uid, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.pos[last] = i
+
+
+class GroupIndex:
+    def __init__(self, pairs: Iterable[Tuple[str, str]] = ()):
+        self._groups: Dict[str, _UidSet] = {}
+        self._lock = threading.Lock()
+        for gid, uid in pairs:
+            self._add(str(gid), str(uid))
+
+    def _add(self, gid: str, uid: str):
+        s = self._groups.get(gid)
+        if s is None:
+            s = self._groups[gid] = _UidSet()
+        s.add(uid)
+
+    def add(self, gid: str, uid: str):
+        with self._lock:
+            self._add(str(gid), str(uid))
+
+    def add_many(self, pairs: Iterable[Tuple[str, str]]):
+        with self._lock:
+            for gid, uid in pairs:
+                self._add(str(gid), str(uid))
+
+    def discard(self, gid: str, uid: str):
+        with self._lock:
+            s = self._groups.get(gid)
+            if s is not None:
+                s.discard(uid)
+
+    def uids(self, gid: str) -> List[str]:
+        s = self._groups.get(gid)
+        return list(s.items) if s else []
+
+    def count(self, gid: str) -> int:
+        s = self._groups.get(gid)
+        return len(s.items) if s else 0
+
+    def sample(self, gid: str, exclude: Optional[str] = None) -> Optional[str]:
+        """随机取一个群成员，exclude 不参与抽取；没有可选成员时返回 None"""
+        with self._lock:
+            s = self._groups.get(gid)
+            if not s:
+                return None
+            n = len(s.items)
+            skip = s.pos.get(exclude) if exclude is not None else None
+            if skip is None:
+                return s.items[random.randrange(n)] if n else None
+            if n <= 1:
+                return None
+            i = random.randrange(n - 1)
+            return s.items[i + 1 if i >= skip else i]
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+快照 + 追加日志（journal）存储：
+- 快照：<path>，JSON 时即原来的整份 {key: record}（兼容旧的 players.json / boss.json），二进制时是一串日志帧
+- 日志：<path>.journal，每次 put 追加一条记录（JSON 一行 {"k": key, "v": record}，或一个二进制帧）
+- 启动时读快照再按顺序重放日志；末尾写了一半的记录丢弃，并把日志文件截回最后一条完整记录，之后的追加才不会接在残缺记录后面
+- 日志超过阈值后在锁内改名切换到新日志文件（不复制），后台线程把内存状态写成新快照再删掉旧日志
+- 同一时间段内的并发 put 由先到的线程统一 fsync（group commit），写盘失败时这一批的每个 put 都抛出同一个异常
+每次写入的代价只和这条记录大小有关，崩溃安全仍靠 fsync + os.replace。
+内存里的记录写入后就不再修改（改动都是整条替换），读接口返回副本，
+调用方改了返回值也不影响存储，后台写快照时遍历的也是不会再变的对象。
+"""
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from .index import GroupIndex
+from .keys import player_key, player_key_of
+from .serializers import BinarySerializer, JsonSerializer, project, read_entries, read_snapshot
+
+DEFAULT_COMPACT_BYTES = 4 * 1024 * 1024
+
+
+def _clone(value):
+    """JSON 结构的深拷贝，比 copy.deepcopy 快"""
+    t = type(value)
+    if t is dict:
+        return {k: _clone(v) for k, v in value.items()}
+    if t is list:
+        return [_clone(v) for v in value]
+    return value
+
+
+def recover(path: str, repair: bool = False) -> Dict[str, Dict]:
+    """
+    读快照并重放日志，得到最新状态。默认只读，不创建、不修改任何文件；
+    repair=True 时把日志末尾残缺的记录截掉（打开来追加写之前调用）
+    """
+    data: Dict[str, Dict] = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = read_snapshot(f.read())
+    # 上次压缩中途退出时旧日志还在，要先于新日志重放；.rotated 是快照没写成功时又切出来的一段
+    for p in (path + ".journal.old", path + ".journal.rotated", path + ".journal"):
+        if not os.path.exists(p):
+            continue
+        with open(p, "rb") as f:
+            raw = f.read()
+        entries, good = read_entries(raw)
+        data.update(entries)
+        if repair and good < len(raw):
+            print(f"日志末尾有 {len(raw) - good} 字节残缺记录，已截掉: {p}")
+            os.truncate(p, good)
+    return data
+
+
+class JournalStore:
+    def __init__(self, path: str, key_of: Callable[[Dict], str], compact_bytes: int = DEFAULT_COMPACT_BYTES,
+                 serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+        self.path = path
+        self.serializer = serializer or JsonSerializer()
+        self.journal_path = path + ".journal"
+        self.old_journal_path = path + ".journal.old"
+        self.rotated_journal_path = path + ".journal.rotated"
+        self.key_of = key_of
+        self.compact_bytes = compact_bytes
+
+        self._data: Dict[str, Dict] = {}
+        # _lock 保护内存状态和日志文件句柄；_cond 用于 group commit 排队
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending: List[bytes] = []
+        self._next_seq = 0
+        # 已结束写盘（成功或失败）的最大序号；失败的序号在 _errors 里，由对应的 put 取走并抛出
+        self._done_seq = -1
+        self._errors: Dict[int, BaseException] = {}
+        self._syncing = False
+        self._compacting = False
+
+        self._recover()
+        self._journal = open(self.journal_path, "ab")
+        self._journal_size = self._journal.tell()
+
+    # ---------- 启动恢复 ----------
+    def _recover(self):
+        self._data = recover(self.path, repair=True)
+
+    # ---------- 读 ----------
+    def lookup(self, key: str) -> Optional[Dict]:
+        r = self._data.get(key)
+        return None if r is None else _clone(r)
+
+    def values(self) -> List[Dict]:
+        with self._lock:
+            records = list(self._data.values())
+        return [_clone(r) for r in records]
+
+    def all(self) -> Dict[str, Dict]:
+        with self._lock:
+            items = list(self._data.items())
+        return {k: _clone(r) for k, r in items}
+
+    def count(self) -> int:
+        return len(self._data)
+
+    # ---------- 写 ----------
+    def put(self, record: Dict):
+        self.put_many([record])
+
+    def put_many(self, records: Iterable[Dict]):
+        records = list(records)
+        if not records:
+            return
+        # 内存里存一份独立副本，不和调用方共用 list/dict（后台写快照时会遍历）
+        entries = [(self.key_of(r), json.loads(json.dumps(r))) for r in records]
+        entry = self.serializer.entry
+        buf = b"".join(entry(k, v) for k, v in entries)
+        with self._cond:
+            for k, v in entries:
+                self._data[k] = v
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append(buf)
+            while self._done_seq < seq:
+                if self._syncing:
+                    # 别人正在 fsync，等它把我们这一批也带上
+                    self._cond.wait()
+                    continue
+                self._sync_pending()
+            error = self._errors.pop(seq, None)
+            if error is not None:
+                raise error
+            self._maybe_compact()
+
+    def _sync_pending(self):
+        # 调用方持有 _cond；写盘期间释放锁，让后来的 put 继续排队
+        self._syncing = True
+        size = self._journal_size
+        batch, self._pending = self._pending, []
+        first, upto = self._done_seq + 1, self._next_seq - 1
+        journal = self._journal
+        data = b"".join(batch)
+        self._cond.release()
+        error = None
+        try:
+            journal.write(data)
+            journal.flush()
+            os.fsync(journal.fileno())
+        except BaseException as e:
+            error = e
+        self._cond.acquire()
+        if error is None:
+            self._journal_size += len(data)
+        else:
+            # 这一批没有落盘，等在这些序号上的 put 都要抛出
+            for seq in range(first, upto + 1):
+                self._errors[seq] = error
+            self._truncate_journal(size)
+        self._done_seq = upto
+        self._syncing = False
+        self._cond.notify_all()
+
+    def _truncate_journal(self, size: int):
+        """把写了一半的一批截掉，回到 size 字节；调用方持有 _cond 且 _syncing 为真"""
+        try:
+            # 缓冲区里可能还有没写出去的部分，关掉句柄再截断，重新打开追加
+            self._journal.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.journal_path, size)
+        except OSError as e:
+            print(f"日志截断失败 {self.journal_path}: {e}")
+        self._journal = open(self.journal_path, "ab")
+        self._journal_size = self._journal.tell()
+
+    # ---------- 压缩 ----------
+    def _maybe_compact(self):
+        # 调用方持有 _cond
+        if self._compacting or self._syncing or self._pending:
+            return
+        if self._journal_size < self.compact_bytes:
+            return
+        snapshot = self._rotate()
+        threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True).start()
+
+    def _rotate(self) -> Dict[str, Dict]:
+        """
+        在锁内切换日志并拍下内存副本：此前的写入都在旧日志和副本里，此后的写入进新日志。
+        锁内只改名，不复制文件；上一次快照没写成功、旧日志还在时，改名成 .rotated 留给后台线程处理
+        """
+        self._compacting = True
+        self._journal.close()
+        if not os.path.exists(self.old_journal_path):
+            os.replace(self.journal_path, self.old_journal_path)
+        else:
+            if os.path.exists(self.rotated_journal_path):
+                # 连着两次快照和合并都失败才会走到这里，只能在锁内合并
+                self._merge_rotated()
+            os.replace(self.journal_path, self.rotated_journal_path)
+        self._journal = open(self.journal_path, "ab")
+        self._journal_size = 0
+        # 在锁内拍下；记录本身写入后不再修改，浅拷贝就够，后台线程序列化时不会遇到正在变的字典
+        return dict(self._data)
+
+    def _merge_rotated(self):
+        """把 .rotated 接到旧日志后面；中途崩溃时两边会有重复记录，按顺序重放结果不变"""
+        with open(self.rotated_journal_path, "rb") as src, open(self.old_journal_path, "ab") as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(self.rotated_journal_path)
+
+    def _write_snapshot(self, snapshot: Dict[str, Dict]):
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.serializer.snapshot(snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            # 先删更早的 .old：中途退出时只剩 .rotated，重放它得到的还是快照里的值
+            os.remove(self.old_journal_path)
+            if os.path.exists(self.rotated_journal_path):
+                os.remove(self.rotated_journal_path)
+        except Exception as e:
+            print(f"快照写入失败 {self.path}: {e}")
+            try:
+                if os.path.exists(self.rotated_journal_path):
+                    self._merge_rotated()
+            except OSError as e:
+                print(f"旧日志合并失败 {self.path}: {e}")
+        finally:
+            with self._cond:
+                self._compacting = False
+                self._cond.notify_all()
+
+    def compact(self):
+        """立即压缩（同步执行），关闭前或测试时使用"""
+        with self._cond:
+            while self._syncing or self._compacting:
+                self._cond.wait()
+            snapshot = self._rotate()
+        self._write_snapshot(snapshot)
+
+    def close(self):
+        with self._cond:
+            # 等后台快照写完，避免关闭后旧日志才被删除
+            while self._syncing or self._compacting:
+                self._cond.wait()
+            self._journal.close()
+
+
+class JournalPlayerStore(JournalStore):
+    """玩家版本：主键 gid:uid，读写接口与 SqlitePlayerStore 一致"""
+
+    def __init__(self, path: str, compact_bytes: int = DEFAULT_COMPACT_BYTES,
+                 serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+        super().__init__(path, player_key_of, compact_bytes, serializer)
+        self._groups = GroupIndex((r["gid"], r["uid"]) for r in self._data.values())
+
+    def put_many(self, records: Iterable[Dict]):
+        records = list(records)
+        super().put_many(records)
+        self._groups.add_many((r["gid"], r["uid"]) for r in records)
+
+    # 内存里已经是解码好的字典，按字段投影时只拷贝用到的字段
+    def get(self, gid: str, uid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        r = self._data.get(player_key(gid, uid))
+        if r is None:
+            return None
+        return _clone(r if fields is None else project(r, fields))
+
+    def increment_field(self, gid: str, field: str, delta: int | float,
+                        where: Optional[Callable[[Dict], bool]] = None) -> List[str]:
+        """给本群玩家的某个数值字段加 delta（version 同时加一），整批追加为一次日志写入，返回受影响的 uid"""
+        updated = []
+        for r in self.by_gid(gid):
+            if where is not None and not where(r):
+                continue
+            r[field] = r.get(field, 0) + delta
+            r["version"] = r.get("version", 0) + 1
+            updated.append(r)
+        self.put_many(updated)
+        return [r["uid"] for r in updated]
+
+    def by_gid(self, gid: str, fields: Optional[List[str]] = None) -> List[Dict]:
+        data = self._data
+        out = [data[k] for k in (player_key(gid, uid) for uid in self._groups.uids(gid)) if k in data]
+        return [_clone(r if fields is None else project(r, fields)) for r in out]
+
+    def all(self, fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        if fields is None:
+            return super().all()
+        with self._lock:
+            items = list(self._data.items())
+        return {k: _clone(project(r, fields)) for k, r in items}
+
+    def group_uids(self, gid: str) -> List[str]:
+        return self._groups.uids(gid)
+
+    def count_group(self, gid: str) -> int:
+        return self._groups.count(gid)
+
+    def sample_group(self, gid: str, exclude: Optional[str] = None) -> Optional[str]:
+        return self._groups.sample(gid, exclude)
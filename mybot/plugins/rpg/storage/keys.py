@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""存储层统一的主键格式"""
+
+
+def player_key(gid: str, uid: str) -> str:
+    return f"{gid}:{uid}"
+
+
+def player_key_of(record) -> str:
+    return player_key(str(record["gid"]), str(record["uid"]))
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+流式迁移 / 导入导出：逐条读源、升级到当前 schema、分批写目标，整个文件不进内存。
+源 / 目标按路径识别：
+- *.db           SQLite 玩家库（只用于玩家）
+- *.jsonl        每行一条记录，导入导出用
+- *.json         旧版单文件 {key: record}（只作为源；旁边的 .journal 日志也会重放）
+- 目录           按群分片的 journal 存储（data/groups 这种）
+"""
+import json
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .journal import JournalStore, recover
+from .keys import player_key_of
+from .schema import upgrade_boss, upgrade_player
+from .serializers import BinarySerializer, JsonSerializer
+from .sharding import ShardedPlayerStore, ShardedStore
+from .sqlite_store import SqlitePlayerStore
+
+KINDS = ("players", "boss")
+BATCH_SIZE = 1000
+_CHUNK_SIZE = 1 << 16
+
+
+def _boss_key(record: Dict) -> str:
+    return str(record["gid"])
+
+
+UPGRADES: Dict[str, Callable[[Dict], Dict]] = {"players": upgrade_player, "boss": upgrade_boss}
+KEY_OF: Dict[str, Callable[[Dict], str]] = {"players": player_key_of, "boss": _boss_key}
+SHARD_FILES = {"players": "players.json", "boss": "boss.json"}
+
+
+# ---------- 读 ----------
+def iter_json_object(path: str, chunk_size: int = _CHUNK_SIZE) -> Iterator[Dict]:
+    """逐条产出 {key: record} 形式 JSON 文件里的 record，按块读取"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def skip(chars: str) -> str:
+            # 跳过空白和 chars 里的分隔符，返回下一个有效字符（读完为空串）
+            nonlocal pos
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] in chars):
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ""
+
+        def value():
+            nonlocal pos
+            while True:
+                try:
+                    v, end = decoder.raw_decode(buf, pos)
+                    # 数字等可能正好被块边界截断，后面还有内容时先补一块再解析
+                    if end == len(buf) and fill():
+                        continue
+                    pos = end
+                    return v
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+
+        if skip("") != "{":
+            return
+        pos += 1
+        while True:
+            c = skip(",")
+            if c in ("}", ""):
+                return
+            value()  # key
+            skip(":")
+            yield value()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_source(path: str, kind: str) -> Iterator[Dict]:
+    if os.path.isdir(path):
+        yield from ShardedStore(path, SHARD_FILES[kind], lambda p: JournalStore(p, KEY_OF[kind])).iter_records()
+    elif path.endswith(".db"):
+        store = SqlitePlayerStore(path)
+        try:
+            yield from store.iter_records()
+        finally:
+            store.close()
+    elif path.endswith(".jsonl"):
+        yield from iter_jsonl(path)
+    elif os.path.exists(path + ".journal") or os.path.exists(path + ".journal.old"):
+        # 旧版单文件 + 追加日志：只能整体重放
+        yield from recover(path).values()
+    else:
+        yield from iter_json_object(path)
+
+
+# ---------- 写 ----------
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp = path + ".tmp"
+        self._f = open(self._tmp, "w", encoding="utf-8")
+
+    def put_many(self, records: Iterable[Dict]):
+        for r in records:
+            self._f.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")))
+            self._f.write("\n")
+
+    def close(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+
+def open_target(path: str, kind: str, serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+    """目标必须是新的（不存在的文件或空目录），避免和正在用的数据混写"""
+    if os.path.exists(path) and not (os.path.isdir(path) and not os.listdir(path)):
+        raise FileExistsError(f"迁移目标已存在: {path}")
+    if path.endswith(".jsonl"):
+        return JsonlWriter(path)
+    if path.endswith(".db"):
+        if kind != "players":
+            raise ValueError("SQLite 目标只支持玩家数据")
+        return SqlitePlayerStore(path, serializer)
+    if kind == "players":
+        return ShardedPlayerStore(path, serializer=serializer)
+    return ShardedStore(path, SHARD_FILES[kind], lambda p: JournalStore(p, KEY_OF[kind], serializer=serializer))
+
+
+def copy_records(records: Iterable[Dict], write: Callable[[List[Dict]], None],
+                 upgrade: Optional[Callable[[Dict], Dict]] = None, batch_size: int = BATCH_SIZE) -> int:
+    """逐条升级后每 batch_size 条调用一次 write，返回条数"""
+    n = 0
+    batch: List[Dict] = []
+    for r in records:
+        batch.append(upgrade(r) if upgrade else r)
+        if len(batch) >= batch_size:
+            write(batch)
+            n += len(batch)
+            batch = []
+    if batch:
+        write(batch)
+        n += len(batch)
+    return n
+
+
+def migrate(src: str, dst: str, kind: str, serializer=None, batch_size: int = BATCH_SIZE) -> int:
+    """把 src 的记录升级到当前 schema 写进新的 dst，返回条数"""
+    if kind not in KINDS:
+        raise ValueError(f"未知的数据类型: {kind}，可选 {KINDS}")
+    target = open_target(dst, kind, serializer)
+    try:
+        return copy_records(iter_source(src, kind), target.put_many, UPGRADES[kind], batch_size)
+    finally:
+        target.close()
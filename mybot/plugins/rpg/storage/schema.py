@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+记录的 schema 版本与升级：
+- 当前版本的记录带 "schema" 字段，所有字段齐全、字段名统一（points 里只用 "def"）
+- upgrade_* 把旧形状（缺字段、def_、没有 extra_points / config 等）补成当前版本
+导入 / 迁移时统一升级，models 的 from_dict 只认当前版本；读到旧记录时先走一次 upgrade。
+"""
+import heapq
+import time
+from typing import Dict, Optional
+
+PLAYER_SCHEMA = 1
+# 2：BOSS 增加 top（伤害前 K 名的 uid，按伤害降序）、names（前 K 名的显示名）、hits（出刀次数）
+BOSS_SCHEMA = 2
+BOSS_BOARD_SIZE = 10
+
+
+def _today() -> str:
+    # 与 storage.today_tag 相同；这里不能反过来 import 包入口
+    return time.strftime("%Y-%m-%d", time.localtime())
+
+
+def _points(d: Optional[Dict]) -> Dict:
+    d = d or {}
+    return {
+        "str": d.get("str", 0),
+        "def": d.get("def", d.get("def_", 0)),
+        "hp": d.get("hp", 0),
+        "agi": d.get("agi", 0),
+        "crit": d.get("crit", 0),
+    }
+
+
+def upgrade_player(d: Dict) -> Dict:
+    """返回当前 schema 的玩家记录；已经是当前版本时原样返回"""
+    if d.get("schema") == PLAYER_SCHEMA:
+        return d
+    weapon = d.get("weapon") or {}
+    counters = d.get("counters") or {}
+    config = d.get("config") or {}
+    return {
+        "uid": str(d["uid"]),
+        "gid": str(d["gid"]),
+        "name": d.get("name", d["uid"]),
+        "level": d.get("level", 1),
+        "unspent": d.get("unspent", 0),
+        "points": _points(d.get("points")),
+        "extra_points": _points(d.get("extra_points")),
+        "weapon": {
+            "name": weapon.get("name", "无名之刃"),
+            "level": weapon.get("level", 1),
+            "slots": list(weapon.get("slots", [1, 1, 1])),
+        },
+        "dust": d.get("dust", 0),
+        "diamond": d.get("diamond", 0),
+        "tear": d.get("tear", 0),
+        # 旧记录没有日期时视为今天（和以前读取时的处理一致）
+        "counters": {
+            "daily_date": counters.get("daily_date", _today()),
+            "free_explore_used": counters.get("free_explore_used", 0),
+            "boss_hits": counters.get("boss_hits", 0),
+            "signed": counters.get("signed", False),
+        },
+        "config": {"battle_report_model": config.get("battle_report_model", 0)},
+        "skills": d.get("skills", {}),
+        "equipped_skills": d.get("equipped_skills", []),
+        "version": d.get("version", 0),
+        "schema": PLAYER_SCHEMA,
+    }
+
+
+def upgrade_boss(d: Dict) -> Dict:
+    if d.get("schema") == BOSS_SCHEMA:
+        return d
+    board = d.get("board", {})
+    top = heapq.nlargest(BOSS_BOARD_SIZE, board, key=board.get)
+    names = d.get("names", {})
+    return {
+        "gid": str(d["gid"]),
+        "boss_date": d.get("boss_date", _today()),
+        "name": d.get("name"),
+        "hp": d.get("hp", 10000),
+        "hp_max": d.get("hp_max", 10000),
+        "board": board,
+        "killed": d.get("killed", False),
+        # 旧记录里没有名字，排行榜先显示 uid，这些人下次出刀时补上
+        "top": top,
+        "names": {uid: names[uid] for uid in top if uid in names},
+        "hits": d.get("hits", 0),
+        "schema": BOSS_SCHEMA,
+    }
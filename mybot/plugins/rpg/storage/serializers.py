@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+记录的序列化格式：
+- json：紧凑 JSON，可读，调试 / 导出用
+- binary：msgpack 风格的紧凑二进制，带 schema 版本号；
+  常见字段名（Player / Boss 的 to_dict 键）编码成 1 个字节，小整数 1 个字节，变长整数用 varint
+读取时按首字节自动识别，两种格式可以混在同一个文件 / 同一张表里，切换格式不需要迁移。
+loads(data, fields) 只取部分顶层字段：二进制记录里其余字段直接跳过，不构造对象。
+
+二进制单条记录：0xC1 | 版本 | 值
+二进制日志帧：  0xC1 | 版本 | 4 字节小端长度 | 键 | 值
+0xC1 不是合法的 UTF-8 首字节，不会和 JSON 混淆。
+"""
+import json
+import struct
+from typing import Dict, Generator, Iterable, Optional, Set, Tuple, Union
+
+MAGIC = 0xC1
+SCHEMA_VERSION = 1
+
+# 字段表只能在末尾追加；删改已有位置要升 SCHEMA_VERSION
+FIELD_NAMES = (
+    # Player
+    "uid", "gid", "name", "level", "unspent", "points", "extra_points", "weapon",
+    "dust", "diamond", "tear", "counters", "config", "skills", "equipped_skills",
+    # Points / Weapon / Counters / Pconfig
+    "str", "def", "hp", "agi", "crit", "slots",
+    "daily_date", "free_explore_used", "boss_hits", "signed", "battle_report_model",
+    # Boss
+    "boss_date", "hp_max", "board", "killed",
+    # Player 版本号，记录 schema 版本
+    "version", "schema",
+    # Boss 排行榜
+    "top", "names", "hits",
+)
+_FIELD_ID = {k: i for i, k in enumerate(FIELD_NAMES)}
+
+_NIL, _FALSE, _TRUE = 0xC0, 0xC2, 0xC3
+_INT, _FLOAT, _STR, _LIST, _MAP = 0xD0, 0xCB, 0xD9, 0xDC, 0xDE
+_F64 = struct.Struct("<d")
+_U32 = struct.Struct("<I")
+
+
+def _varint(n: int, out: bytearray):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode(obj, out: bytearray):
+    t = type(obj)
+    if t is str:
+        raw = obj.encode("utf-8")
+        n = len(raw)
+        if n < 32:
+            out.append(0xA0 | n)
+        else:
+            out.append(_STR)
+            _varint(n, out)
+        out += raw
+    elif t is int:
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        else:
+            out.append(_INT)
+            _varint(obj << 1 if obj >= 0 else (~obj << 1) | 1, out)
+    elif t is dict:
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        else:
+            out.append(_MAP)
+            _varint(n, out)
+        for k, v in obj.items():
+            # 和 JSON 一样，键一律按字符串存
+            k = k if type(k) is str else str(k)
+            fid = _FIELD_ID.get(k)
+            if fid is None:
+                _encode(k, out)
+            else:
+                out.append(fid)
+            _encode(v, out)
+    elif t is list or t is tuple:
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        else:
+            out.append(_LIST)
+            _varint(n, out)
+        for v in obj:
+            _encode(v, out)
+    elif obj is None:
+        out.append(_NIL)
+    elif t is bool:
+        out.append(_TRUE if obj else _FALSE)
+    elif t is float:
+        out.append(_FLOAT)
+        out += _F64.pack(obj)
+    else:
+        raise TypeError(f"无法序列化的类型: {t.__name__}")
+
+
+def _decode(buf: bytes, pos: int):
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b < 0xC0:
+        end = pos + (b & 0x1F)
+        return buf[pos:end].decode("utf-8"), end
+    if 0x80 <= b < 0x90 or b == _MAP:
+        if b == _MAP:
+            n, pos = _read_varint(buf, pos)
+        else:
+            n = b & 0x0F
+        d = {}
+        for _ in range(n):
+            k = buf[pos]
+            if k < 0x80:
+                k = FIELD_NAMES[k]
+                pos += 1
+            else:
+                k, pos = _decode(buf, pos)
+            # 小整数占了字段的大半，就地解出来省一次函数调用
+            v = buf[pos]
+            if v < 0x80:
+                d[k] = v
+                pos += 1
+            else:
+                d[k], pos = _decode(buf, pos)
+        return d, pos
+    if 0x90 <= b < 0xA0 or b == _LIST:
+        if b == _LIST:
+            n, pos = _read_varint(buf, pos)
+        else:
+            n = b & 0x0F
+        lst = []
+        for _ in range(n):
+            v = buf[pos]
+            if v < 0x80:
+                pos += 1
+            else:
+                v, pos = _decode(buf, pos)
+            lst.append(v)
+        return lst, pos
+    if b == _INT:
+        z, pos = _read_varint(buf, pos)
+        return (z >> 1) if not z & 1 else ~(z >> 1), pos
+    if b == _STR:
+        n, pos = _read_varint(buf, pos)
+        return buf[pos:pos + n].decode("utf-8"), pos + n
+    if b == _NIL:
+        return None, pos
+    if b == _FALSE:
+        return False, pos
+    if b == _TRUE:
+        return True, pos
+    if b == _FLOAT:
+        return _F64.unpack_from(buf, pos)[0], pos + 8
+    raise ValueError(f"未知的类型标记: {b:#x}")
+
+
+def _skip(buf: bytes, pos: int) -> int:
+    """跳过一个值，返回下一个值的位置"""
+    b = buf[pos]
+    pos += 1
+    if b < 0x80 or b >= 0xE0 or b in (_NIL, _FALSE, _TRUE):
+        return pos
+    if 0xA0 <= b < 0xC0:
+        return pos + (b & 0x1F)
+    if b == _STR:
+        n, pos = _read_varint(buf, pos)
+        return pos + n
+    if b == _INT:
+        return _read_varint(buf, pos)[1]
+    if b == _FLOAT:
+        return pos + 8
+    if 0x80 <= b < 0x90 or b == _MAP:
+        if b == _MAP:
+            n, pos = _read_varint(buf, pos)
+        else:
+            n = b & 0x0F
+        for _ in range(n):
+            pos = pos + 1 if buf[pos] < 0x80 else _skip(buf, pos)
+            pos = _skip(buf, pos)
+        return pos
+    if 0x90 <= b < 0xA0 or b == _LIST:
+        if b == _LIST:
+            n, pos = _read_varint(buf, pos)
+        else:
+            n = b & 0x0F
+        for _ in range(n):
+            pos = _skip(buf, pos)
+        return pos
+    raise ValueError(f"未知的类型标记: {b:#x}")
+
+
+def _decode_fields(buf: bytes, pos: int, wanted: Set[str]) -> Dict:
+    b = buf[pos]
+    pos += 1
+    if b == _MAP:
+        n, pos = _read_varint(buf, pos)
+    elif 0x80 <= b < 0x90:
+        n = b & 0x0F
+    else:
+        raise ValueError("按字段读取只支持字典记录")
+    d = {}
+    for _ in range(n):
+        k = buf[pos]
+        if k < 0x80:
+            k = FIELD_NAMES[k]
+            pos += 1
+        else:
+            k, pos = _decode(buf, pos)
+        if k in wanted:
+            d[k], pos = _decode(buf, pos)
+        else:
+            pos = _skip(buf, pos)
+    return d
+
+
+def project(record: Dict, fields: Iterable[str]) -> Dict:
+    """从已解码的记录里取部分字段"""
+    return {k: record[k] for k in fields if k in record}
+
+
+def _check_version(version: int):
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"不支持的二进制 schema 版本: {version}")
+
+
+class JsonSerializer:
+    name = "json"
+    binary = False
+
+    def dumps(self, record: Dict) -> bytes:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def entry(self, key: str, record: Dict) -> bytes:
+        """一条日志：一行 {"k": key, "v": record}"""
+        return json.dumps({"k": key, "v": record}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def snapshot(self, data: Dict[str, Dict]) -> bytes:
+        return self.dumps(data)
+
+
+class BinarySerializer:
+    name = "binary"
+    binary = True
+
+    def dumps(self, record: Dict) -> bytes:
+        out = bytearray((MAGIC, SCHEMA_VERSION))
+        _encode(record, out)
+        return bytes(out)
+
+    def entry(self, key: str, record: Dict) -> bytes:
+        body = bytearray()
+        _encode(key, body)
+        _encode(record, body)
+        return bytes((MAGIC, SCHEMA_VERSION)) + _U32.pack(len(body)) + body
+
+    def snapshot(self, data: Dict[str, Dict]) -> bytes:
+        # 快照就是一串日志帧，读的时候和日志走同一套解析
+        return b"".join(self.entry(k, v) for k, v in data.items())
+
+
+SERIALIZERS = {s.name: s for s in (JsonSerializer(), BinarySerializer())}
+
+
+def get_serializer(name: str) -> Union[JsonSerializer, BinarySerializer]:
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(f"未知的存储格式: {name}，可选 {tuple(SERIALIZERS)}") from None
+
+
+def loads(data: Union[bytes, str], fields: Optional[Iterable[str]] = None) -> Dict:
+    """解析单条记录，json / binary 都认；给了 fields 时只返回这些顶层字段"""
+    if data and not isinstance(data, str) and data[0] == MAGIC:
+        _check_version(data[1])
+        if fields is None:
+            return _decode(data, 2)[0]
+        return _decode_fields(data, 2, set(fields))
+    record = json.loads(data)
+    return record if fields is None else project(record, fields)
+
+
+def iter_entries(data: bytes) -> Generator[Tuple[str, Dict], None, int]:
+    """
+    按顺序解析日志里的 (key, record)；遇到写了一半的末尾就停下。
+    生成器的返回值是最后一条完整记录之后的偏移，之后的字节都是残缺的（见 read_entries）
+    """
+    pos, end = 0, len(data)
+    good = 0
+    while pos < end:
+        b = data[pos]
+        if b == MAGIC:
+            if pos + 6 > end:
+                return good
+            _check_version(data[pos + 1])
+            n = _U32.unpack_from(data, pos + 2)[0]
+            body_end = pos + 6 + n
+            if body_end > end:
+                return good
+            try:
+                key, p = _decode(data, pos + 6)
+                record, _ = _decode(data, p)
+            except (ValueError, IndexError, UnicodeDecodeError):
+                # 长度字段本身是残缺帧后面的内容
+                return good
+            yield key, record
+            pos = good = body_end
+        elif b in b" \t\r\n":
+            pos += 1
+        else:
+            nl = data.find(b"\n", pos)
+            if nl < 0:
+                # 每条都以换行结尾，没有换行就是没写完
+                return good
+            try:
+                entry = json.loads(data[pos:nl])
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # 只可能是崩溃时最后一行没写完
+                return good
+            yield entry["k"], entry["v"]
+            pos = good = nl + 1
+    return good
+
+
+def read_entries(data: bytes) -> Tuple[Dict[str, Dict], int]:
+    """解析整段日志，返回 (最新状态, 完整部分的长度)"""
+    out: Dict[str, Dict] = {}
+    entries = iter_entries(data)
+    while True:
+        try:
+            key, record = next(entries)
+        except StopIteration as stop:
+            return out, stop.value
+        out[key] = record
+
+
+def read_snapshot(data: bytes) -> Dict[str, Dict]:
+    if not data:
+        return {}
+    if data[0] == MAGIC:
+        return dict(iter_entries(data))
+    try:
+        return json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
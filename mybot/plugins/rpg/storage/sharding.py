@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+按群（gid）分片：data/groups/<gid>/<filename>，每个群一个独立的 JournalStore。
+一个群的读写只解析/追加自己的文件、只拿自己分片的锁，不会被别的群拖慢。
+分片在第一次写入时才创建；只读过的群不建目录、不留文件句柄，也不会出现在 gids() 里。
+"""
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .journal import JournalStore, JournalPlayerStore, recover
+from .keys import player_key
+from .serializers import BinarySerializer, JsonSerializer
+
+SHARD_COMPACT_BYTES = 512 * 1024
+
+
+def _dir_name(gid: str) -> str:
+    # gid 一般是群号，只做兜底的文件名转义
+    return re.sub(r"[^0-9A-Za-z_-]", "_", str(gid))
+
+
+class ShardedStore:
+    def __init__(self, root: str, filename: str, factory: Callable[[str], JournalStore]):
+        self.root = root
+        self.filename = filename
+        self.factory = factory
+        self._shards: Dict[str, JournalStore] = {}
+        # 只保护 _shards 字典本身，分片内部各有各的锁
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def shard_path(self, gid: str) -> str:
+        return os.path.join(self.root, _dir_name(gid), self.filename)
+
+    def _on_disk(self, path: str) -> bool:
+        return os.path.exists(path) or os.path.exists(path + ".journal")
+
+    def shard(self, gid: str, create: bool = True) -> Optional[JournalStore]:
+        """打开 gid 的分片；create=False 时磁盘上还没有这个分片就返回 None（读路径用）"""
+        gid = str(gid)
+        store = self._shards.get(gid)
+        if store is None:
+            with self._lock:
+                store = self._shards.get(gid)
+                if store is None:
+                    path = self.shard_path(gid)
+                    if not create and not self._on_disk(path):
+                        return None
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    store = self._shards[gid] = self.factory(path)
+        return store
+
+    def gids(self) -> List[str]:
+        """磁盘上已有数据的群"""
+        return [name for name in os.listdir(self.root)
+                if self._on_disk(os.path.join(self.root, name, self.filename))]
+
+    def put_many(self, records: Iterable[Dict]):
+        """按 gid 分组写入各分片"""
+        by_gid: Dict[str, List[Dict]] = defaultdict(list)
+        for r in records:
+            by_gid[str(r["gid"])].append(r)
+        for gid, rs in by_gid.items():
+            self.shard(gid).put_many(rs)
+
+    def iter_records(self) -> Iterator[Dict]:
+        """逐个分片产出记录；没打开过的分片只读恢复，不创建文件"""
+        for gid in self.gids():
+            store = self._shards.get(gid)
+            yield from (store.values() if store is not None else recover(self.shard_path(gid)).values())
+
+    def migrated_marker(self) -> str:
+        return os.path.join(self.root, f".{self.filename}.migrated")
+
+    def close(self):
+        with self._lock:
+            for store in self._shards.values():
+                store.close()
+            self._shards.clear()
+
+
+class ShardedPlayerStore(ShardedStore):
+    """玩家分片，接口与 SqlitePlayerStore 一致"""
+
+    def __init__(self, root: str, filename: str = "players.json",
+                 serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+        super().__init__(root, filename, lambda path: JournalPlayerStore(path, SHARD_COMPACT_BYTES, serializer))
+
+    def get(self, gid: str, uid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        store = self.shard(gid, create=False)
+        return store.get(gid, uid, fields) if store is not None else None
+
+    def put(self, record: Dict):
+        self.shard(record["gid"]).put(record)
+
+    def by_gid(self, gid: str, fields: Optional[List[str]] = None) -> List[Dict]:
+        store = self.shard(gid, create=False)
+        return store.by_gid(gid, fields) if store is not None else []
+
+    def increment_field(self, gid: str, field: str, delta: int | float,
+                        where: Optional[Callable[[Dict], bool]] = None) -> List[str]:
+        # 没有分片就没有玩家，不用为此建分片
+        store = self.shard(gid, create=False)
+        return store.increment_field(gid, field, delta, where) if store is not None else []
+
+    def group_uids(self, gid: str) -> List[str]:
+        store = self.shard(gid, create=False)
+        return store.group_uids(gid) if store is not None else []
+
+    def count_group(self, gid: str) -> int:
+        store = self.shard(gid, create=False)
+        return store.count_group(gid) if store is not None else 0
+
+    def sample_group(self, gid: str, exclude: Optional[str] = None) -> Optional[str]:
+        store = self.shard(gid, create=False)
+        return store.sample_group(gid, exclude) if store is not None else None
+
+    def all(self, fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        out = {}
+        for gid in self.gids():
+            out.update(self.shard(gid).all(fields))
+        return out
+
+    def count(self) -> int:
+        return sum(self.shard(gid).count() for gid in self.gids())
+
+
+def split_into_shards(src_path: str, sharded: ShardedStore, upgrade: Optional[Callable[[Dict], Dict]] = None) -> int:
+    """
+    把旧的单文件（快照 + 日志）按 gid 拆进各分片，返回迁移条数；upgrade 用来顺便升级到当前 schema。
+    完成后在分片根目录写标记文件，原文件保留不动。
+    """
+    marker = sharded.migrated_marker()
+    if os.path.exists(marker):
+        return 0
+    n = 0
+    by_gid: Dict[str, List[Dict]] = defaultdict(list)
+    for r in recover(src_path).values():
+        by_gid[str(r["gid"])].append(upgrade(r) if upgrade else r)
+    for gid, rs in by_gid.items():
+        sharded.shard(gid).put_many(rs)
+        n += len(rs)
+    with open(marker, "w", encoding="utf-8") as f:
+        f.write(f"{src_path} -> {n}\n")
+    return n
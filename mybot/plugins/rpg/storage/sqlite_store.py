@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 玩家存储：一行一个玩家（主键 gid:uid），gid 列带索引。
+单条读写只触碰一行，按群查询走索引，不再随玩家总数线性增长。
+data 列按所选格式存 JSON 文本或二进制 BLOB，读取时自动识别。
+群成员计数 / 随机抽取走内存里的 GroupIndex，打开时只扫 gid、uid 两列重建。
+"""
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from .index import GroupIndex
+from .keys import player_key
+from .serializers import BinarySerializer, JsonSerializer, loads
+
+
+class SqlitePlayerStore:
+    """玩家记录仍是 Player.to_dict() 的字典，整条序列化后放在 data 列"""
+
+    def __init__(self, path: str, serializer: Union[JsonSerializer, BinarySerializer, None] = None):
+        self.path = path
+        self.serializer = serializer or JsonSerializer()
+        self._lock = threading.Lock()
+        # 连接在多个线程间共享，由 self._lock 串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            " key TEXT PRIMARY KEY,"
+            " gid TEXT NOT NULL,"
+            " uid TEXT NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_players_gid ON players(gid)")
+        self._conn.commit()
+        self._groups = GroupIndex(self._conn.execute("SELECT gid, uid FROM players").fetchall())
+
+    def _encode(self, record: Dict):
+        data = self.serializer.dumps(record)
+        # JSON 按 TEXT 存，SQL 里的 json_set 等函数才能直接用
+        return data if self.serializer.binary else data.decode("utf-8")
+
+    def _row(self, record: Dict):
+        gid, uid = str(record["gid"]), str(record["uid"])
+        return player_key(gid, uid), gid, uid, self._encode(record)
+
+    # 读取接口的 fields：只要这些顶层字段（投影），None 为整条记录
+    def get(self, gid: str, uid: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM players WHERE key = ?", (player_key(gid, uid),)
+            ).fetchone()
+        return loads(row[0], fields) if row else None
+
+    def put(self, record: Dict):
+        self.put_many([record])
+
+    def put_many(self, records: Iterable[Dict]):
+        rows = [self._row(r) for r in records]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO players(key, gid, uid, data) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                rows,
+            )
+        self._groups.add_many((gid, uid) for _, gid, uid, _ in rows)
+
+    def increment_field(self, gid: str, field: str, delta: int | float,
+                        where: Optional[Callable[[Dict], bool]] = None) -> List[str]:
+        """
+        给本群玩家的某个数值字段加 delta，整批在一个事务里完成，返回受影响的 uid。
+        JSON 文本行且不带 where 时直接在 SQL 里用 json_set 改，不把记录读回 Python；
+        其余行（二进制 / 带 where）在同一个事务里解码、修改、写回。记录的 version 同时加一。
+        """
+        with self._lock, self._conn:
+            uids = []
+            sql = "SELECT key, uid, data FROM players WHERE gid = :gid"
+            if where is None and not self.serializer.binary:
+                rows = self._conn.execute(
+                    "UPDATE players SET data = json_set(data,"
+                    " '$.' || :field, coalesce(json_extract(data, '$.' || :field), 0) + :delta,"
+                    " '$.version', coalesce(json_extract(data, '$.version'), 0) + 1)"
+                    " WHERE gid = :gid AND typeof(data) = 'text' RETURNING uid",
+                    {"field": field, "delta": delta, "gid": gid},
+                ).fetchall()
+                uids = [r[0] for r in rows]
+                sql += " AND typeof(data) = 'blob'"
+            updated = []
+            for key, uid, data in self._conn.execute(sql, {"gid": gid}).fetchall():
+                record = loads(data)
+                if where is not None and not where(record):
+                    continue
+                record[field] = record.get(field, 0) + delta
+                record["version"] = record.get("version", 0) + 1
+                updated.append((self._encode(record), key))
+                uids.append(uid)
+            self._conn.executemany("UPDATE players SET data = ? WHERE key = ?", updated)
+            return uids
+
+    def by_gid(self, gid: str, fields: Optional[List[str]] = None) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM players WHERE gid = ?", (gid,)).fetchall()
+        return [loads(r[0], fields) for r in rows]
+
+    def group_uids(self, gid: str) -> List[str]:
+        return self._groups.uids(gid)
+
+    def count_group(self, gid: str) -> int:
+        return self._groups.count(gid)
+
+    def sample_group(self, gid: str, exclude: Optional[str] = None) -> Optional[str]:
+        return self._groups.sample(gid, exclude)
+
+    def all(self, fields: Optional[List[str]] = None) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, data FROM players").fetchall()
+        return {k: loads(d, fields) for k, d in rows}
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """按主键分页逐条产出全部记录，翻页之间不占连接锁"""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, data FROM players WHERE key > ? ORDER BY key LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for _, data in rows:
+                yield loads(data)
+            last = rows[-1][0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
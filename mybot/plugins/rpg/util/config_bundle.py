@@ -0,0 +1,134 @@
+"""
+配置预编译包：把 data/*.yaml 和 battle/monsters.yaml 校验后解析好，整体 pickle 成 data/config.bundle。
+- 生成：python -m scripts.rpg_config build（校验失败时不写包）
+- 读取：load_yaml(path) 优先从包里取；源文件的 (mtime, 大小) 和包里记录的不同、内容哈希也不同时才解析 YAML
+每个源文件在包里单独 pickle，每次 load_yaml 都反序列化出新对象，调用方改了也不影响下一次读取。
+"""
+import hashlib
+import os
+import pathlib
+import pickle
+import threading
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from .config_defs import BuffDef, MonsterDef, SkillDef
+
+RPG_ROOT = pathlib.Path(__file__).resolve().parent.parent
+BUNDLE_PATH = RPG_ROOT / "data" / "config.bundle"
+BUNDLE_FORMAT = 1
+
+# 列表形式、每项带唯一 id 的表
+ID_TABLES = ("data/skills.yaml", "data/buffs.yaml", "data/battle_event_type.yaml", "battle/monsters.yaml")
+# 编译成 config_defs 数据类的表，build 时逐条编译一遍
+DEF_TABLES = {"data/skills.yaml": SkillDef, "data/buffs.yaml": BuffDef, "battle/monsters.yaml": MonsterDef}
+
+# 有 libyaml 时用 C 实现，解析快一个数量级
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def source_files() -> List[pathlib.Path]:
+    return sorted(RPG_ROOT.glob("data/*.yaml")) + [RPG_ROOT / "battle" / "monsters.yaml"]
+
+
+def source_name(path: pathlib.Path) -> Optional[str]:
+    try:
+        return path.resolve().relative_to(RPG_ROOT).as_posix()
+    except ValueError:
+        return None
+
+
+def parse_yaml(text: str) -> Any:
+    return yaml.load(text, Loader=_Loader)
+
+
+def validate(name: str, data: Any) -> List[str]:
+    """返回发现的问题，空列表为通过"""
+    errors = []
+    if name in ID_TABLES:
+        if not isinstance(data, list):
+            return [f"{name}: 应为列表"]
+        seen = set()
+        for i, item in enumerate(data):
+            if not isinstance(item, dict) or "id" not in item:
+                errors.append(f"{name}[{i}]: 缺少 id")
+                continue
+            if item["id"] in seen:
+                errors.append(f"{name}: id 重复 {item['id']}")
+            seen.add(item["id"])
+            if name in DEF_TABLES:
+                try:
+                    DEF_TABLES[name].from_dict(item)
+                except ValueError as e:
+                    errors.append(f"{name}: {e}")
+    return errors
+
+
+def build_bundle(path: pathlib.Path = BUNDLE_PATH) -> int:
+    """校验并生成配置包，返回收录的文件数；有任何问题时抛 ValueError，不写文件"""
+    sources, errors = {}, []
+    for f in source_files():
+        name = source_name(f)
+        # 先 stat 再读：读的过程中文件又被改动时，时间戳对不上，运行时会按哈希重新确认
+        st = os.stat(f)
+        raw = f.read_bytes()
+        try:
+            data = parse_yaml(raw.decode("utf-8"))
+        except (yaml.YAMLError, UnicodeDecodeError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        errors += validate(name, data)
+        sources[name] = {
+            "stamp": (st.st_mtime_ns, st.st_size),
+            "sha": hashlib.sha256(raw).hexdigest(),
+            "data": pickle.dumps(data, pickle.HIGHEST_PROTOCOL),
+        }
+    if errors:
+        raise ValueError("配置校验失败：\n" + "\n".join(errors))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"format": BUNDLE_FORMAT, "sources": sources}, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return len(sources)
+
+
+_bundle: Optional[Dict[str, Dict]] = None
+_bundle_lock = threading.Lock()
+
+
+def _load_bundle() -> Dict[str, Dict]:
+    global _bundle
+    if _bundle is None:
+        with _bundle_lock:
+            if _bundle is None:
+                sources = {}
+                try:
+                    with open(BUNDLE_PATH, "rb") as f:
+                        obj = pickle.load(f)
+                    if obj.get("format") == BUNDLE_FORMAT:
+                        sources = obj["sources"]
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    print(f"读取配置包失败，改为直接解析 YAML: {e}")
+                _bundle = sources
+    return _bundle
+
+
+def load_yaml(path) -> Any:
+    """读一个配置文件，结果同 yaml.safe_load；不在包里或源文件已改动时直接解析"""
+    path = pathlib.Path(path)
+    entry = _load_bundle().get(source_name(path))
+    if entry is None:
+        return parse_yaml(path.read_text(encoding="utf-8"))
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if stamp == entry["stamp"]:
+        return pickle.loads(entry["data"])
+    raw = path.read_bytes()
+    if hashlib.sha256(raw).hexdigest() == entry["sha"]:
+        # 只是时间戳变了（checkout / 复制），内容没变，记下新时间戳省掉下次的哈希
+        entry["stamp"] = stamp
+        return pickle.loads(entry["data"])
+    return parse_yaml(raw.decode("utf-8"))
@@ -0,0 +1,257 @@
+"""
+配置编译：技能 / buff / 怪物的 YAML 在加载时转成只读的 slots 数据类。
+- 字段缺失、类型不对、op 或字段名写错、公式写法不合法或用了上下文里没有的变量，都在加载时抛 ValueError，不会等到战斗里才出错
+- 战斗热路径上直接读属性，不再逐层 dict.get
+对象是各处共享的，不要修改；需要可变状态的（buff 的层数 / 持续时间）另建实例。
+"""
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from .expression_evaluator import BUFF_SCOPE, SKILL_SCOPE, analyze_formula
+from ..battle.entity import BuffStackType
+
+SKILL_OPS = frozenset({"damage", "damage_reduction", "add_damage", "reflect_damage", "heal", "apply_buff", "leech"})
+BUFF_OPS = frozenset({"property_change", "damage", "heal"})
+STATS = frozenset({"ATK", "DEF", "AGI", "CRIT", "MAX_HP", "HP"})
+
+
+def _check_keys(cls, data: Dict, where: str, extra: Tuple[str, ...] = ()):
+    """多出来的键一般是拼写错误，直接报出来"""
+    unknown = set(data) - {f.name for f in fields(cls)} - set(extra)
+    if unknown:
+        raise ValueError(f"{where}: 未知字段 {', '.join(sorted(map(str, unknown)))}")
+
+
+def _require(data: Dict, key: str, types, where: str) -> Any:
+    if key not in data:
+        raise ValueError(f"{where}: 缺少 {key}")
+    return _typed(data, key, types, where)
+
+
+def _formula(data: Dict, key: str, where: str, default: str, scope: FrozenSet[str]) -> str:
+    expr = str(_typed(data, key, (str, int, float), where, default))
+    try:
+        analyze_formula(expr, scope)
+    except ValueError as e:
+        raise ValueError(f"{where}.{key}: {e}") from None
+    return expr
+
+
+def _typed(data: Dict, key: str, types, where: str, default: Any = None) -> Any:
+    value = data.get(key, default)
+    if value is None:
+        return None
+    types = types if isinstance(types, tuple) else (types,)
+    # bool 是 int 的子类，数值字段写成 true/false 也算错
+    if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+        raise ValueError(f"{where}: {key} 类型应为 {'/'.join(t.__name__ for t in types)}，实际为 {value!r}")
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class EffectDef:
+    op: str
+    formula: str = "0"
+    damage_type: str = "physical"
+    can_crit: bool = False
+    crit_multiplier: float = 1.5
+    can_dodge: bool = False
+    can_apply_on_death: bool = False
+    is_self_target: bool = False
+    # buff 效果：None 不限，True 只在 buff 施加者行动时生效，False 只在别人行动时生效
+    is_owner: Optional[bool] = None
+    round_num: Optional[int] = None
+    # apply_buff
+    buff_id: Optional[str] = None
+    stacks_formula: str = "1"
+    # property_change
+    stat: Optional[str] = None
+    value: float = 0
+
+    @staticmethod
+    def from_dict(d: Dict, where: str, ops: frozenset, scope: FrozenSet[str]) -> "EffectDef":
+        if not isinstance(d, dict):
+            raise ValueError(f"{where}: 应为字典")
+        _check_keys(EffectDef, d, where)
+        op = _require(d, "op", str, where)
+        if op not in ops:
+            raise ValueError(f"{where}: 未知的 op {op}")
+        if op == "apply_buff":
+            _require(d, "buff_id", str, where)
+        if op == "property_change":
+            if _require(d, "stat", str, where) not in STATS:
+                raise ValueError(f"{where}: 未知属性 {d['stat']}")
+            _require(d, "value", (int, float), where)
+        return EffectDef(
+            op=op,
+            formula=_formula(d, "formula", where, "0", scope),
+            damage_type=_typed(d, "damage_type", str, where, "physical"),
+            can_crit=_typed(d, "can_crit", bool, where, False),
+            crit_multiplier=_typed(d, "crit_multiplier", (int, float), where, 1.5),
+            can_dodge=_typed(d, "can_dodge", bool, where, False),
+            can_apply_on_death=_typed(d, "can_apply_on_death", bool, where, False),
+            is_self_target=_typed(d, "is_self_target", bool, where, False),
+            is_owner=_typed(d, "is_owner", bool, where),
+            round_num=_typed(d, "round_num", int, where),
+            buff_id=d.get("buff_id"),
+            stacks_formula=_formula(d, "stacks_formula", where, "1", scope),
+            stat=d.get("stat"),
+            value=d.get("value", 0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TriggerDef:
+    event_type: str
+    priority: int = 0
+    # None 不检查
+    is_attacker: Optional[bool] = None
+    is_defender: Optional[bool] = None
+    # 全部为真才触发
+    conditions: Tuple[str, ...] = ()
+
+    @staticmethod
+    def from_dict(d: Dict, where: str) -> "TriggerDef":
+        if not isinstance(d, dict):
+            raise ValueError(f"{where}: 应为字典")
+        _check_keys(TriggerDef, d, where)
+        conditions = []
+        for i, c in enumerate(d.get("conditions") or []):
+            if not isinstance(c, dict) or set(c) != {"expr"} or not isinstance(c["expr"], str):
+                raise ValueError(f"{where}.conditions[{i}]: 应为 {{expr: 表达式}}")
+            conditions.append(_formula(c, "expr", f"{where}.conditions[{i}]", "", SKILL_SCOPE))
+        return TriggerDef(
+            event_type=_require(d, "event_type", str, where),
+            priority=_typed(d, "priority", int, where, 0),
+            is_attacker=_typed(d, "is_attacker", bool, where),
+            is_defender=_typed(d, "is_defender", bool, where),
+            conditions=tuple(conditions),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SkillDef:
+    id: str
+    name: str
+    type: str = "passive"
+    level: int = 1
+    cd: int = 0
+    # (实体上的属性名, 数量)，属性名已转大写
+    cost: Tuple[Tuple[str, int], ...] = ()
+    triggers: Tuple[TriggerDef, ...] = ()
+    effects: Tuple[EffectDef, ...] = ()
+    get_by_gacha: bool = False
+    description: str = ""
+
+    @staticmethod
+    def from_dict(d: Dict) -> "SkillDef":
+        sid = _require(d, "id", str, "skills")
+        where = f"skills.{sid}"
+        # 顶层有 target / stop_propagation 等暂未生效的字段，不做未知字段检查
+        cost = _typed(d, "cost", dict, where, {}) or {}
+        for k, v in cost.items():
+            if not isinstance(v, (int, float)) or isinstance(v, bool):
+                raise ValueError(f"{where}.cost.{k}: 应为数值")
+        return SkillDef(
+            id=sid,
+            name=_typed(d, "name", str, where, sid),
+            type=_typed(d, "type", str, where, "passive"),
+            level=_typed(d, "level", int, where, 1),
+            cd=_typed(d, "cd", int, where, 0),
+            cost=tuple((str(k).upper(), v) for k, v in cost.items()),
+            triggers=tuple(TriggerDef.from_dict(t, f"{where}.triggers[{i}]")
+                           for i, t in enumerate(d.get("triggers") or [])),
+            effects=tuple(EffectDef.from_dict(e, f"{where}.effects[{i}]", SKILL_OPS, SKILL_SCOPE)
+                          for i, e in enumerate(d.get("effects") or [])),
+            get_by_gacha=_typed(d, "get_by_gacha", bool, where, False),
+            description=_typed(d, "description", str, where, ""),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class BuffDef:
+    id: str
+    name: str
+    is_positive: bool
+    duration: int
+    description: str = ""
+    max_stack: int = 1
+    stack_type: BuffStackType = BuffStackType.NONE
+    # property_change 效果合并成 属性 -> 每层数值
+    property_change: Mapping[str, float] = MappingProxyType({})
+    # 其余效果（回合开始时结算的伤害 / 治疗）
+    effects: Tuple[EffectDef, ...] = ()
+    # 回合结束时 duration / stack 的变化量，turn_end 列表合并而来
+    changes_on_turn_end: Mapping[str, int] = MappingProxyType({})
+    available_expr: Tuple[str, ...] = ()
+    can_resist: bool = False
+    can_dispel: bool = True
+
+    @staticmethod
+    def from_dict(d: Dict) -> "BuffDef":
+        bid = _require(d, "id", str, "buffs")
+        where = f"buffs.{bid}"
+        _check_keys(BuffDef, d, where, extra=("turn_end",))
+        stack_type = _typed(d, "stack_type", str, where, "NONE")
+        if stack_type not in BuffStackType.__members__:
+            raise ValueError(f"{where}: 未知的 stack_type {stack_type}")
+        property_change, effects = {}, []
+        for i, e in enumerate(d.get("effects") or []):
+            effect = EffectDef.from_dict(e, f"{where}.effects[{i}]", BUFF_OPS, BUFF_SCOPE)
+            if effect.op == "property_change":
+                property_change[effect.stat] = effect.value
+            else:
+                effects.append(effect)
+        changes = {}
+        for i, c in enumerate(d.get("turn_end") or []):
+            if not isinstance(c, dict) or not set(c) <= {"duration", "stack"}:
+                raise ValueError(f"{where}.turn_end[{i}]: 只能是 duration / stack 的变化量")
+            changes.update(c)
+        return BuffDef(
+            id=bid,
+            name=_require(d, "name", str, where),
+            is_positive=_require(d, "is_positive", bool, where),
+            duration=_require(d, "duration", int, where),
+            description=_typed(d, "description", str, where, ""),
+            max_stack=_typed(d, "max_stack", int, where, 1),
+            stack_type=BuffStackType[stack_type],
+            property_change=MappingProxyType(property_change),
+            effects=tuple(effects),
+            changes_on_turn_end=MappingProxyType(changes),
+            available_expr=tuple(_typed(d, "available_expr", list, where, []) or []),
+            can_resist=_typed(d, "can_resist", bool, where, False),
+            can_dispel=_typed(d, "can_dispel", bool, where, True),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class MonsterDef:
+    id: str
+    name: str
+    level: int
+    tag: str
+    ATK: int
+    DEF: int
+    MAX_HP: int
+    AGI: int = 0
+    INT: int = 0
+    CRIT: float = 0.0
+
+    @staticmethod
+    def from_dict(d: Dict) -> "MonsterDef":
+        mid = _require(d, "id", (str, int), "monsters")
+        where = f"monsters.{mid}"
+        _check_keys(MonsterDef, d, where)
+        return MonsterDef(
+            id=str(mid),
+            name=_require(d, "name", str, where),
+            level=_require(d, "level", int, where),
+            tag=_require(d, "tag", str, where),
+            ATK=_require(d, "ATK", (int, float), where),
+            DEF=_require(d, "DEF", (int, float), where),
+            MAX_HP=_require(d, "MAX_HP", (int, float), where),
+            AGI=_typed(d, "AGI", (int, float), where, 0),
+            INT=_typed(d, "INT", (int, float), where, 0),
+            CRIT=_typed(d, "CRIT", (int, float), where, 0.0),
+        )
@@ -1,32 +1,94 @@
 import pathlib
+import threading
+from types import MappingProxyType
 
-import yaml
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+from .config_bundle import load_yaml
+from .config_defs import BuffDef, SkillDef
+
+CONFIG_DIR = pathlib.Path(__file__).resolve().parent.parent / "data"
+CONFIG_FILES = ("skills.yaml", "buffs.yaml", "battle_event_type.yaml")
+
+Stamp = Tuple[Tuple[int, int], ...]
+
+
+def _stamp(config_path) -> Stamp:
+    """各配置文件的 (mtime_ns, size)，不存在时为 (0, 0)"""
+    out = []
+    for filename in CONFIG_FILES:
+        try:
+            st = os.stat(os.path.join(config_path, filename))
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((0, 0))
+    return tuple(out)
 
 
 class ConfigLoader:
-    def __init__(self):
-        self.config_path = pathlib.Path(__file__).resolve().parent.parent / "data"
-        self.skills_config = self._load_config('skills.yaml')
-        self.buffs_config = self._load_config('buffs.yaml')
-        self.events_config = self._load_config('battle_event_type.yaml')
+    """
+    一个配置版本：构造时解析一次，之后不再修改。
+    平时用 get_config() 取当前版本；文件改了会换成新实例，已经拿到旧实例的战斗继续用旧的。
+    """
+
+    def __init__(self, config_path=None):
+        self.config_path = config_path or CONFIG_DIR
+        # 先取时间戳再解析：解析期间文件又被改动时，下次检查还能发现
+        self.stamp = _stamp(self.config_path)
+        self.errors: List[str] = []
+        self.skills_config = MappingProxyType(self._load_config('skills.yaml'))
+        self.buffs_config = MappingProxyType(self._load_config('buffs.yaml'))
+        self.events_config = MappingProxyType(self._load_config('battle_event_type.yaml'))
         self._build_event_limits()
+        # 战斗里用编译好的定义；有任何一条不合法时整版算加载失败
+        self.buff_defs: Mapping[str, BuffDef] = MappingProxyType(
+            self._compile('buffs.yaml', self.buffs_config, BuffDef.from_dict))
+        self.skill_defs: Mapping[str, SkillDef] = MappingProxyType(
+            self._compile('skills.yaml', self.skills_config, SkillDef.from_dict))
+        self._check_buff_refs()
+        self._skills_maps: Dict[bool, Mapping[str, Dict]] = {}
 
     def _load_config(self, filename: str) -> Dict[str, Any]:
         """加载YAML配置文件"""
         filepath = os.path.join(self.config_path, filename)
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or []
-                return {item['id']: item for item in config}
+            config = load_yaml(filepath) or []
+            return {item['id']: item for item in config}
         except FileNotFoundError:
             print(f"配置文件未找到: {filename}")
+            self.errors.append(filename)
             return {}
         except Exception as e:
             print(f"加载配置文件错误 {filename}: {e}")
+            self.errors.append(filename)
             return {}
 
+    def _compile(self, filename: str, table: Mapping[str, Dict], compile_one) -> Dict[str, Any]:
+        out = {}
+        for key, item in table.items():
+            try:
+                out[key] = compile_one(item)
+            except ValueError as e:
+                print(f"配置校验错误 {filename}: {e}")
+                if filename not in self.errors:
+                    self.errors.append(filename)
+        return out
+
+    def _check_buff_refs(self):
+        for skill in self.skill_defs.values():
+            for effect in skill.effects:
+                if effect.buff_id is not None and effect.buff_id not in self.buff_defs:
+                    print(f"配置校验错误 skills.yaml: skills.{skill.id} 引用了不存在的 buff {effect.buff_id}")
+                    if 'skills.yaml' not in self.errors:
+                        self.errors.append('skills.yaml')
+
+    def get_skill_def(self, skill_id: str) -> Optional[SkillDef]:
+        return self.skill_defs.get(skill_id)
+
+    def get_buff_def(self, buff_id: str) -> Optional[BuffDef]:
+        return self.buff_defs.get(buff_id)
+
     def get_skill_config(self, skill_id: str) -> Dict[str, Any]:
         """获取技能配置"""
         return self.skills_config.get(skill_id, {})
@@ -35,15 +97,18 @@ class ConfigLoader:
         """获取Buff配置"""
         return self.buffs_config.get(buff_id, {})
 
-    def get_all_skills(self) -> Dict[str, Dict]:
+    def get_all_skills(self) -> Mapping[str, Dict]:
         """获取所有技能配置"""
         return self.skills_config
 
-    def get_skills_map(self, is_gacha_skill: bool) -> Dict[str, Dict]:
-        skills_map = {}
-        for k, v in self.skills_config.items():
-            if (is_gacha_skill and v["get_by_gacha"]) or (not is_gacha_skill and not v["get_by_gacha"]):
-                skills_map[k] = v
+    def get_skills_map(self, is_gacha_skill: bool) -> Mapping[str, Dict]:
+        skills_map = self._skills_maps.get(is_gacha_skill)
+        if skills_map is None:
+            skills_map = {}
+            for k, v in self.skills_config.items():
+                if (is_gacha_skill and v["get_by_gacha"]) or (not is_gacha_skill and not v["get_by_gacha"]):
+                    skills_map[k] = v
+            skills_map = self._skills_maps[is_gacha_skill] = MappingProxyType(skills_map)
         return skills_map
 
     def _build_event_limits(self):
@@ -58,3 +123,32 @@ class ConfigLoader:
     def get_event_limit(self, event_type: str):
         """获取事件类型的最大执行次数"""
         return self.event_limits.get(event_type, None)  # 默认1次
+
+
+_current: Optional[ConfigLoader] = None
+# 解析失败的那一版文件的时间戳，文件没再变化之前不重复解析
+_failed_stamp: Optional[Stamp] = None
+_reload_lock = threading.Lock()
+
+
+def get_config() -> ConfigLoader:
+    """
+    当前配置版本。每次调用只 stat 一下配置文件，时间戳变了才重新解析并整体替换；
+    新版本有文件解析失败时保留旧版本，改好之后自动生效
+    """
+    global _current, _failed_stamp
+    current = _current
+    if current is not None:
+        stamp = _stamp(current.config_path)
+        if stamp == current.stamp or stamp == _failed_stamp:
+            return current
+    with _reload_lock:
+        if _current is not current:
+            return _current
+        loaded = ConfigLoader()
+        if loaded.errors and current is not None:
+            print(f"配置重新加载失败，继续使用旧版本: {', '.join(loaded.errors)}")
+            _failed_stamp = loaded.stamp
+            return current
+        _current, _failed_stamp = loaded, None
+        return loaded
@@ -1,49 +1,167 @@
+import ast
 import random
 import math
-from typing import Dict, Any
+from dataclasses import dataclass
+from types import CodeType
+from typing import Dict, Any, FrozenSet, Hashable, Optional, Set, Tuple
+
+SAFE_GLOBALS = {
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'round': round,
+    'int': int,
+    'float': float,
+    'random': random.random,
+    'randint': random.randint,
+    'math': math,
+    'len': len,
+    'sum': sum
+}
+
+# 技能效果 / 触发条件里能用的变量，见 ConfigSkill._create_execution_context
+SKILL_SCOPE = frozenset({'source', 'target', 'skill', 'damage_type', 'damage', 'amount', 'op_type', 'is_crit', 'is_dodged'})
+# buff 效果里能用的变量，见 buff_engine._create_execution_context
+BUFF_SCOPE = frozenset({'source', 'target', 'current_stack', 'owner', 'buff'})
+# 实体上这些属性变化时 stat_version 会加一，记忆结果时按版本号判断，不用读出属性值
+VERSIONED_STATS = frozenset({'ATK', 'DEF', 'AGI', 'CRIT', 'MAX_HP', 'HP'})
+# 含这些函数的公式每次结果不同，不记忆
+_IMPURE = frozenset({'random', 'randint'})
+# 每个求值器最多记多少条结果，满了整体清空
+MEMO_SIZE = 4096
+
+# 求值用的全局命名空间，所有表达式共用；上下文直接作为局部命名空间传进去，不再每次复制合并
+_GLOBALS = {'__builtins__': {}, **SAFE_GLOBALS}
+
+_ALLOWED = (
+    ast.Expression, ast.Load, ast.Constant, ast.Name, ast.Attribute, ast.Call, ast.BinOp, ast.UnaryOp,
+    ast.BoolOp, ast.Compare, ast.IfExp, ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+
+
+@dataclass(frozen=True)
+class FormulaInfo:
+    expr: str
+    code: CodeType
+    # 读到的 (变量, 属性)；直接用变量本身时属性为 None
+    reads: Tuple[Tuple[str, Optional[str]], ...]
+    # 用到的上下文变量（不含内置函数）
+    names: FrozenSet[str]
+    # 不含随机数，同样的输入结果相同
+    pure: bool
+
+
+def _check(expr: str, tree: ast.Expression) -> Tuple[Tuple[Tuple[str, Optional[str]], ...], bool]:
+    """检查公式只用了允许的写法，返回读到的 (变量, 属性) 和是否不含随机数"""
+    reads, pure = {}, True
+    # 作为属性所属对象 / 被调用函数出现的名字，不算单独读变量
+    not_bare = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED):
+            raise ValueError(f"公式里不允许 {type(node).__name__}: {expr}")
+        if isinstance(node, ast.Name) and node.id.startswith('_'):
+            raise ValueError(f"公式里不允许下划线开头的名字 {node.id}: {expr}")
+        if isinstance(node, ast.Attribute):
+            # 只允许读一层属性（source.ATK / skill.level / math.sqrt），记忆结果时才能判断输入有没有变
+            if node.attr.startswith('_') or not isinstance(node.value, ast.Name):
+                raise ValueError(f"公式里只能读变量的一层公开属性: {expr}")
+            not_bare.add(node.value)
+            if node.value.id != 'math':
+                reads[(node.value.id, node.attr)] = None
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id not in SAFE_GLOBALS or func.id == 'math':
+                    raise ValueError(f"公式里不允许调用 {func.id}: {expr}")
+                not_bare.add(func)
+                pure = pure and func.id not in _IMPURE
+            elif not (isinstance(func, ast.Attribute) and func.value.id == 'math'):
+                raise ValueError(f"公式里只能调用内置函数和 math 函数: {expr}")
+            if any(isinstance(a, ast.Starred) for a in node.args):
+                raise ValueError(f"公式里不允许 *args: {expr}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node not in not_bare:
+            reads[(node.id, None)] = None
+    return tuple(reads), pure
+
+
+# 源码 -> 分析结果；公式都来自配置表，数量有限，不做淘汰
+_analyzed: Dict[str, FormulaInfo] = {}
+# 求值出过错的公式，每条只打印一次，战斗里反复触发不刷屏
+_reported: Set[str] = set()
+
+
+def analyze_formula(expr: str, scope: Optional[FrozenSet[str]] = None) -> FormulaInfo:
+    """
+    解析、检查并编译公式，按源码缓存。
+    语法错误、不允许的写法、用到 scope 之外的变量时抛 ValueError；配置加载时就会调用，不会等到战斗里才发现
+    """
+    info = _analyzed.get(expr)
+    if info is None:
+        try:
+            tree = ast.parse(expr, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"公式语法错误: {expr}: {e.msg}") from None
+        reads, pure = _check(expr, tree)
+        info = FormulaInfo(expr=expr, code=compile(tree, f"<formula: {expr}>", 'eval'), reads=reads,
+                           names=frozenset(n for n, _ in reads), pure=pure)
+        _analyzed[expr] = info
+    if scope is not None and not info.names <= scope:
+        raise ValueError(f"公式里有未知变量 {', '.join(sorted(info.names - scope))}: {expr}")
+    return info
+
+
+def _memo_key(info: FormulaInfo, context: Dict[str, Any]) -> Optional[Hashable]:
+    """只由公式读到的输入组成的键；实体属性用 (实体 id, stat_version)。有输入不可哈希时返回 None"""
+    parts = [info.expr]
+    for name, attr in info.reads:
+        obj = context.get(name)
+        if attr is None:
+            parts.append(obj)
+        elif attr in VERSIONED_STATS and getattr(obj, 'stat_version', None) is not None:
+            parts.append((obj.id, obj.stat_version))
+        else:
+            parts.append(getattr(obj, attr, None))
+    key = tuple(parts)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
 
 
 class ExpressionEvaluator:
+    """
+    公式求值。一场战斗用一个实例：不含随机数的公式按它读到的输入记忆结果，
+    实体属性没变（stat_version 相同）、其余输入也相同时直接返回上次的结果
+    """
+
     def __init__(self):
-        self.safe_globals = {
-            'min': min,
-            'max': max,
-            'abs': abs,
-            'round': round,
-            'int': int,
-            'float': float,
-            'random': random.random,
-            'randint': random.randint,
-            'math': math,
-            'len': len,
-            'sum': sum
-        }
+        self.safe_globals = SAFE_GLOBALS
+        self._memo: Dict[Hashable, Any] = {}
 
     def evaluate(self, expr: str, context: Dict[str, Any]) -> Any:
-        """安全地求值表达式"""
+        """求值表达式；context 只读，同名时上下文里的变量优先于内置函数"""
         if not expr or not isinstance(expr, str):
             return None
 
+        info = analyze_formula(expr)
+        key = _memo_key(info, context) if info.pure else None
+        if key is not None:
+            try:
+                return self._memo[key]
+            except KeyError:
+                pass
         try:
-            # 创建安全的求值环境
-            safe_locals = context.copy()
-            safe_locals.update(self.safe_globals)
-
-            # 添加单位属性访问
-            # self._inject_unit_attributes(safe_locals, context)
-
-            return eval(expr, {'__builtins__': {}}, safe_locals)
+            value = eval(info.code, _GLOBALS, context)
         except Exception as e:
-            print(f"表达式求值错误: {expr}, 错误: {e}")
+            # 写法已在加载时检查过，剩下的是运行时的错误：除零、实体为 None、上下文缺变量、math 参数越界等
+            if expr not in _reported:
+                _reported.add(expr)
+                print(f"表达式求值错误: {expr}, 错误: {type(e).__name__}: {e}")
             return None
-
-    def _inject_unit_attributes(self, context: Dict, original_context: Dict):
-        """注入单位属性到上下文"""
-        for key in ['source', 'target', 'attacker', 'defender']:
-            if key in original_context:
-                unit = original_context[key]
-                if hasattr(unit, '__dict__'):
-                    # 添加带前缀的属性
-                    for attr_name, attr_value in unit.__dict__.items():
-                        if not attr_name.startswith('_'):
-                            context[f"{key}.{attr_name}"] = attr_value
\ No newline at end of file
+        if key is not None:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = value
+        return value
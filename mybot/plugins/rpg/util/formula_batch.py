@@ -0,0 +1,192 @@
+"""
+公式的 NumPy 批量求值：和 ExpressionEvaluator 用同一套公式字符串，一次算完一整批战斗，供平衡性 / 胜率的批量模拟用。
+实体状态按列存（struct of arrays）：source.ATK 是长度为 n 的数组；current_stack / damage 等上下文变量可以是数组，也可以是标量。
+    formula = compile_batch("max(1, source.ATK) * 2")
+    formula({"source": EntityBatch.from_entities(units)}, n=len(units))
+改写规则：
+- max / min 映射为 np.maximum / np.minimum（多个参数依次归约），int / float 映射为 astype，abs / round 映射为 np.abs / np.round
+- a and b / a or b 和 Python 一样取操作数本身，映射为 np.where(a, b, a) / np.where(a, a, b)（两边都会求值，不短路），
+  not 映射为 np.logical_not，连续比较拆成逐段比较再逐元素取与，a if c else b 映射为 np.where
+- random() / randint(a, b) 每个元素各抽一次
+公式之外的写法（推导式、lambda、下标等）编译时抛 ValueError。
+"""
+import ast
+import functools
+import math
+from types import CodeType, SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+STAT_COLUMNS = ("ATK", "DEF", "AGI", "CRIT", "MAX_HP", "HP")
+
+
+class EntityBatch:
+    """一批实体的属性列，source.ATK 之类的读取直接拿到整列"""
+
+    def __init__(self, **columns: Any):
+        self.__dict__.update(columns)
+
+    @staticmethod
+    def from_entities(entities: Iterable) -> "EntityBatch":
+        entities = list(entities)
+        columns = {k: np.array([getattr(e, k) for e in entities], dtype=np.float64) for k in STAT_COLUMNS}
+        columns["is_alive"] = np.array([e.is_alive for e in entities], dtype=bool)
+        return EntityBatch(**columns)
+
+
+def _reduce(fn):
+    def call(*args):
+        return functools.reduce(fn, args)
+    return call
+
+
+def _int(x):
+    # int() 向零取整
+    return np.trunc(x).astype(np.int64)
+
+
+def _float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _random(n, rng):
+    return rng.random(n)
+
+
+def _randint(a, b, n, rng):
+    # 和 random.randint 一样包含上界
+    return rng.integers(a, b + 1, n)
+
+
+_HELPERS = {
+    "_max": _reduce(np.maximum),
+    "_min": _reduce(np.minimum),
+    "_int": _int,
+    "_float": _float,
+    "_abs": np.abs,
+    "_round": np.round,
+    "_and": _reduce(lambda a, b: np.where(a, b, a)),
+    "_or": _reduce(lambda a, b: np.where(a, a, b)),
+    "_all": _reduce(np.logical_and),
+    "_not": np.logical_not,
+    "_where": np.where,
+    "_random": _random,
+    "_randint": _randint,
+    "_math": SimpleNamespace(sqrt=np.sqrt, ceil=np.ceil, floor=np.floor, log=np.log, exp=np.exp, pi=math.pi, e=math.e),
+}
+_FUNCS = {"max": "_max", "min": "_min", "int": "_int", "float": "_float", "abs": "_abs", "round": "_round"}
+# 需要知道批大小的函数，调用时补上 _n / _rng 两个参数
+_SIZED_FUNCS = {"random": "_random", "randint": "_randint"}
+_MATH_ATTRS = ("sqrt", "ceil", "floor", "log", "exp", "pi", "e")
+
+_ALLOWED = (
+    ast.Expression, ast.Load, ast.Constant, ast.Name, ast.Attribute, ast.Call, ast.BinOp, ast.UnaryOp,
+    ast.BoolOp, ast.Compare, ast.IfExp, ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+
+
+def _call(name: str, args) -> ast.Call:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+
+class _Vectorise(ast.NodeTransformer):
+    def __init__(self, expr: str):
+        self.expr = expr
+
+    def fail(self, msg: str):
+        raise ValueError(f"批量公式不支持 {msg}: {self.expr}")
+
+    def generic_visit(self, node):
+        if not isinstance(node, _ALLOWED):
+            self.fail(type(node).__name__)
+        return super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        if node.id.startswith("_"):
+            self.fail(f"下划线开头的名字 {node.id}")
+        if node.id in _FUNCS or node.id in _SIZED_FUNCS:
+            self.fail(f"{node.id} 只能直接调用")
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr.startswith("_"):
+            self.fail(f"下划线开头的属性 {node.attr}")
+        if isinstance(node.value, ast.Name) and node.value.id == "math":
+            if node.attr not in _MATH_ATTRS:
+                self.fail(f"math.{node.attr}")
+            return ast.copy_location(ast.Attribute(value=ast.Name(id="_math", ctx=ast.Load()), attr=node.attr,
+                                                   ctx=ast.Load()), node)
+        return self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        if node.keywords:
+            self.fail("关键字参数")
+        args = [self.visit(a) for a in node.args]
+        if isinstance(node.func, ast.Name) and node.func.id in _FUNCS:
+            # max(序列) 这种单参数写法没法逐元素改写
+            if node.func.id in ("max", "min") and len(args) < 2:
+                self.fail(f"{node.func.id} 只传一个参数")
+            return ast.copy_location(_call(_FUNCS[node.func.id], args), node)
+        if isinstance(node.func, ast.Name) and node.func.id in _SIZED_FUNCS:
+            sized = args + [ast.Name(id="_n", ctx=ast.Load()), ast.Name(id="_rng", ctx=ast.Load())]
+            return ast.copy_location(_call(_SIZED_FUNCS[node.func.id], sized), node)
+        if isinstance(node.func, ast.Attribute):
+            return ast.copy_location(ast.Call(func=self.visit(node.func), args=args, keywords=[]), node)
+        self.fail("这个函数调用")
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        name = "_and" if isinstance(node.op, ast.And) else "_or"
+        return ast.copy_location(_call(name, [self.visit(v) for v in node.values]), node)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return ast.copy_location(_call("_not", [self.visit(node.operand)]), node)
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        if any(isinstance(op, (ast.Is, ast.IsNot, ast.In, ast.NotIn)) for op in node.ops):
+            self.fail("is / in 比较")
+        operands = [self.visit(node.left)] + [self.visit(c) for c in node.comparators]
+        parts = [ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]])
+                 for i, op in enumerate(node.ops)]
+        return ast.copy_location(parts[0] if len(parts) == 1 else _call("_all", parts), node)
+
+    def visit_IfExp(self, node: ast.IfExp):
+        args = [self.visit(node.test), self.visit(node.body), self.visit(node.orelse)]
+        return ast.copy_location(_call("_where", args), node)
+
+
+BatchFormula = Callable[..., np.ndarray]
+
+# 源码 -> 批量公式，和 compile_formula 一样不做淘汰
+_compiled: Dict[str, BatchFormula] = {}
+
+
+def compile_batch(expr: str) -> BatchFormula:
+    """
+    把公式编译成批量版本，返回 f(scope, n, rng=None) -> 长度为 n 的数组。
+    scope 里的实体传 EntityBatch（或任何属性为数组的对象），其余变量传数组或标量；不支持的写法抛 ValueError
+    """
+    formula = _compiled.get(expr)
+    if formula is None:
+        try:
+            tree = ast.parse(expr, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"公式语法错误: {expr}: {e}") from None
+        tree = ast.fix_missing_locations(_Vectorise(expr).visit(tree))
+        code = compile(tree, f"<batch formula: {expr}>", "eval")
+        formula = _compiled[expr] = _make_formula(code)
+    return formula
+
+
+def _make_formula(code: CodeType) -> BatchFormula:
+    glb = {"__builtins__": {}, **_HELPERS}
+
+    def formula(scope: Dict[str, Any], n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        local = dict(scope, _n=n, _rng=rng if rng is not None else np.random.default_rng())
+        out = np.asarray(eval(code, glb, local))
+        # 只依赖标量的公式也按批大小展开
+        return np.full(n, out) if out.ndim == 0 else out
+
+    return formula
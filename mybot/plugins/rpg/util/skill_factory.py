@@ -1,17 +1,18 @@
 import random
-from typing import Dict, Callable, List
+from typing import Dict, Callable, Optional, Tuple
 
+from .config_defs import EffectDef, SkillDef, TriggerDef
 from .expression_evaluator import ExpressionEvaluator
-from ..battle.entity import Buff, create_buff_from_dict
+from ..battle.entity import create_buff
 from ..battle.event_info import EventInfo
 from ..engine.event_bus import EventBus
 
-def _cal_crit_damage(effect: Dict, context: Dict, dmg) -> float:
+def _cal_crit_damage(effect: EffectDef, context: Dict, dmg) -> float:
     source = context.get('source')
     crit_rate = source.CRIT  # 暴击属性 (0~1)
     crit_dmg = 2 * source.CRIT  # 暴击属性 (0~1)
     # 暴击倍率，目前最大爆伤 = 最小爆伤+1
-    base_crit_multiplier = effect.get('crit_multiplier', 1.5)
+    base_crit_multiplier = effect.crit_multiplier
     total_crit_multiplier = base_crit_multiplier + crit_dmg
     if random.random() < crit_rate:
         context["is_crit"] = True
@@ -28,21 +29,21 @@ class SkillFactory:
 
     def create_skill(self, skill_id: str, owner, level: int = None) -> 'ConfigSkill':
         """从配置创建技能"""
-        skill_config = self.config_loader.get_skill_config(skill_id)
-        if not skill_config:
+        skill_def = self.config_loader.get_skill_def(skill_id)
+        if not skill_def:
             raise ValueError(f"技能配置不存在: {skill_id}")
 
-        return ConfigSkill(skill_config, owner, self.event_bus, self.evaluator, level, self.config_loader)
+        return ConfigSkill(skill_def, owner, self.event_bus, self.evaluator, level, self.config_loader)
 
 
 class ConfigSkill:
-    def __init__(self, config: Dict, owner, event_bus: EventBus, evaluator: ExpressionEvaluator, level, config_loader):
+    def __init__(self, skill_def: SkillDef, owner, event_bus: EventBus, evaluator: ExpressionEvaluator, level, config_loader):
         self.config_loader = config_loader
-        self.config = config
-        self.id = config['id']
-        self.name = config.get('name', self.id)
-        self.type = config.get('type', 'passive')
-        self.level = level if level else config.get('level', 1)
+        self.skill_def = skill_def
+        self.id = skill_def.id
+        self.name = skill_def.name
+        self.type = skill_def.type
+        self.level = level if level else skill_def.level
         self.owner = owner
         self.event_bus = event_bus
         self.evaluator = evaluator
@@ -62,16 +63,12 @@ class ConfigSkill:
 
     def _register_triggers(self):
         """注册事件触发器"""
-        triggers = self.config.get('triggers', [])
-        for trigger_config in triggers:
-            event_type = trigger_config.get('event_type')
-            if event_type:
-                handler = self._create_trigger_handler(trigger_config)
-                priority = trigger_config.get('priority', 0)
-                self.event_bus.subscribe(event_type, handler, priority)
-                self.listeners.append((event_type, handler))
-
-    def _create_trigger_handler(self, trigger_config: Dict) -> Callable:
+        for trigger in self.skill_def.triggers:
+            handler = self._create_trigger_handler(trigger)
+            self.event_bus.subscribe(trigger.event_type, handler, trigger.priority)
+            self.listeners.append((trigger.event_type, handler))
+
+    def _create_trigger_handler(self, trigger: TriggerDef) -> Callable:
         """创建触发处理器"""
 
         def handler(event_data):
@@ -79,21 +76,24 @@ class ConfigSkill:
             if not self.can_activate():
                 return None
 
-            # 检查条件
-            conditions = trigger_config.get('conditions', [])
-            if not self._check_conditions(conditions, event_data, trigger_config.get("is_attacker"), trigger_config.get("is_defender")):
+            # 检查身份
+            if not self._check_roles(event_data, trigger.is_attacker, trigger.is_defender):
+                return None
+
+            # 检查条件；上下文只建一次，条件和效果共用
+            context = self._create_execution_context(event_data)
+            if not self._check_conditions(trigger.conditions, context):
                 return None
 
             # 激活技能
-            self.activate(event_data)
+            self.activate(event_data, context)
 
             return True
 
         return handler
 
-    def _check_conditions(self, conditions: List[Dict], event_data: EventInfo, attacker_check: bool,defender_check:bool) -> bool:
-        """检查触发条件"""
-        context = self._create_execution_context(event_data)
+    def _check_roles(self, event_data: EventInfo, attacker_check: bool, defender_check: bool) -> bool:
+        """检查触发者身份"""
         # 自己不触发自己
         if self.name == event_data.skill_name:
             return False
@@ -115,12 +115,13 @@ class ConfigSkill:
                 (is_defender and self.owner != event_data.target):
             return False
 
-        # 技能触发条件检查
-        for condition in conditions:
-            expr = condition.get('expr')
-            if expr and not self.evaluator.evaluate(expr, context):
-                return False
+        return True
 
+    def _check_conditions(self, conditions: Tuple[str, ...], context: Dict) -> bool:
+        """技能触发条件检查"""
+        for expr in conditions:
+            if not self.evaluator.evaluate(expr, context):
+                return False
         return True
 
     def _create_execution_context(self, event_data: EventInfo) -> Dict:
@@ -145,114 +146,107 @@ class ConfigSkill:
             return False
 
         # 检查资源消耗
-        cost = self.config.get('cost', {})
-        for resource_type, amount in cost.items():
-            current = getattr(self.owner, resource_type.upper(), 0)
-            if current < amount:
+        for attr, amount in self.skill_def.cost:
+            if getattr(self.owner, attr, 0) < amount:
                 return False
 
         return True
 
-    def activate(self, event_data: EventInfo = None):
+    def activate(self, event_data: EventInfo = None, context: Optional[Dict] = None):
         """激活技能"""
-        context = self._create_execution_context(event_data)
+        if context is None:
+            context = self._create_execution_context(event_data)
 
         # 扣除消耗
         self._deduct_cost()
 
         # 设置冷却时间
-        self.current_cooldown = self.config.get('cd', 0)
+        self.current_cooldown = self.skill_def.cd
 
         # 执行效果
-        effects = self.config.get('effects', [])
-        self._execute_effects(effects, context, event_data)
+        self._execute_effects(self.skill_def.effects, context, event_data)
 
     def _deduct_cost(self):
         """扣除资源消耗"""
-        cost = self.config.get('cost', {})
-        for resource_type, amount in cost.items():
-            current = getattr(self.owner, resource_type.upper(), 0)
-            setattr(self.owner, resource_type.upper(), max(0, current - amount))
+        for attr, amount in self.skill_def.cost:
+            setattr(self.owner, attr, max(0, getattr(self.owner, attr, 0) - amount))
 
-    def _execute_effects(self, effects: List[Dict], context: Dict, event_data: EventInfo):
+    def _execute_effects(self, effects: Tuple[EffectDef, ...], context: Dict, event_data: EventInfo):
         """执行技能效果"""
         for effect in effects:
             self._execute_single_effect(effect, context, event_data)
 
-    def _execute_single_effect(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_single_effect(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行单个效果"""
-        op = effect.get('op')
-        # 操作类型到处理方法的映射
-
         # 获取对应的处理方法
-        handler = self.op_handlers.get(op)
+        handler = self.op_handlers.get(effect.op)
 
         if handler:
             # 根据操作类型调用相应的方法
             return handler(effect, context, event_data)
         return None
 
-    def _execute_damage(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_damage(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行造成伤害效果"""
-        formula = effect.get('formula', '0')
-        damage_type = effect.get('damage_type', 'physical')
+        formula = effect.formula
+        damage_type = effect.damage_type
 
         damage = int(self.evaluator.evaluate(formula, context) or 0)
-        if effect.get('can_crit'):
+        if effect.can_crit:
             damage = int(_cal_crit_damage(effect, context, damage))
         target = context.get('target')
-        damage_event = EventInfo(source=self.owner, target=target, round_num=effect.get('round_num'))
+        damage_event = EventInfo(source=self.owner, target=target, round_num=effect.round_num)
         damage_event.skill_name = self.name
         damage_event.amount = damage
         damage_event.damage_type = damage_type
-        damage_event.op = effect.get('op')
-        damage_event.can_dodge = effect.get('can_dodge', False)
+        damage_event.op = effect.op
+        damage_event.can_dodge = effect.can_dodge
         damage_event.is_crit = context.get('is_crit', False)
 
         event_data.add_sub_event(damage_event)
 
-    def _execute_damage_reduction(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_damage_reduction(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行伤害减免效果"""
         if not event_data.can_reduce:
             self.current_cooldown = 0
             return False
 
-        reduction_formula = effect.get('formula', '0')
+        reduction_formula = effect.formula
         reduction = int(max(self.evaluator.evaluate(reduction_formula, context), 0) or 0)
 
         reduction_event = EventInfo(source=self.owner, target=event_data.target, round_num=event_data.round_num,
                                     can_reflect=False, can_dodge=False)
         reduction_event.skill_name = self.name
         reduction_event.amount = reduction
-        reduction_event.op = effect.get('op')
+        reduction_event.op = effect.op
         reduction_event.can_reflect = False
-        reduction_event.damage_type = effect.get('damage_type', 'physical')
+        reduction_event.damage_type = effect.damage_type
         event_data.amount_dict['reduction'] -= reduction
         event_data.add_sub_event(reduction_event)
         return True
 
-    def _execute_add_damage(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_add_damage(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行伤害增加效果"""
-        dmg_formula = effect.get('formula', '0')
+        dmg_formula = effect.formula
         dmg = int(self.evaluator.evaluate(dmg_formula, context) or 0)
         dmg_event = EventInfo(source=self.owner, target=event_data.target, round_num=event_data.round_num,
                               can_reflect=False, can_dodge=False)
         dmg_event.skill_name = self.name
         dmg_event.amount = dmg
-        dmg_event.op = effect.get('op')
-        dmg_event.damage_type = effect.get('damage_type', 'physical')
+        dmg_event.op = effect.op
+        dmg_event.damage_type = effect.damage_type
         event_data.amount_dict['fire'] += dmg
 
         event_data.add_sub_event(dmg_event)
         return True
 
-    def _execute_damage_reflect(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_damage_reflect(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         if not event_data.can_reflect:
             self.current_cooldown = 0
             return False
         """执行伤害反射效果"""
-        reflect_formula = effect.get('formula', '0')
-        reflect_type = effect.get('damage_type', 'physical')
+        reflect_formula = effect.formula
+        reflect_type = effect.damage_type
         reflect_target = event_data.source  # 默认反射给伤害来源
 
         # 计算反射伤害
@@ -262,16 +256,16 @@ class ConfigSkill:
         reflect_event.skill_name = self.name
         reflect_event.amount = reflect_damage
         reflect_event.damage_type = reflect_type
-        reflect_event.op = effect.get('op')
+        reflect_event.op = effect.op
         event_data.add_sub_event(reflect_event)
         return True
 
-    def _execute_leech(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_leech(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         if event_data.is_dodged:
             self.current_cooldown = 0
             return False
         """执行吸血效果"""
-        leech_formula = effect.get('formula', '0')
+        leech_formula = effect.formula
         leech_target = context.get('source')  # 默认吸血给施法者
 
         # 计算吸血量
@@ -283,16 +277,16 @@ class ConfigSkill:
                                 can_reflect=False)
         leech_event.skill_name = self.name
         leech_event.amount = leech_amount
-        leech_event.op = effect.get('op')
+        leech_event.op = effect.op
         event_data.add_sub_event(leech_event)
 
-    def _execute_heal(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_heal(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行治疗效果"""
-        formula = effect.get('formula', '0')
-        can_apply_on_death = effect.get('can_apply_on_death', False)
+        formula = effect.formula
+        can_apply_on_death = effect.can_apply_on_death
 
         heal_amount = int(self.evaluator.evaluate(formula, context) or 0)
-        is_self_target = effect.get('is_self_target', False)
+        is_self_target = effect.is_self_target
         if is_self_target:
             target = event_data.source
         else:
@@ -307,16 +301,15 @@ class ConfigSkill:
         heal_event.amount = heal_amount
         heal_event.damage_type = None
         heal_event.last_amount = heal_amount
-        heal_event.op = effect.get('op')
+        heal_event.op = effect.op
         event_data.add_sub_event(heal_event)
 
-    def _execute_apply_buff(self, effect: Dict, context: Dict, event_data: EventInfo):
+    def _execute_apply_buff(self, effect: EffectDef, context: Dict, event_data: EventInfo):
         """执行施加增益/减益效果"""
-        stacks_formula = effect.get('stacks_formula', '1')
-        is_self_target = effect.get('is_self_target', False)
+        stacks_formula = effect.stacks_formula
+        is_self_target = effect.is_self_target
         stacks = int(self.evaluator.evaluate(stacks_formula, context) or 0)
-        buff_config = self.config_loader.get_buff_config(effect.get('buff_id'))
-        buff = create_buff_from_dict(buff_config)
+        buff = create_buff(self.config_loader.get_buff_def(effect.buff_id))
         if is_self_target:
             target = event_data.source
         else:
@@ -326,7 +319,7 @@ class ConfigSkill:
 
         buff_event = EventInfo(source=self.owner, target=target,can_dodge=False,can_reflect=False,can_reduce=False)
         buff_event.skill_name = self.name
-        buff_event.op = effect.get('op')
+        buff_event.op = effect.op
         buff_event.additional_msg = buff.description + f"(累计{stack}层)"
         event_data.add_sub_event(buff_event)
 
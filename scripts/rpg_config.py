@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+RPG 配置预编译：
+    python -m scripts.rpg_config build    校验全部配置并生成 data/config.bundle
+    python -m scripts.rpg_config check    只校验，不写文件
+改完 YAML 后重新 build 一次；没 build 时运行时会直接解析改过的 YAML，只是慢一些。
+"""
+import argparse
+import sys
+
+import nonebot
+
+# 插件包导入时会注册 driver 钩子，先用空 driver 初始化
+nonebot.init(driver="~none")
+
+from mybot.plugins.rpg.util.config_bundle import (  # noqa: E402
+    BUNDLE_PATH, build_bundle, parse_yaml, source_files, source_name, validate,
+)
+
+
+def cmd_build(args):
+    try:
+        n = build_bundle()
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"已把 {n} 个配置文件写入 {BUNDLE_PATH}")
+
+
+def cmd_check(args):
+    errors = []
+    for f in source_files():
+        name = source_name(f)
+        try:
+            errors += validate(name, parse_yaml(f.read_text(encoding="utf-8")))
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    print("\n".join(errors) if errors else "配置校验通过")
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="rpg_config", description="RPG 配置预编译")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="校验并生成配置包").set_defaults(func=cmd_build)
+    sub.add_parser("check", help="只校验").set_defaults(func=cmd_check)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
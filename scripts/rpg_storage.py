@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+RPG 存储维护命令，在项目根目录运行（和 bot 用同一个 data/ 与 .env）：
+    python -m scripts.rpg_storage list
+    python -m scripts.rpg_storage backup
+    python -m scripts.rpg_storage restore --at "2026-10-18 04:00" --out restored/
+    python -m scripts.rpg_storage prune --keep-days 7
+    python -m scripts.rpg_storage export --kind players --out players.jsonl
+    python -m scripts.rpg_storage import --kind players players.jsonl
+    python -m scripts.rpg_storage migrate --kind players data/players.json new/players.db
+restore 只生成 players.json / boss.json，不动正在使用的数据。
+import 直接写当前存储，要在 bot 停机时跑；migrate 只写新的目标，不碰 data/。
+"""
+import argparse
+import sys
+import time
+
+import nonebot
+
+# 插件包导入时会注册 driver 钩子，先用空 driver 初始化（同时读取 .env 里的存储配置）
+nonebot.init(driver="~none")
+
+from mybot.plugins.rpg.models import flush_players  # noqa: E402
+from mybot.plugins.rpg.storage import (  # noqa: E402
+    backup_now, export_jsonl, get_backup_set, get_serializer, import_jsonl, prune_backups, restore_backup,
+)
+from mybot.plugins.rpg.storage.migrate import KINDS, migrate  # noqa: E402
+
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def parse_time(text: str) -> float:
+    if text.replace(".", "", 1).isdigit():
+        return float(text)
+    for fmt in TIME_FORMATS:
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法识别的时间: {text}，可用 {' / '.join(TIME_FORMATS)} 或 Unix 时间戳")
+
+
+def cmd_list(args):
+    for ts in get_backup_set().points():
+        print(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)))
+
+
+def cmd_backup(args):
+    flush_players()
+    print(f"写入 {backup_now()} 条记录")
+
+
+def cmd_restore(args):
+    counts = restore_backup(args.at, args.out)
+    print(f"已写出 {counts['players']} 名玩家、{counts['boss']} 个群的 BOSS 到 {args.out}")
+
+
+def cmd_prune(args):
+    print(f"合并了 {prune_backups(args.keep_days * 86400)} 个备份段")
+
+
+def cmd_export(args):
+    flush_players()
+    print(f"导出 {export_jsonl(args.kind, args.out)} 条记录到 {args.out}")
+
+
+def cmd_import(args):
+    print(f"导入 {import_jsonl(args.kind, args.src)} 条记录")
+
+
+def cmd_migrate(args):
+    n = migrate(args.src, args.dst, args.kind, get_serializer(args.format), args.batch_size)
+    print(f"迁移 {n} 条记录到 {args.dst}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="rpg_storage", description="RPG 存储维护")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="列出可恢复的时间点").set_defaults(func=cmd_list)
+    sub.add_parser("backup", help="立即做一次增量备份").set_defaults(func=cmd_backup)
+    p = sub.add_parser("restore", help="恢复到某个时间点，输出旧版单文件 JSON")
+    p.add_argument("--at", type=parse_time, default=None, help="时间点，默认最新")
+    p.add_argument("--out", required=True, help="输出目录")
+    p.set_defaults(func=cmd_restore)
+    p = sub.add_parser("prune", help="合并保留期之前的备份段")
+    p.add_argument("--keep-days", type=float, default=7)
+    p.set_defaults(func=cmd_prune)
+    p = sub.add_parser("export", help="把当前存储导出成 JSONL")
+    p.add_argument("--kind", choices=KINDS, required=True)
+    p.add_argument("--out", required=True)
+    p.set_defaults(func=cmd_export)
+    p = sub.add_parser("import", help="把 JSONL 导入当前存储（停机时用）")
+    p.add_argument("--kind", choices=KINDS, required=True)
+    p.add_argument("src")
+    p.set_defaults(func=cmd_import)
+    p = sub.add_parser("migrate", help="流式升级到当前 schema 并写成新的存储（.db / .jsonl / 分片目录）")
+    p.add_argument("--kind", choices=KINDS, required=True)
+    p.add_argument("--format", choices=("binary", "json"), default="binary", help="新存储的写入格式")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("src")
+    p.add_argument("dst")
+    p.set_defaults(func=cmd_migrate)
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        # 文件不存在 / 目标已存在 / 数据解析失败等，打印原因并以非零状态退出，方便脚本里判断
+        print(f"{args.cmd} 失败: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
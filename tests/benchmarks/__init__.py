@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准，不参与 pytest 收集，单独运行：
+    python -m tests.benchmarks.bench_serializers
+    python -m tests.benchmarks.bench_storage
+"""
+import nonebot
+
+# 同 tests/conftest.py：导入插件前先初始化 NoneBot
+nonebot.init(driver="~none")
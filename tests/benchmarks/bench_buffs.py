@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+buff 基准：一个实体身上同时挂 N 个 buff 时，各操作的单次耗时（µs）。
+    python -m tests.benchmarks.bench_buffs [--buffs 10,100,1000] [--rounds 200]
+- add_buff：对已有的 buff 叠层（按 id 查找）
+- read_stats：读一遍 ATK / DEF / AGI / CRIT / MAX_HP / HP
+- update_buffs：回合结束结算一次，每回合约 1/10 的 buff 到期后再补上
+"""
+import argparse
+import random
+import time
+from typing import Sequence
+
+from mybot.plugins.rpg.battle.entity import Entity, create_buff
+from mybot.plugins.rpg.util.config_defs import BuffDef
+
+STATS = ("ATK", "DEF", "AGI", "CRIT", "MAX_HP", "HP")
+
+
+def make_defs(n: int):
+    rnd = random.Random(0)
+    return [BuffDef.from_dict({
+        "id": f"buff{i}", "name": f"buff{i}", "is_positive": True, "duration": rnd.randint(1, 10), "max_stack": 99,
+        "stack_type": rnd.choice(["DURATION", "INTENSITY", "BOTH"]), "turn_end": [{"duration": -1}, {"stack": 0}],
+        "effects": [{"op": "property_change", "stat": rnd.choice(STATS), "value": rnd.randint(1, 3)}],
+    }) for i in range(n)]
+
+
+def run(n: int, rounds: int):
+    defs = make_defs(n)
+    unit = Entity("u", {"ATK": 10, "DEF": 10, "AGI": 10, "CRIT": 0.1, "MAX_HP": 1000})
+    for d in defs:
+        unit.add_buff(create_buff(d), "src", 1)
+    rnd = random.Random(1)
+    timings = {"add_buff": [], "read_stats": [], "update_buffs": []}
+    for _ in range(rounds):
+        d = rnd.choice(defs)
+        buff = create_buff(d)
+        t = time.perf_counter()
+        unit.add_buff(buff, "src", 1)
+        timings["add_buff"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        for stat in STATS:
+            getattr(unit, stat)
+        timings["read_stats"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        unit.update_buffs()
+        timings["update_buffs"].append(time.perf_counter() - t)
+        for d in defs:
+            if d.id not in unit.buffs:
+                unit.add_buff(create_buff(d), "src", 1)
+    return {k: sorted(v)[len(v) // 2] for k, v in timings.items()}
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(prog="bench_buffs")
+    parser.add_argument("--buffs", default="10,100,1000", help="同时挂的 buff 数，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args(argv)
+    print(f"{'buff 数':>8}{'add_buff µs':>14}{'read_stats µs':>16}{'update_buffs µs':>18}")
+    for n in (int(x) for x in args.buffs.split(",")):
+        r = run(n, args.rounds)
+        print(f"{n:>8}{r['add_buff'] * 1e6:>14.2f}{r['read_stats'] * 1e6:>16.2f}{r['update_buffs'] * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
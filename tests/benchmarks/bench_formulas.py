@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+公式求值基准：skills.yaml / buffs.yaml 里的每个公式，逐个标量求值 n 次 vs 批量（NumPy）求值一次。
+    python -m tests.benchmarks.bench_formulas [--battles 10000]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Sequence
+
+import numpy as np
+
+from mybot.plugins.rpg.util.config_loader import get_config
+from mybot.plugins.rpg.util.expression_evaluator import ExpressionEvaluator
+from mybot.plugins.rpg.util.formula_batch import EntityBatch, compile_batch
+
+
+def formulas() -> list:
+    config = get_config()
+    out = {e.formula for s in config.skill_defs.values() for e in s.effects if e.op != "apply_buff"}
+    out |= {e.formula for b in config.buff_defs.values() for e in b.effects}
+    return sorted(out)
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(prog="bench_formulas")
+    parser.add_argument("--battles", type=int, default=10000, help="每批的战斗数")
+    args = parser.parse_args(argv)
+    n = args.battles
+    rng = np.random.default_rng(0)
+
+    def entities():
+        hp_max = rng.integers(50, 500, n).astype(float)
+        return EntityBatch(ATK=rng.integers(0, 60, n).astype(float), DEF=rng.integers(0, 60, n).astype(float),
+                           AGI=rng.integers(0, 40, n).astype(float), CRIT=rng.random(n),
+                           MAX_HP=hp_max, HP=np.floor(hp_max * rng.random(n)), is_alive=np.ones(n, dtype=bool))
+
+    scope = {"source": entities(), "target": entities(), "skill": EntityBatch(level=rng.integers(1, 6, n)),
+             "damage": rng.integers(0, 100, n), "current_stack": rng.integers(1, 10, n)}
+    rows = [{k: (SimpleNamespace(**{a: col[i] for a, col in vars(v).items()}) if isinstance(v, EntityBatch) else v[i])
+             for k, v in scope.items()} for i in range(n)]
+    evaluator = ExpressionEvaluator()
+
+    print(f"{n} 场战斗")
+    print(f"{'公式':<48}{'标量 ms':>12}{'批量 ms':>12}{'倍数':>10}")
+    for expr in formulas():
+        t = time.perf_counter()
+        for row in rows:
+            evaluator.evaluate(expr, row)
+        scalar = time.perf_counter() - t
+        batch_formula = compile_batch(expr)
+        t = time.perf_counter()
+        batch_formula(scope, n, rng)
+        batch = time.perf_counter() - t
+        print(f"{expr:<48}{scalar * 1e3:>12.2f}{batch * 1e3:>12.3f}{scalar / batch:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
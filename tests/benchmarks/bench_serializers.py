@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+对比记录序列化格式的体积和编解码耗时：
+旧版 players.json（indent=2）、紧凑 JSON、二进制
+    python -m tests.benchmarks.bench_serializers [玩家数]
+"""
+import json
+import sys
+import time
+
+from mybot.plugins.rpg.storage.serializers import BinarySerializer, JsonSerializer, loads
+
+from .population import make_players
+
+
+def bench(name, dumps, records, rounds=3):
+    best_enc = best_dec = float("inf")
+    for _ in range(rounds):
+        t = time.perf_counter()
+        blobs = [dumps(r) for r in records]
+        best_enc = min(best_enc, time.perf_counter() - t)
+        t = time.perf_counter()
+        for b in blobs:
+            loads(b)
+        best_dec = min(best_dec, time.perf_counter() - t)
+    size = sum(len(b) for b in blobs)
+    n = len(records)
+    print(f"{name:<14}{size / n:>10.1f}{best_enc / n * 1e6:>12.2f}{best_dec / n * 1e6:>12.2f}")
+    return size
+
+
+def main(n: int = 20000):
+    records = make_players(n)
+    print(f"{n} 名玩家，每条记录平均：")
+    print(f"{'格式':<12}{'字节':>10}{'编码 µs':>11}{'解码 µs':>11}")
+    indented = bench("json indent=2", lambda r: json.dumps(r, ensure_ascii=False, indent=2).encode("utf-8"), records)
+    compact = bench("json", JsonSerializer().dumps, records)
+    binary = bench("binary", BinarySerializer().dumps, records)
+    print(f"二进制体积：indent=2 的 {binary / indented:.0%}，紧凑 JSON 的 {binary / compact:.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
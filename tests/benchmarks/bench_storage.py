@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+存储基准：不同规模的合成玩家库上，各存储后端 / 写入格式的单次操作延迟（p50 / p99）和每次操作写盘字节数。
+    python -m tests.benchmarks.bench_storage [--players 1000,10000,100000] [--backends sqlite:binary,journal:json] [--ops 2000]
+测两组（legacy:json 是改造前的基线：整个 players.json / boss.json 读出、改一条、整文件重写）：
+- 存储层：load_player / save_player / load_players_by_gid，不经过缓存
+- 指令组合：签到 / 精炼 / 出刀 / 列表按比例混合，走 models 的同步接口（和处理函数一样带写回缓存），
+  每 FLUSH_EVERY 次操作落盘一次，落盘单独计为 flush
+每个配置在独立子进程、独立的临时目录里跑（存储的数据目录在导入时按当前目录确定，进程内不能重置）。
+写盘字节取 /proc/self/io 的 wchar（进程所有 write 调用的字节数），非 Linux 上显示为 -。
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .population import make_bosses, make_gids, make_players
+
+BACKENDS = ("sqlite:binary", "sqlite:json", "journal:binary", "journal:json")
+# 旧版 storage.py 的 _load_json / _save_json：每次读都解析整个文件，每次存都整文件重写
+BASELINE = "legacy:json"
+CONFIGS = (BASELINE,) + BACKENDS
+FLUSH_EVERY = 200
+# 指令组合的比例
+MIX = {"签到": 25, "精炼": 25, "出刀": 40, "列表": 10}
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def written_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = {}
+        self.written: Dict[str, int] = {}
+
+    def time(self, name: str, fn: Callable, *args):
+        w = written_bytes()
+        t = time.perf_counter()
+        fn(*args)
+        self.latency.setdefault(name, []).append(time.perf_counter() - t)
+        if w is not None:
+            self.written[name] = self.written.get(name, 0) + written_bytes() - w
+
+    def summary(self) -> Dict[str, Dict]:
+        out = {}
+        for name, lat in self.latency.items():
+            lat = sorted(lat)
+            out[name] = {
+                "count": len(lat),
+                "p50": lat[len(lat) // 2],
+                "p99": lat[min(len(lat) - 1, int(len(lat) * 0.99))],
+                "bytes": self.written[name] / len(lat) if name in self.written else None,
+            }
+        return out
+
+
+# ---------- 子进程里跑 ----------
+def _load_json(path: str) -> Dict[str, Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_json(path: str, obj: Dict[str, Dict]):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def run_baseline(n: int, ops: int, seed: int = 0) -> Dict[str, Dict]:
+    """和 run_config 同样的操作序列，按旧版 models 的写法直接读写整文件，没有缓存、没有 flush"""
+    rnd = random.Random(seed)
+    gids = make_gids(n)
+    records = make_players(n, seed, gids)
+    players_path, boss_path = os.path.abspath("players.json"), os.path.abspath("boss.json")
+    _save_json(players_path, {f"{r['gid']}:{r['uid']}": r for r in records})
+    _save_json(boss_path, {b["gid"]: b for b in make_bosses(gids, "")})
+
+    def load_player(gid, uid):
+        return _load_json(players_path).get(f"{gid}:{uid}")
+
+    def save_player(r):
+        db = _load_json(players_path)
+        db[f"{r['gid']}:{r['uid']}"] = r
+        _save_json(players_path, db)
+
+    def load_players_by_gid(gid):
+        return [r for r in _load_json(players_path).values() if r["gid"] == gid]
+
+    def modify(gid, uid, apply):
+        r = load_player(gid, uid)
+        apply(r)
+        save_player(r)
+
+    def sign(gid, uid):
+        modify(gid, uid, lambda r: r.update(diamond=r["diamond"] + 10))
+
+    def refine(gid, uid):
+        modify(gid, uid, lambda r: r.update(dust=r["dust"] - 100))
+
+    def hit(gid, uid):
+        bm = _load_json(boss_path)
+        bm[gid]["hp"] -= rnd.randint(100, 5000)
+        _save_json(boss_path, bm)
+        modify(gid, uid, lambda r: r["counters"].update(boss_hits=r["counters"]["boss_hits"] + 1))
+
+    def list_group(gid, uid):
+        load_players_by_gid(gid)
+
+    rec = Recorder()
+    for r in rnd.choices(records, k=ops):
+        rec.time("load_player", load_player, r["gid"], r["uid"])
+    for r in rnd.choices(records, k=ops):
+        rec.time("save_player", save_player, dict(r, diamond=r["diamond"] + 1))
+    for r in rnd.choices(records, k=max(1, ops // 10)):
+        rec.time("load_players_by_gid", load_players_by_gid, r["gid"])
+
+    commands = {"签到": sign, "精炼": refine, "出刀": hit, "列表": list_group}
+    names = rnd.choices(list(MIX), weights=list(MIX.values()), k=ops)
+    for name, r in zip(names, rnd.choices(records, k=ops)):
+        rec.time(name, commands[name], r["gid"], r["uid"])
+    return rec.summary()
+
+
+def run_config(n: int, backend: str, fmt: str, ops: int, seed: int = 0) -> Dict[str, Dict]:
+    if f"{backend}:{fmt}" == BASELINE:
+        return run_baseline(n, ops, seed)
+    from mybot.plugins.rpg import models
+    from mybot.plugins.rpg import storage
+
+    storage.set_player_backend(backend)
+    storage.set_storage_format(fmt)
+    rnd = random.Random(seed)
+    gids = make_gids(n)
+    records = make_players(n, seed, gids)
+    for i in range(0, n, 1000):
+        storage.save_player_batch(records[i:i + 1000])
+    storage.save_boss_batch(make_bosses(gids, storage.today_tag()))
+
+    rec = Recorder()
+    # 存储层
+    for r in rnd.choices(records, k=ops):
+        rec.time("load_player", storage.load_player, r["gid"], r["uid"])
+    for r in rnd.choices(records, k=ops):
+        rec.time("save_player", storage.save_player, dict(r, diamond=r["diamond"] + 1))
+    for r in rnd.choices(records, k=max(1, ops // 10)):
+        rec.time("load_players_by_gid", storage.load_players_by_gid, r["gid"])
+
+    # 指令组合
+    def sign(gid, uid):
+        p = models.get_player(uid, gid, uid)
+        p.counters.signed = True
+        p.diamond += 10
+        models.put_player(p)
+
+    def refine(gid, uid):
+        p = models.get_player(uid, gid, uid)
+        p.weapon.slots = [rnd.randint(1, 4) for _ in range(3)]
+        p.dust -= 100
+        models.put_player(p)
+
+    def hit(gid, uid):
+        b = models.get_boss(gid)
+        p = models.get_player(uid, gid, uid)
+        dmg = rnd.randint(100, 5000)
+        b.hp -= dmg
+        b.record_hit(uid, uid, dmg)
+        p.counters.boss_hits += 1
+        models.put_player(p)
+        models.put_boss(b)
+
+    def list_group(gid, uid):
+        for _ in models.iter_group_views(gid, ["name"]):
+            pass
+
+    commands = {"签到": sign, "精炼": refine, "出刀": hit, "列表": list_group}
+    names = rnd.choices(list(MIX), weights=list(MIX.values()), k=ops)
+    for i, (name, r) in enumerate(zip(names, rnd.choices(records, k=ops))):
+        rec.time(name, commands[name], r["gid"], r["uid"])
+        if (i + 1) % FLUSH_EVERY == 0:
+            rec.time("flush", models.flush_players)
+    rec.time("flush", models.flush_players)
+    return rec.summary()
+
+
+# ---------- 父进程：调度和输出 ----------
+def run_in_subprocess(n: int, config: str, ops: int) -> Dict[str, Dict]:
+    backend, fmt = config.split(":")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH")))))
+    with tempfile.TemporaryDirectory(prefix="rpg-bench-") as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-m", "tests.benchmarks.bench_storage", "--worker", str(n), backend, fmt, str(ops)],
+            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{config} / {n} 名玩家 运行失败:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_table(n: int, config: str, summary: Dict[str, Dict]):
+    print(f"\n{n} 名玩家，{config}")
+    print(f"{'操作':<18}{'次数':>8}{'p50 µs':>12}{'p99 µs':>12}{'写入字节/次':>14}")
+    for name, s in summary.items():
+        written = "-" if s["bytes"] is None else f"{s['bytes']:.0f}"
+        print(f"{name:<18}{s['count']:>8}{s['p50'] * 1e6:>12.1f}{s['p99'] * 1e6:>12.1f}{written:>14}")
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(prog="bench_storage")
+    parser.add_argument("--players", default="1000,10000", help="玩家数，逗号分隔")
+    parser.add_argument("--backends", default=",".join(CONFIGS), help=f"后端:格式，逗号分隔，可选 {CONFIGS}")
+    parser.add_argument("--ops", type=int, default=2000, help="每项操作的次数")
+    parser.add_argument("--json", help="把全部结果另存为 JSON，方便不同版本之间对比")
+    parser.add_argument("--worker", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        n, backend, fmt, ops = args.worker
+        print(json.dumps(run_config(int(n), backend, fmt, int(ops))))
+        return
+
+    results = {}
+    for n in (int(x) for x in args.players.split(",")):
+        for config in args.backends.split(","):
+            if config not in CONFIGS:
+                parser.error(f"未知的配置: {config}")
+            summary = run_in_subprocess(n, config, args.ops)
+            results[f"{n}/{config}"] = summary
+            print_table(n, config, summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
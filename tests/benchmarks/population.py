@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+合成玩家数据：随机加点、武器、技能，按群分布（大群少、小群多，接近真实的长尾）
+"""
+import random
+from typing import Dict, List
+
+from mybot.plugins.rpg.models import Boss, Player, Points, Weapon
+
+SKILLS = ["火球术", "冰霜新星", "连击", "嗜血", "坚韧", "疾风步", "破甲", "治疗术"]
+GROUP_SIZE = 50
+
+
+def make_gids(n_players: int) -> List[str]:
+    return [str(600000 + i) for i in range(max(1, n_players // GROUP_SIZE))]
+
+
+def make_players(n: int, seed: int = 0, gids: List[str] = None) -> List[Dict]:
+    rnd = random.Random(seed)
+    gids = gids or make_gids(n)
+    # 第 i 个群的权重 1/(i+1)：头部几个群几百人，尾部的群只有几个人
+    weights = [1 / (i + 1) for i in range(len(gids))]
+    out = []
+    for i in range(n):
+        p = Player(uid=str(10000000 + i), gid=rnd.choices(gids, weights)[0], name=f"玩家{i}")
+        p.level = rnd.randint(1, 80)
+        p.points = Points(*(rnd.randint(4, 200) for _ in range(5)))
+        p.extra_points = Points(*(rnd.randint(0, 50) for _ in range(5)))
+        p.weapon = Weapon(level=rnd.randint(1, 10), slots=[rnd.randint(1, 4) for _ in range(3)])
+        p.dust, p.diamond, p.tear = rnd.randint(0, 10 ** 6), rnd.randint(0, 10 ** 5), rnd.randint(0, 30)
+        p.skills = {s: rnd.randint(1, 5) for s in rnd.sample(SKILLS, rnd.randint(0, 5))}
+        p.equipped_skills = list(p.skills)[:3]
+        out.append(p.to_dict())
+    return out
+
+
+def make_bosses(gids: List[str], date: str) -> List[Dict]:
+    return [Boss(gid=gid, boss_date=date, name="基准BOSS", hp=10 ** 9, hp_max=10 ** 9).to_dict() for gid in gids]
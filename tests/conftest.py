@@ -0,0 +1,4 @@
+import nonebot
+
+# 插件入口会注册 driver 钩子和定时任务，导入前需要先初始化 NoneBot
+nonebot.init(driver="~none")
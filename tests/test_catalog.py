@@ -0,0 +1,18 @@
+import random
+
+from mybot.plugins.rpg.battle.catalog import MonsterCatalog
+from mybot.plugins.rpg.util.config_defs import MonsterDef
+
+
+def test_monster_catalog_index_and_sample():
+    def monster(mid, tag, level):
+        return MonsterDef(id=mid, name=mid, level=level, tag=tag, ATK=1, DEF=1, MAX_HP=10)
+
+    monsters = [monster(f"m{i}", "monster", i % 4) for i in range(20)] + [monster("b", "boss", 1)]
+    catalog = MonsterCatalog(monsters)
+    assert catalog.get("m5") is monsters[5]
+    assert {m.level for m in catalog.in_range("monster", 1, 2)} == {1, 2}
+    assert len(catalog.in_range("monster", -1, 9)) == 20 and catalog.in_range("boss", 2, 3) == []
+    picked = catalog.sample("monster", (3, 3), 3, random.Random(0))
+    assert len({m.id for m in picked}) == 3 and all(m.level == 3 for m in picked)
+    assert catalog.choice("boss").id == "b"
@@ -0,0 +1,27 @@
+from mybot.plugins.rpg.util import config_bundle
+
+
+def test_config_bundle_used_until_sources_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_bundle, "BUNDLE_PATH", tmp_path / "config.bundle")
+    monkeypatch.setattr(config_bundle, "_bundle", None)
+    assert config_bundle.build_bundle(tmp_path / "config.bundle") == len(config_bundle.source_files())
+    fish = config_bundle.RPG_ROOT / "data" / "fish.yaml"
+    expected = config_bundle.parse_yaml(fish.read_text(encoding="utf-8"))
+
+    def no_parse(text):
+        raise AssertionError("不应解析 YAML")
+
+    monkeypatch.setattr(config_bundle, "parse_yaml", no_parse)
+    first = config_bundle.load_yaml(fish)
+    assert first == expected and config_bundle.load_yaml(fish) is not first
+    # 只有时间戳变了：按哈希确认内容没变，仍然用包
+    entry = config_bundle._load_bundle()["data/fish.yaml"]
+    entry["stamp"] = (0, 0)
+    assert config_bundle.load_yaml(fish) == expected
+
+    # 内容变了才回退到 YAML
+    monkeypatch.undo()
+    monkeypatch.setattr(config_bundle, "_bundle", {"data/fish.yaml": dict(entry, stamp=(0, 0), sha="old")})
+    calls = []
+    monkeypatch.setattr(config_bundle, "parse_yaml", lambda text: calls.append(text) or expected)
+    assert config_bundle.load_yaml(fish) == expected and len(calls) == 1
@@ -0,0 +1,36 @@
+import dataclasses
+
+import pytest
+
+from mybot.plugins.rpg.battle.entity import BuffStackType
+from mybot.plugins.rpg.util import config_loader
+from mybot.plugins.rpg.util.config_defs import BuffDef, SkillDef
+
+
+def test_config_defs_compiled_and_validated(tmp_path):
+    loader = config_loader.ConfigLoader()
+    assert not loader.errors and loader.skill_defs.keys() == loader.skills_config.keys()
+    full_power = loader.get_buff_def("full_power")
+    assert full_power.stack_type is BuffStackType.INTENSITY and full_power.property_change["ATK"] == 1
+    assert full_power.changes_on_turn_end == {"duration": -1, "stack": 0}
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        full_power.duration = 3
+
+    skill = SkillDef.from_dict({"id": "s", "cost": {"mp": 1}, "triggers": [{"event_type": "attack", "conditions": [{"expr": "damage > 0"}]}],
+                                "effects": [{"op": "damage", "formula": "source.ATK"}]})
+    assert skill.cost == (("MP", 1),) and skill.triggers[0].conditions == ("damage > 0",)
+    assert skill.effects[0].damage_type == "physical" and not hasattr(skill, "__dict__")
+    for bad in ({"id": "s", "effects": [{"op": "explode"}]},
+                {"id": "s", "effects": [{"op": "damage", "formual": "1"}]},
+                {"id": "s", "cd": "3"},
+                {"id": "s", "effects": [{"op": "apply_buff"}]}):
+        with pytest.raises(ValueError):
+            SkillDef.from_dict(bad)
+    with pytest.raises(ValueError):
+        BuffDef.from_dict({"id": "b", "name": "b", "is_positive": True, "duration": 1, "stack_type": "HUGE"})
+
+    # 引用了不存在的 buff 也算加载失败
+    (tmp_path / "skills.yaml").write_text("- {id: s, effects: [{op: apply_buff, buff_id: nope}]}\n", encoding="utf-8")
+    (tmp_path / "buffs.yaml").write_text("[]\n", encoding="utf-8")
+    (tmp_path / "battle_event_type.yaml").write_text("[]\n", encoding="utf-8")
+    assert config_loader.ConfigLoader(tmp_path).errors == ["skills.yaml"]
@@ -0,0 +1,35 @@
+import os
+
+from mybot.plugins.rpg.util import config_loader
+from mybot.plugins.rpg.util.config_loader import get_config
+
+
+def _write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_get_config_memoised_and_hot_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_loader, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config_loader, "_current", None)
+    skills = tmp_path / "skills.yaml"
+    _write(skills, "- {id: a, name: A, get_by_gacha: true}\n", 1_000_000_000)
+    _write(tmp_path / "buffs.yaml", "[]\n", 1_000_000_000)
+    _write(tmp_path / "battle_event_type.yaml", "- {id: e, event_type: hit, max_count: 2}\n", 1_000_000_000)
+
+    first = get_config()
+    assert get_config() is first
+    assert dict(first.get_skills_map(True)) == {"a": {"id": "a", "name": "A", "get_by_gacha": True}}
+    assert first.get_event_limit("hit") == 2
+
+    # 文件改动后换成新版本，旧版本内容不变
+    _write(skills, "- {id: b, name: B, get_by_gacha: true}\n", 2_000_000_000)
+    second = get_config()
+    assert second is not first
+    assert list(second.get_all_skills()) == ["b"] and list(first.get_all_skills()) == ["a"]
+
+    # 改坏了继续用旧版本，修好后生效
+    _write(skills, "- [unclosed\n", 3_000_000_000)
+    assert get_config() is second and get_config() is second
+    _write(skills, "- {id: c, name: C, get_by_gacha: false}\n", 4_000_000_000)
+    assert list(get_config().get_skills_map(False)) == ["c"]
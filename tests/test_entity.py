@@ -0,0 +1,72 @@
+import random
+
+from mybot.plugins.rpg.battle.entity import BUFF_STATS, Entity, create_buff
+from mybot.plugins.rpg.util.config_loader import ConfigLoader
+
+
+def _unit():
+    return Entity("u", {"ATK": 10, "DEF": 5, "AGI": 3, "CRIT": 0.05, "MAX_HP": 100})
+
+
+def _scanned(unit, stat):
+    """旧的算法：每次读属性都遍历 buff"""
+    return sum(b.current_stack * b.property_change.get(stat, 0) for b in unit.buffs)
+
+
+def test_buff_stat_deltas_track_adds_stacks_and_expiry():
+    loader = ConfigLoader()
+    rnd = random.Random(0)
+    unit = _unit()
+    for _ in range(300):
+        version, before = unit.stat_version, dict(unit._buff_delta)
+        if rnd.random() < 0.7:
+            bdef = loader.get_buff_def(rnd.choice(list(loader.buff_defs)))
+            unit.add_buff(create_buff(bdef), "src", rnd.randint(1, 5))
+        else:
+            unit.update_buffs()
+        # 属性加成变了版本号一定变
+        assert unit.stat_version != version or unit._buff_delta == before
+        for stat in BUFF_STATS:
+            assert abs(unit._buff_delta[stat] - _scanned(unit, stat)) < 1e-9, stat
+    assert unit.DEF == unit._DEF + _scanned(unit, "DEF")
+
+    for _ in range(200):
+        unit.update_buffs()
+    assert len(unit.buffs) == 0 and unit.ATK == 10 and unit._buff_delta == dict.fromkeys(BUFF_STATS, 0)
+
+
+def test_update_buffs_ticks_every_buff_and_sweeps_once():
+    from mybot.plugins.rpg.util.config_defs import BuffDef
+
+    def bdef(bid, duration):
+        return BuffDef.from_dict({"id": bid, "name": bid, "is_positive": True, "duration": duration, "max_stack": 5,
+                                  "stack_type": "INTENSITY", "turn_end": [{"duration": -1}, {"stack": 0}],
+                                  "effects": [{"op": "property_change", "stat": "ATK", "value": 1}]})
+
+    unit = _unit()
+    for bid, duration in (("a", 1), ("b", 1), ("c", 3)):
+        unit.add_buff(create_buff(bdef(bid, duration)), "src", 2)
+    assert unit.ATK == 16 and unit.add_buff(create_buff(bdef("c", 3)), "src", 2) == 4 and unit.ATK == 18
+    # 以前边遍历边删除会跳过 b，b 要多活一回合，c 也少扣一回合
+    unit.update_buffs()
+    assert [b.id for b in unit.buffs] == ["c"] and unit.buffs.get("c").duration == 2 and unit.ATK == 14
+    unit.remove_buff("c")
+    assert len(unit.buffs) == 0 and "c" not in unit.buffs and unit.ATK == 10
+
+
+def test_buffs_share_prototype_and_keep_own_state():
+    loader = ConfigLoader()
+    bid = next(b for b, d in loader.buff_defs.items() if d.max_stack > 1)
+    bdef = loader.get_buff_def(bid)
+    raw = repr(loader.buffs_config)
+    a, b = _unit(), _unit()
+    for _ in range(50):
+        a.add_buff(create_buff(bdef), "x", 1)
+        b.add_buff(create_buff(bdef), "y", 1)
+    a.buffs.get(bid).duration -= 1
+    ba, bb = a.buffs.get(bid), b.buffs.get(bid)
+    assert bb is not None and ba is not bb and bb.proto is ba.proto is bdef
+    assert bb.source == "y" and bb.duration != ba.duration and bb.current_stack == min(50, bdef.max_stack)
+    assert not hasattr(bb, "__dict__")
+    # 配置原文不会被战斗改动
+    assert repr(loader.buffs_config) == raw
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mybot.plugins.rpg.util.expression_evaluator import BUFF_SCOPE, SKILL_SCOPE, ExpressionEvaluator, analyze_formula
+
+
+def test_formula_compiled_once_and_context_untouched():
+    evaluator = ExpressionEvaluator()
+    context = {"source": SimpleNamespace(ATK=10), "damage": 7}
+    assert evaluator.evaluate("max(1, source.ATK) * 2 + damage", context) == 27
+    info = analyze_formula("max(1, source.ATK) * 2 + damage")
+    assert analyze_formula("max(1, source.ATK) * 2 + damage") is info
+    assert context == {"source": context["source"], "damage": 7}
+
+    # 上下文变了，同一份编译结果读到的是新值
+    context["source"].ATK = 0
+    assert evaluator.evaluate("max(1, source.ATK) * 2 + damage", context) == 9
+
+
+def test_formula_dependencies_and_validation():
+    info = analyze_formula("damage > 0 and source.HP == source.MAX_HP and owner == source", SKILL_SCOPE | BUFF_SCOPE)
+    assert set(info.reads) == {("damage", None), ("source", "HP"), ("source", "MAX_HP"), ("owner", None), ("source", None)}
+    assert info.pure and not analyze_formula("random() < 0.05 + skill.level * 0.05", SKILL_SCOPE).pure
+    assert analyze_formula("math.sqrt(current_stack)", BUFF_SCOPE).reads == (("current_stack", None),)
+    for expr in ("source.ATK *", "__import__('os')", "source.__class__", "source.weapon.score", "[d for d in damage]",
+                 "(damage := 1)", "open('x')", "source.ATK.real", "len(*damage)"):
+        with pytest.raises(ValueError):
+            analyze_formula(expr)
+    with pytest.raises(ValueError, match="current_stack"):
+        analyze_formula("current_stack * 8", SKILL_SCOPE)
+
+
+def test_formula_runtime_errors_return_none(capsys):
+    evaluator = ExpressionEvaluator()
+    # damage 在 SKILL_SCOPE 里，加载时检查能过，但这次的上下文没给
+    expr = "source.ATK + damage * 0.5"
+    analyze_formula(expr, SKILL_SCOPE)
+    assert evaluator.evaluate(expr, {"source": SimpleNamespace(ATK=10)}) is None
+    assert evaluator.evaluate(expr, {"source": SimpleNamespace(ATK=10)}) is None
+    assert capsys.readouterr().out.count("NameError") == 1
+
+    assert evaluator.evaluate("target.HP * 0.1", {"target": None}) is None
+    assert evaluator.evaluate("math.sqrt(damage - 10)", {"damage": 1}) is None
+    assert evaluator.evaluate(expr, {"source": SimpleNamespace(ATK=10), "damage": 4}) == 12
+def test_formula_memoised_on_stat_version():
+    from mybot.plugins.rpg.battle.entity import Entity
+
+    calls = []
+
+    class Counted(Entity):
+        @property
+        def DEF(self):
+            calls.append(1)
+            return self._DEF
+
+        @DEF.setter
+        def DEF(self, value):
+            self._DEF = value
+            self.stat_version += 1
+
+    evaluator = ExpressionEvaluator()
+    unit = Counted("u", {"ATK": 1, "DEF": 10, "AGI": 1, "CRIT": 0, "MAX_HP": 100})
+    context = {"source": unit, "damage": 50}
+    formula = "damage * (source.DEF / (source.DEF + 50))"
+    assert evaluator.evaluate(formula, context) == evaluator.evaluate(formula, dict(context)) == 50 * (10 / 60)
+    assert len(calls) == 2
+    unit.DEF = 50
+    assert evaluator.evaluate(formula, context) == 25 and len(calls) == 4
+    assert evaluator.evaluate(formula, dict(context, damage=10)) == 5 and len(calls) == 6
+    # 数值错误仍然只打印并返回 None
+    unit.DEF = -50
+    assert evaluator.evaluate(formula, context) is None
+
+
+def _yaml_formulas():
+    from mybot.plugins.rpg.util.config_loader import ConfigLoader
+
+    loader = ConfigLoader()
+    out = set()
+    for skill in loader.skill_defs.values():
+        out.update(t for trigger in skill.triggers for t in trigger.conditions)
+        out.update(e.formula for e in skill.effects)
+        out.update(e.stacks_formula for e in skill.effects)
+    for buff in loader.buff_defs.values():
+        out.update(e.formula for e in buff.effects)
+    return sorted(out)
+
+
+def test_batch_formulas_match_scalar_evaluation():
+    import numpy as np
+
+    from mybot.plugins.rpg.util.formula_batch import EntityBatch, compile_batch
+
+    n = 64
+    rng = np.random.default_rng(0)
+
+    def entities():
+        hp_max = rng.integers(50, 500, n).astype(float)
+        return EntityBatch(ATK=rng.integers(0, 60, n).astype(float), DEF=rng.integers(-10, 60, n).astype(float),
+                           AGI=rng.integers(0, 40, n).astype(float), CRIT=rng.random(n),
+                           MAX_HP=hp_max, HP=np.floor(hp_max * rng.random(n)), is_alive=rng.random(n) < 0.8)
+
+    source, target = entities(), entities()
+    scope = {
+        "source": source, "target": target, "skill": EntityBatch(level=rng.integers(1, 6, n)),
+        "damage": rng.integers(-5, 100, n), "current_stack": rng.integers(1, 10, n),
+        "damage_type": rng.choice(["physical", "fire"], n), "op_type": rng.choice(["damage", "heal"], n),
+        "is_crit": rng.random(n) < 0.5, "is_dodged": rng.random(n) < 0.5,
+    }
+    evaluator = ExpressionEvaluator()
+    formulas = [f for f in _yaml_formulas() if "random" not in f] + [
+        "int(source.ATK / 3) - 2.5 if damage > 10 else -damage",
+        # and / or 的结果是操作数本身，不是布尔值
+        "damage > 0 and source.ATK", "damage or 10", "current_stack > 5 or damage and target.HP",
+        "not damage or source.ATK * 2",
+    ]
+    for expr in formulas:
+        batch = compile_batch(expr)(scope, n)
+        for i in range(n):
+            row = {k: (SimpleNamespace(**{a: col[i] for a, col in vars(v).items()}) if isinstance(v, EntityBatch) else v[i])
+                   for k, v in scope.items()}
+            assert batch[i] == evaluator.evaluate(expr, row), (expr, i)
+
+
+def test_batch_formula_random_and_rejects_unsupported():
+    import numpy as np
+
+    from mybot.plugins.rpg.util.formula_batch import compile_batch
+
+    rolls = compile_batch("random() < 0.25")({}, 20000, np.random.default_rng(1))
+    assert rolls.shape == (20000,) and 0.23 < rolls.mean() < 0.27
+    assert set(compile_batch("randint(1, 3)")({}, 1000, np.random.default_rng(1))) == {1, 2, 3}
+    assert list(compile_batch("7")({}, 3)) == [7, 7, 7]
+    for expr in ("[x for x in damage]", "source.__class__", "len(damage)", "max(damage)", "damage +"):
+        with pytest.raises(ValueError):
+            compile_batch(expr)
@@ -0,0 +1,638 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from mybot.plugins.rpg.models import Boss, Player, PlayerView, Points
+from mybot.plugins.rpg.storage import import_players_json, today_tag
+from mybot.plugins.rpg.storage.aio import KeyedLock, run_io
+from mybot.plugins.rpg.storage.backup import BackupSet
+from mybot.plugins.rpg.storage.cache import StaleWriteError, WriteBackCache
+from mybot.plugins.rpg.storage.index import GroupIndex
+from mybot.plugins.rpg.storage.journal import JournalStore, JournalPlayerStore, recover
+from mybot.plugins.rpg.storage.migrate import iter_json_object, iter_jsonl, migrate
+from mybot.plugins.rpg.storage.schema import PLAYER_SCHEMA
+from mybot.plugins.rpg.storage.serializers import BinarySerializer, JsonSerializer, loads
+from mybot.plugins.rpg.storage.sharding import ShardedPlayerStore, split_into_shards
+from mybot.plugins.rpg.storage.sqlite_store import SqlitePlayerStore
+
+
+def test_sqlite_store_roundtrip(tmp_path):
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    a = Player(uid="1", gid="10", name="A")
+    b = Player(uid="2", gid="10", name="B")
+    c = Player(uid="1", gid="20", name="C")
+    store.put_many([a.to_dict(), b.to_dict(), c.to_dict()])
+
+    assert store.count() == 3
+    assert store.get("10", "1")["name"] == "A"
+    assert store.get("30", "1") is None
+    assert sorted(r["name"] for r in store.by_gid("10")) == ["A", "B"]
+
+    a.diamond = 99
+    store.put(a.to_dict())
+    assert Player.from_dict(store.get("10", "1")).diamond == 99
+    assert store.count() == 3
+
+
+def test_import_players_json(tmp_path):
+    legacy = tmp_path / "players.json"
+    p = Player(uid="1", gid="10", name="旧玩家")
+    legacy.write_text(json.dumps({"10:1": p.to_dict()}, ensure_ascii=False), encoding="utf-8")
+
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    assert import_players_json(store, str(legacy)) == 1
+    assert store.get("10", "1")["name"] == "旧玩家"
+
+
+def test_write_back_cache_flush_and_evict():
+    written = []
+    cache = WriteBackCache(written.extend, max_size=2)
+    a = Player(uid="1", gid="10", name="A")
+    b = Player(uid="2", gid="10", name="B")
+    c = Player(uid="3", gid="10", name="C")
+
+    cache.add("10:1", a)
+    assert cache.add("10:1", Player(uid="1", gid="10", name="A2")) is a
+    cache.mark_dirty("10:2", b)
+    assert cache.flush() == 1 and written[-1]["name"] == "B"
+    assert cache.flush() == 0
+
+    # 淘汰最久未访问的 a（干净，不写出），再淘汰脏的 b（先写出）
+    b.diamond = 5
+    cache.mark_dirty("10:2", b)
+    cache.add("10:3", c)
+    assert "10:1" not in cache and len(written) == 1
+    cache.add("10:4", Player(uid="4", gid="10", name="D"))
+    assert "10:2" not in cache
+    assert written[-1]["diamond"] == 5
+
+
+def test_write_back_cache_evict_keeps_dirty_on_writer_failure():
+    written = []
+    failing = [True]
+
+    def writer(records):
+        if failing[0]:
+            raise OSError("disk full")
+        written.extend(records)
+
+    cache = WriteBackCache(writer, max_size=1)
+    a = Player(uid="1", gid="10", name="A", diamond=7)
+    cache.mark_dirty("10:1", a)
+    cache.add("10:2", Player(uid="2", gid="10", name="B"))
+    # 写失败时改动不能丢：a 还在缓存里且仍是脏的
+    assert "10:1" in cache and written == []
+
+    failing[0] = False
+    assert cache.flush() == 1 and written[-1]["diamond"] == 7
+
+
+def test_write_back_cache_commit_version():
+    stored = {}
+    cache = WriteBackCache(lambda rs: stored.update((r["uid"], r) for r in rs), max_size=1)
+    a = Player(uid="1", gid="10", name="A")
+    cache.add("10:1", a)
+    cache.commit("10:1", a, lambda: None)
+    cache.commit("10:1", a, lambda: None)
+    assert a.version == 2
+
+    # 另一个基于旧版本的实例不能覆盖
+    stale = Player(uid="1", gid="10", name="A", version=1)
+    with pytest.raises(StaleWriteError):
+        cache.commit("10:1", stale, lambda: None)
+
+    # a 被淘汰写出后，不在缓存里的旧实例按存储里的版本比较
+    cache.add("10:2", Player(uid="2", gid="10", name="B"))
+    assert "10:1" not in cache and stored["1"]["version"] == 2
+    with pytest.raises(StaleWriteError):
+        cache.commit("10:1", stale, lambda: stored["1"]["version"])
+    fresh = Player.from_dict(stored["1"])
+    cache.commit("10:1", fresh, lambda: stored["1"]["version"])
+    assert fresh.version == 3
+
+
+def test_write_back_cache_commit_many_all_or_nothing():
+    cache = WriteBackCache(lambda rs: None)
+    a = Player(uid="1", gid="10", name="A", diamond=100)
+    b = Player(uid="2", gid="10", name="B", diamond=100)
+    cache.add("10:1", a)
+    cache.add("10:2", b)
+    cache.commit("10:2", b, lambda: None)
+
+    # b 的旧实例冲突：a 的改动也不能提交
+    stale_b = Player(uid="2", gid="10", name="B", diamond=100)
+    a.diamond += 50
+    stale_b.diamond -= 50
+    with pytest.raises(StaleWriteError):
+        cache.commit_many([("10:1", a), ("10:2", stale_b)], lambda key: None)
+    assert a.version == 0 and cache.dirty_count() == 1
+
+    b.diamond -= 50
+    cache.commit_many([("10:1", a), ("10:2", b)], lambda key: None)
+    assert (a.version, b.version) == (1, 2) and cache.dirty_count() == 2
+
+
+def test_journal_replay_and_compact(tmp_path):
+    path = str(tmp_path / "boss.json")
+    store = JournalStore(path, key_of=lambda r: r["gid"], compact_bytes=10 ** 9)
+    store.put({"gid": "10", "hp": 100})
+    store.put({"gid": "10", "hp": 80})
+    store.put_many([{"gid": "20", "hp": 5}])
+    store.close()
+    # 模拟崩溃时最后一行只写了一半
+    with open(path + ".journal", "ab") as f:
+        f.write(b'{"k":"20","v":{"gid"')
+
+    store = JournalStore(path, key_of=lambda r: r["gid"])
+    assert store.lookup("10")["hp"] == 80
+    assert store.lookup("20")["hp"] == 5
+
+    store.compact()
+    assert json.loads(open(path, encoding="utf-8").read())["10"]["hp"] == 80
+    assert os.path.getsize(path + ".journal") == 0
+    store.close()
+
+
+def test_journal_rotate_after_failed_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "boss.json")
+    store = JournalStore(path, key_of=lambda r: r["gid"], compact_bytes=10 ** 9)
+    store.put({"gid": "10", "hp": 100})
+    good = store.serializer.snapshot
+    monkeypatch.setattr(store.serializer, "snapshot", lambda data: 1 / 0)
+    store.compact()
+    assert os.path.exists(path + ".journal.old")
+
+    # 再次切换时旧日志还在：锁内只改名成 .rotated，快照失败后由压缩线程接到 .old 后面
+    store.put({"gid": "10", "hp": 80})
+    store.compact()
+    assert not os.path.exists(path + ".journal.rotated")
+    store.put({"gid": "20", "hp": 5})
+    assert recover(path) == {"10": {"gid": "10", "hp": 80}, "20": {"gid": "20", "hp": 5}}
+
+    monkeypatch.setattr(store.serializer, "snapshot", good)
+    store.put({"gid": "10", "hp": 60})
+    store.compact()
+    store.close()
+    assert not os.path.exists(path + ".journal.old")
+    assert not os.path.exists(path + ".journal.rotated")
+    assert JournalStore(path, key_of=lambda r: r["gid"]).lookup("10")["hp"] == 60
+
+
+def test_journal_group_commit(tmp_path):
+    store = JournalPlayerStore(str(tmp_path / "players.json"), compact_bytes=2000)
+    players = [Player(uid=str(i), gid=str(i % 3), name=f"P{i}") for i in range(60)]
+    threads = [threading.Thread(target=store.put, args=(p.to_dict(),)) for p in players]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+
+    reopened = JournalPlayerStore(str(tmp_path / "players.json"))
+    assert reopened.count() == 60
+    assert len(reopened.by_gid("1")) == 20
+    assert reopened.get("2", "5")["name"] == "P5"
+
+
+def test_journal_group_commit_failure_reaches_followers(tmp_path, monkeypatch):
+    from mybot.plugins.rpg.storage import journal
+
+    store = JournalStore(str(tmp_path / "boss.json"), lambda r: r["gid"])
+    syncing, release = threading.Event(), threading.Event()
+
+    def failing_fsync(fd):
+        syncing.set()
+        release.wait(5)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal.os, "fsync", failing_fsync)
+    results = {}
+
+    def put(gid):
+        try:
+            store.put({"gid": gid})
+            results[gid] = "ok"
+        except OSError:
+            results[gid] = "error"
+
+    leader = threading.Thread(target=put, args=("1",))
+    leader.start()
+    assert syncing.wait(5)
+    # 这两个排在同一批，由其中一个代为写盘，另一个只是等着
+    followers = [threading.Thread(target=put, args=(g,)) for g in ("2", "3")]
+    for t in followers:
+        t.start()
+    while len(store._pending) < 2:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    assert results == {"1": "error", "2": "error", "3": "error"}
+    assert store._journal_size == 0 and store._errors == {}
+    # 没落盘的一批已经从日志里截掉
+    assert os.path.getsize(store.journal_path) == 0
+
+    monkeypatch.undo()
+    store.put({"gid": "4"})
+    assert store._journal_size > 0
+    store.close()
+    assert list(JournalStore(store.path, lambda r: r["gid"]).all()) == ["4"]
+
+
+def test_journal_reads_return_copies(tmp_path):
+    store = JournalPlayerStore(str(tmp_path / "players.json"))
+    store.put(Player(uid="1", gid="10", name="A", skills={"火球": 1}).to_dict())
+    boss = JournalStore(str(tmp_path / "boss.json"), lambda r: r["gid"])
+    boss.put(Boss(gid="10", boss_date=today_tag(), name="X", hp=1, hp_max=1).to_dict())
+
+    # 没有 put 的改动不能进到存储里
+    b = Boss.from_dict(boss.lookup("10"))
+    b.record_hit("u1", "U1", 123)
+    assert boss.lookup("10")["board"] == {} and boss.all()["10"]["top"] == []
+    for r in (store.get("10", "1"), store.by_gid("10")[0], store.all()["10:1"], store.values()[0],
+              store.get("10", "1", ["skills"])):
+        r["skills"]["火球"] = 5
+    assert store.get("10", "1")["skills"] == {"火球": 1}
+    store.close()
+    boss.close()
+
+
+@pytest.mark.parametrize("serializer", [JsonSerializer(), BinarySerializer()])
+def test_journal_torn_tail_truncated_on_restart(tmp_path, serializer):
+    path = str(tmp_path / "boss.json")
+
+    def reopen():
+        return JournalStore(path, lambda r: r["gid"], serializer=serializer)
+
+    store = reopen()
+    store.put_many([{"gid": "a"}, {"gid": "b"}])
+    store.close()
+    # 崩溃时最后一条只写了一半
+    torn = serializer.entry("x", {"gid": "x", "pad": "y" * 50})
+    with open(path + ".journal", "ab") as f:
+        f.write(torn[:len(torn) // 2])
+
+    store = reopen()
+    assert sorted(store.all()) == ["a", "b"]
+    store.put({"gid": "c"})
+    store.close()
+    for _ in range(2):
+        store = reopen()
+        assert sorted(store.all()) == ["a", "b", "c"]
+        store.close()
+
+
+def test_sharded_store_split(tmp_path):
+    legacy = {
+        "10:1": Player(uid="1", gid="10", name="A").to_dict(),
+        "10:2": Player(uid="2", gid="10", name="B").to_dict(),
+        "20:1": Player(uid="1", gid="20", name="C").to_dict(),
+    }
+    src = tmp_path / "players.json"
+    src.write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+
+    store = ShardedPlayerStore(str(tmp_path / "groups"))
+    assert split_into_shards(str(src), store) == 3
+    assert split_into_shards(str(src), store) == 0
+    assert sorted(store.gids()) == ["10", "20"]
+    assert [r["name"] for r in store.by_gid("20")] == ["C"]
+
+    store.put(Player(uid="3", gid="20", name="D").to_dict())
+    assert store.count() == 4
+    assert os.path.exists(tmp_path / "groups" / "20" / "players.json.journal")
+    assert store.get("10", "2")["name"] == "B"
+
+    # 只读过的群不建分片
+    assert store.get("30", "1") is None and store.by_gid("30") == [] and store.sample_group("30") is None
+    assert store.count_group("30") == 0 and store.increment_field("30", "tear", 1) == []
+    assert not os.path.exists(tmp_path / "groups" / "30") and sorted(store.gids()) == ["10", "20"]
+    store.put(Player(uid="1", gid="30", name="E").to_dict())
+    assert sorted(store.gids()) == ["10", "20", "30"] and store.count_group("30") == 1
+    store.close()
+
+
+def test_group_index_sample():
+    index = GroupIndex([("10", "1"), ("10", "2"), ("20", "3")])
+    index.add("10", "2")
+    assert index.count("10") == 2 and index.count("30") == 0
+    assert {index.sample("10", exclude="1") for _ in range(20)} == {"2"}
+    assert index.sample("20", exclude="3") is None
+    index.discard("10", "1")
+    assert index.uids("10") == ["2"]
+
+
+def test_sqlite_store_rebuilds_group_index(tmp_path):
+    path = str(tmp_path / "players.db")
+    store = SqlitePlayerStore(path)
+    store.put_many([Player(uid=str(i), gid="10", name=str(i)).to_dict() for i in range(5)])
+    store.close()
+
+    store = SqlitePlayerStore(path)
+    assert store.count_group("10") == 5
+    assert store.sample_group("10", exclude="0") in {"1", "2", "3", "4"}
+
+
+def test_increment_group_field(tmp_path):
+    for store in (SqlitePlayerStore(str(tmp_path / "players.db")), JournalPlayerStore(str(tmp_path / "players.json"))):
+        store.put_many([Player(uid=str(i), gid="10", name=str(i), tear=i).to_dict() for i in range(4)])
+        store.put(Player(uid="0", gid="20", name="x").to_dict())
+
+        assert sorted(store.increment_field("10", "tear", 1)) == ["0", "1", "2", "3"]
+        assert [store.get("10", str(i))["tear"] for i in range(4)] == [1, 2, 3, 4]
+        assert store.get("20", "0")["tear"] == 0
+
+        assert store.increment_field("10", "tear", 10, where=lambda r: r["tear"] >= 3) in (["2", "3"], ["3", "2"])
+        assert [store.get("10", str(i))["tear"] for i in range(4)] == [1, 2, 13, 14]
+        store.close()
+
+
+def test_keyed_lock_serialises_per_key():
+    locks = KeyedLock()
+    order = []
+
+    async def write(key, tag):
+        async with locks.hold(key):
+            order.append(f"{tag}+")
+            await run_io(time.sleep, 0.01)
+            order.append(f"{tag}-")
+
+    async def main():
+        await asyncio.gather(write("a", 1), write("a", 2), write("b", 3))
+
+    asyncio.run(main())
+    # 同 key 不交错，不同 key 可以并行
+    assert order.index("1-") < order.index("2+")
+    assert order.index("3+") < order.index("1-")
+    assert len(locks) == 0
+
+
+def test_binary_serializer_roundtrip():
+    record = Player(uid="1", gid="10", name="勇者" * 20, diamond=10 ** 12, dust=-5, tear=-1000).to_dict()
+    record.update(skills={"火球": 3}, equipped_skills=["火球"] * 20, ratio=0.25, note=None, flag=True)
+    data = BinarySerializer().dumps(record)
+    assert loads(data) == record
+    assert loads(JsonSerializer().dumps(record)) == record
+    assert len(data) < len(JsonSerializer().dumps(record))
+
+
+def test_journal_mixed_formats(tmp_path):
+    path = str(tmp_path / "players.json")
+    store = JournalPlayerStore(path)
+    store.put(Player(uid="1", gid="10", name="A").to_dict())
+    store.close()
+
+    # 切换格式后新记录追加成二进制帧，旧的 JSON 行照样重放
+    store = JournalPlayerStore(path, serializer=BinarySerializer())
+    store.put(Player(uid="2", gid="10", name="B").to_dict())
+    store.close()
+    with open(path + ".journal", "ab") as f:
+        f.write(BinarySerializer().entry("10:3", Player(uid="3", gid="10", name="C").to_dict())[:-3])
+    assert sorted(recover(path)) == ["10:1", "10:2"]
+
+    store = JournalPlayerStore(path, serializer=BinarySerializer())
+    store.compact()
+    store.close()
+    with open(path, "rb") as f:
+        assert f.read(1) == b"\xc1"
+    assert sorted(r["name"] for r in JournalPlayerStore(path).by_gid("10")) == ["A", "B"]
+
+
+def test_sqlite_binary_rows(tmp_path):
+    path = str(tmp_path / "players.db")
+    store = SqlitePlayerStore(path)
+    store.put(Player(uid="1", gid="10", name="A").to_dict())
+    store.close()
+
+    store = SqlitePlayerStore(path, BinarySerializer())
+    store.put(Player(uid="2", gid="10", name="B").to_dict())
+    assert sorted(r["name"] for r in store.by_gid("10")) == ["A", "B"]
+    store.close()
+
+    # JSON 模式下文本行走 json_set，二进制行解码后改
+    store = SqlitePlayerStore(path)
+    assert sorted(store.increment_field("10", "tear", 2)) == ["1", "2"]
+    assert store.get("10", "1")["tear"] == 2 and store.get("10", "2")["tear"] == 2
+
+
+def test_projection_and_player_view(tmp_path):
+    p = Player(uid="1", gid="10", name="A", diamond=7, skills={"火球": 2})
+    for store in (SqlitePlayerStore(str(tmp_path / "a.db")), SqlitePlayerStore(str(tmp_path / "b.db"), BinarySerializer()),
+                  JournalPlayerStore(str(tmp_path / "players.json"))):
+        store.put(p.to_dict())
+        assert store.get("10", "1", ["name", "skills"]) == {"name": "A", "skills": {"火球": 2}}
+        assert store.by_gid("10", ["uid"]) == [{"uid": "1"}]
+        assert store.all(["diamond"]) == {"10:1": {"diamond": 7}}
+        store.close()
+
+    view = PlayerView(p.to_dict())
+    assert view.name == "A" and view.diamond == 7 and view.level == 1
+    assert isinstance(view.points, Points) and view.points is view.points
+    partial = PlayerView({"uid": "1", "gid": "10", "name": "A"}, ["uid", "gid", "name"])
+    assert partial.name == "A"
+    with pytest.raises(AttributeError):
+        partial.diamond
+
+
+def test_backup_incremental_restore_and_prune(tmp_path):
+    backups = BackupSet(str(tmp_path))
+    a = Player(uid="1", gid="10", name="A").to_dict()
+    b = Player(uid="2", gid="10", name="B").to_dict()
+    assert backups.snapshot({"players/10:1": a, "players/10:2": b}) == 2
+    # 内容没变的记录不会再写
+    assert backups.snapshot({"players/10:1": a}) == 0
+    a2 = dict(a, diamond=50)
+    assert backups.snapshot({"players/10:1": a2}) == 1
+    first, second = backups.points()
+
+    assert backups.restore(first)["players/10:1"]["diamond"] == 0
+    assert backups.restore(second)["players/10:1"]["diamond"] == 50
+
+    # 重新打开后索引和哈希都还在；合并旧段后最新的恢复点不变
+    backups = BackupSet(str(tmp_path))
+    assert backups.snapshot({"players/10:2": b}) == 0
+    assert backups.prune(second + 1) == 2
+    assert backups.points() == [second]
+    assert backups.restore(second) == {"players/10:1": a2, "players/10:2": b}
+    assert len(os.listdir(tmp_path)) == 2  # index.json + 合并后的全量段
+
+    # JSON 格式的段是整份对象，不是日志帧
+    backups = BackupSet(str(tmp_path / "json"), JsonSerializer())
+    backups.snapshot({"players/10:1": a})
+    assert backups.restore() == {"players/10:1": a}
+
+
+def test_streaming_migration_upgrades_legacy_records(tmp_path):
+    legacy = tmp_path / "players.json"
+    records = {f"10:{i}": {"uid": str(i), "gid": "10", "name": f"玩家{i}", "diamond": 12345 + i,
+                           "points": {"def_": 3}} for i in range(50)}
+    legacy.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 块很小，记录和数字都会被切断
+    assert list(iter_json_object(str(legacy), chunk_size=7)) == list(records.values())
+
+    assert migrate(str(legacy), str(tmp_path / "out.jsonl"), "players", batch_size=16) == 50
+    rows = list(iter_jsonl(str(tmp_path / "out.jsonl")))
+    assert all(r["schema"] == PLAYER_SCHEMA and r["points"]["def"] == 3 for r in rows)
+    p = Player.from_dict(rows[1])
+    assert p.diamond == 12346 and p.points.def_ == 3 and p.weapon.slots == [1, 1, 1]
+
+    assert migrate(str(tmp_path / "out.jsonl"), str(tmp_path / "new.db"), "players") == 50
+    store = SqlitePlayerStore(str(tmp_path / "new.db"))
+    assert sorted(r["uid"] for r in store.iter_records(batch_size=7)) == sorted(str(i) for i in range(50))
+    store.close()
+    with pytest.raises(FileExistsError):
+        migrate(str(legacy), str(tmp_path / "new.db"), "players")
+
+
+def test_penalty_manager_debounced_and_expiry(tmp_path):
+    from mybot.plugins.rpg.penalty_manager import PenaltyManager
+
+    store = JournalStore(str(tmp_path / "penalties.json"), lambda r: r["uid"])
+    pm = PenaltyManager({}, store)
+    pm.apply_time_penalty("1", 3600)
+    pm.apply_blacklist_penalty("1", "2", 3600)
+    pm.apply_blacklist_penalty("1", "3", 0)
+    pm.update_user_stats("1", False, 3600)
+    # 改动先留在内存里，flush 时按用户一次写出
+    assert store.count() == 0
+    assert pm.flush() == 1 and pm.flush() == 0
+    assert pm.can_rob("1", "4")[0] is False
+    assert not pm.is_user_blacklisted("1", "3") and pm.is_user_blacklisted("1", "2")
+
+    # 到期的冷却被弹出并记为改动，重新加载后只剩还没到期的
+    pm.apply_time_penalty("5", 0)
+    pm.cleanup_expired_penalties()
+    assert "5" not in pm.user_cooldowns
+    pm.flush()
+    store.close()
+    pm = PenaltyManager({}, JournalStore(str(tmp_path / "penalties.json"), lambda r: r["uid"]))
+    assert pm.get_remaining_cooldown("1") > 3500
+    assert pm.user_blacklists == {"1": {"2": pytest.approx(time.time() + 3600, abs=5)}}
+    assert pm.get_user_stats("1")["failure_count"] == 1
+
+
+def test_boss_leaderboard_incremental():
+    import random
+    rnd = random.Random(1)
+    b = Boss(gid="10", boss_date="2026-01-01", name="X", hp=1, hp_max=1)
+    for _ in range(500):
+        uid = str(rnd.randint(1, 40))
+        b.record_hit(uid, f"玩家{uid}", rnd.randint(0, 1000))
+    expected = sorted(b.board, key=b.board.get, reverse=True)[:10]
+    assert [b.board[u] for u in b.top] == [b.board[u] for u in expected]
+    assert set(b.names) == set(b.top) and b.hits == 500
+    assert b.render_board().splitlines()[0] == f"1. 玩家{b.top[0]}：{b.board[b.top[0]]}伤害"
+
+    # 旧版记录升级时从 board 算出前 K 名
+    legacy = {"gid": "10", "boss_date": time.strftime("%Y-%m-%d"), "name": "X", "hp": 1, "hp_max": 1,
+              "board": dict(b.board), "killed": False, "schema": 1}
+    assert [b.board[u] for u in Boss.from_dict(legacy).top] == [b.board[u] for u in expected]
+
+
+def _use_player_store(monkeypatch, store, cache):
+    """让 models 的玩家读写走临时的 store / cache"""
+    from mybot.plugins.rpg import models
+
+    monkeypatch.setattr(models, "_player_cache", cache)
+    monkeypatch.setattr(models, "load_player", store.get)
+    monkeypatch.setattr(models, "save_player", store.put)
+    monkeypatch.setattr(models, "increment_group_field", store.increment_field)
+
+
+def test_grant_group_not_lost_to_concurrent_flush(tmp_path, monkeypatch):
+    from mybot.plugins.rpg import models
+
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_writer(records):
+        # 定时 flush 拿到快照后卡在写入前
+        writing.set()
+        release.wait(5)
+        store.put_many(records)
+
+    _use_player_store(monkeypatch, store, WriteBackCache(slow_writer))
+
+    p = models.get_player("1", "10", "A")
+    p.diamond = 200
+    models.put_player(p)
+    flusher = threading.Thread(target=models.flush_players)
+    flusher.start()
+    assert writing.wait(5)
+    granter = threading.Thread(target=models.grant_group, args=("10", "diamond", 50))
+    granter.start()
+    granter.join(0.2)
+    # 发放要等正在进行的写出结束，不能被它的旧快照覆盖
+    assert granter.is_alive()
+    release.set()
+    flusher.join(5)
+    granter.join(5)
+
+    assert store.get("10", "1")["diamond"] == 250
+    q = models.get_player("1", "10", "A")
+    assert q is not p and q.diamond == 250
+    # 旧实例不能把发放覆盖掉
+    p.diamond += 1
+    with pytest.raises(StaleWriteError):
+        models.put_player(p)
+    q.diamond += 1
+    models.put_player(q)
+    models.flush_players()
+    assert store.get("10", "1")["diamond"] == 251
+    store.close()
+
+
+def test_penalty_manager_opens_store_lazily(tmp_path, monkeypatch):
+    from mybot.plugins.rpg import penalty_manager
+
+    opened = []
+
+    def open_store():
+        opened.append(1)
+        return JournalStore(str(tmp_path / "penalties.json"), lambda r: r["uid"])
+
+    monkeypatch.setattr(penalty_manager, "get_penalty_store", open_store)
+    # 模块导入时建实例不应打开存储，否则之后 set_storage_format 会失败
+    pm = penalty_manager.PenaltyManager({})
+    assert opened == [] and pm.flush() == 0 and opened == []
+    assert pm.can_rob("1", "2") == (True, "")
+    pm.apply_time_penalty("1", 60)
+    assert opened == [1] and pm.flush() == 1
+    pm.store.close()
+
+
+def test_amodify_player_retries_after_stale_write(tmp_path, monkeypatch):
+    from mybot.plugins.rpg import models
+
+    store = SqlitePlayerStore(str(tmp_path / "players.db"))
+    _use_player_store(monkeypatch, store, WriteBackCache(store.put_many))
+    calls = []
+
+    def gacha(p):
+        # 第一次读出之后、写回之前，BOSS 被击杀，全群发放（处理函数里 aget 和 aput 之间有 await）
+        if not calls:
+            models.grant_group("10", "diamond", 50)
+        calls.append(p.diamond)
+        p.diamond -= 100
+        return p.diamond
+
+    async def main():
+        p = await models.aget_player("1", "10", "A")
+        p.diamond = 200
+        await models.aput_player(p)
+        # 发放之后还拿着旧实例，直接 aput 会冲突
+        models.grant_group("10", "diamond", 50)
+        p.dust += 1
+        with pytest.raises(StaleWriteError):
+            await models.aput_player(p)
+        return await models.amodify_player("1", "10", "A", gacha)
+
+    assert asyncio.run(main()) == 200
+    # 第一次基于发放前的 250 扣除没写进去，重读 300 后再扣一次
+    assert calls == [250, 300]
+    models.flush_players()
+    assert store.get("10", "1")["diamond"] == 200 and store.get("10", "1")["dust"] == 0
+    store.close()